@@ -32,6 +32,7 @@ module.exports = {
     WEATHER_ADVISORY: '/weather-advisory',
     SCHEME_RECOMMENDATIONS: '/scheme-recommendations',
     DISEASE_DETECTION: '/detect-disease',
+    DISEASE_DETECTION_BATCH: '/detect-disease/batch',
     DISEASE_CURE: '/disease-cure'
   }
 };
\ No newline at end of file
@@ -16,7 +16,12 @@ class FlaskService {
       const response = await axios.post(
         `${FLASK_ML_BASE}${FLASK_ENDPOINTS.CHATBOT}`,
         { message, session_id: sessionId },
-        { timeout: 60000 }
+        {
+          timeout: 60000,
+          // Let Flask stop generating (and return the partial answer) a little
+          // before axios gives up, instead of decoding for nobody.
+          headers: { 'X-Request-Deadline-Ms': '55000' }
+        }
       );
       return response.data;
     } catch (error) {
@@ -101,41 +106,50 @@ class FlaskService {
     }
   }
 
-  async getDiseaseCure(diseaseInfo) {
-    /**
-     * NEW BEHAVIOUR:
-     * We no longer call a separate /disease-cure endpoint.
-     * Instead, we reuse the same LLM chatbot endpoint (/chatbot on port 8000)
-     * and send a carefully constructed question string.
-     */
-    const { disease_name, confidence, image_url } = diseaseInfo || {};
-
-    const prompt = `
-A vision model has detected the following on the farmer's crop:
-- Disease name: ${disease_name || 'Unknown'}
-- Confidence score: ${typeof confidence === 'number' ? confidence.toFixed(3) : 'N/A'}
-${image_url ? `- Image URL (for reference): ${image_url}` : ''}
+  async detectDiseaseBatch(imagePaths) {
+    try {
+      const formData = new FormData();
+      imagePaths.forEach((imagePath) => {
+        formData.append('images', fs.createReadStream(imagePath));
+      });
 
-Based on this, provide a clear, practical cure recommendation
-1) Explain what this disease is in 2–3 lines
-2)List step-by-step treatment actions (exact sprays/chemicals or organic options, with dosage if known)
-3) Mention precautions and follow-up monitoring
-4)If the diagnosis might be wrong, mention what the farmer should double-check.
+      const response = await axios.post(
+        `${FLASK_DISEASE_BASE}${FLASK_ENDPOINTS.DISEASE_DETECTION_BATCH}`,
+        formData,
+        { headers: formData.getHeaders(), timeout: 120000, maxBodyLength: Infinity }
+      );
 
-give answer in less than 1000 tokens complete for this cure
-`.trim();
+      return response.data;
+    } catch (error) {
+      console.error('Flask Batch Disease Detection Error:', error.message);
+      throw new Error('Failed to detect disease');
+    }
+  }
 
-    const sessionId = `disease_cure_${Date.now()}`;
+  async getDiseaseCure(diseaseInfo) {
+    /**
+     * Cure advisories come from the LLM service's /disease-cure endpoint:
+     * known disease classes are answered at once from its pre-generated
+     * advisory table, anything else is generated live there.
+     */
+    const { disease_name, confidence } = diseaseInfo || {};
 
     try {
-      const result = await this.callChatbot(prompt, sessionId);
-      const text = result?.response || result;
-      console.log(text)
+      const response = await axios.post(
+        `${FLASK_ML_BASE}${FLASK_ENDPOINTS.DISEASE_CURE}`,
+        { disease_name: disease_name || 'Unknown', confidence },
+        {
+          timeout: 60000,
+          // Only a live generation (disease missing from the table) takes long.
+          headers: { 'X-Request-Deadline-Ms': '55000' }
+        }
+      );
       return {
-        cure_recommendation: text
+        cure_recommendation: response.data.cure_recommendation,
+        source: response.data.source
       };
     } catch (error) {
-      console.error('Flask Disease Cure via Chatbot Error:', error.message);
+      console.error('Flask Disease Cure Error:', error.message);
       throw new Error('Failed to get disease cure recommendation');
     }
   }
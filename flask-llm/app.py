@@ -1,7 +1,36 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-from llama_cpp import Llama
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+import json
+import socket
 import time
+from collections import OrderedDict, deque
+
+from config import (
+    PORT, LLM_BACKEND, MODEL_NAME, MODEL_PATH, LLAMA_KWARGS, alpaca_prompt, followup_prompt,
+    SPECULATIVE_MODE, DRAFT_MODEL_PATH, DRAFT_TOKENS, DRAFT_NGRAM_SIZE,
+    PROMPT_PREFIX, GENERATION_KWARGS, REQUEST_TIMEOUT_S, MAX_QUEUE, BATCH_MAX_ITEMS, BATCH_IN_FLIGHT,
+    WARMUP_TOKENS, STARTUP_RETRY_AFTER_S,
+    PREFIX_CACHE_ENABLED, SESSION_MAX_BYTES, SESSION_TTL_S,
+    RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_S, RESPONSE_CACHE_DB, EMBED_MODEL,
+    SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_SIZE, CURE_TABLE_PATH
+)
+from cure_table import CureTable, cure_question
+from metrics import (
+    REQUESTS, MODEL_LOAD_SECONDS, QUEUE_DEPTH, READY, record_generation, record_cache_lookup
+)
+from prefix_cache import PrefixCache
+from response_cache import ResponseCache, cache_key, normalize_message
+from scheduler import InferenceScheduler, SchedulerOverloaded, DeadlineExceeded, JobCancelled
+from semantic_cache import SemanticCache
+from session_cache import SessionStore
+from speculative import SampledTokens, build_draft_model
+from startup import Startup
+
+if LLM_BACKEND == "stub":
+    from stub_llama import StubLlama as Llama, LogitsProcessorList
+else:
+    from llama_cpp import Llama, LogitsProcessorList
 
 # -------------------------------
 # Flask App Setup
@@ -10,63 +39,395 @@ app = Flask(__name__)
 CORS(app)  # allow Node.js to call Flask
 
 # -------------------------------
-# Prompt Template
+# Session State Cache
+# -------------------------------
+sessions = SessionStore(max_bytes=SESSION_MAX_BYTES, ttl_s=SESSION_TTL_S)
+
 # -------------------------------
-alpaca_prompt = """Below is an instruction that describes a task.
+# Response Cache
+# -------------------------------
+response_cache = ResponseCache(
+    max_entries=RESPONSE_CACHE_SIZE,
+    ttl_s=RESPONSE_CACHE_TTL_S,
+    db_path=RESPONSE_CACHE_DB
+)
+
+# Encoder is loaded at the end of startup (semantic_cache.load()).
+semantic_cache = SemanticCache(
+    EMBED_MODEL,
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    max_entries=SEMANTIC_CACHE_SIZE,
+    ttl_s=RESPONSE_CACHE_TTL_S,
+    enabled=SEMANTIC_CACHE_ENABLED
+)
+
+# -------------------------------
+# Cure Advisory Table
+# -------------------------------
+cure_table = CureTable(CURE_TABLE_PATH)
+
+# -------------------------------
+# Load LLM ONCE (in the background)
+# -------------------------------
+# /health answers immediately; the inference worker thread loads the model,
+# warms the prefix cache and runs a warm-up generation, then /ready flips.
+startup = Startup()
+llm = None
+draft_model = None
+prefix_cache = None
+
+
+def load_model():
+    """Runs on the inference worker before its first job."""
+    global llm, draft_model, prefix_cache
+
+    try:
+        startup.enter("loading_model")
+        load_started = time.time()
+        if LLM_BACKEND == "stub" and SPECULATIVE_MODE != "off":
+            print("⚠️ Speculative decoding is not simulated by the stub backend, ignoring LLM_SPECULATIVE")
+        else:
+            draft_model = build_draft_model(
+                SPECULATIVE_MODE,
+                num_pred_tokens=DRAFT_TOKENS,
+                max_ngram_size=DRAFT_NGRAM_SIZE,
+                draft_model_path=DRAFT_MODEL_PATH,
+                **LLAMA_KWARGS
+            )
+            if draft_model is not None:
+                print(f"✅ Speculative decoding: {SPECULATIVE_MODE} ({DRAFT_TOKENS} draft tokens)")
+
+        llm = Llama(model_path=MODEL_PATH, draft_model=draft_model, **LLAMA_KWARGS)
+        MODEL_LOAD_SECONDS.set(time.time() - load_started)
+
+        # -------------------------------
+        # Prefix KV Cache
+        # -------------------------------
+        startup.enter("warming_prefix")
+        prefix_cache = PrefixCache(llm, PROMPT_PREFIX, enabled=PREFIX_CACHE_ENABLED)
+        prefix_cache.warm()
+
+        if WARMUP_TOKENS > 0:
+            startup.enter("warming_up")
+            warm_up(llm)
+
+        startup.enter("loading_embedder")
+        semantic_cache.load()
+
+        startup.ready()
+        return llm
+
+    except Exception as e:
+        startup.fail(e)
+        raise
+
+
+def warm_up(llm):
+    """
+    One short generation through the normal prompt path, so the first real
+    request does not pay for page-cache misses on the weights and first-run
+    allocations inside llama.cpp.
+    """
+    prefix_cache.restore()
+    prompt_tokens = tokenize(llm, build_prompt("Which fertilizer is best for wheat?"))
+    llm(prompt_tokens, max_tokens=WARMUP_TOKENS, temperature=0.0)
+
+
+def build_prompt(message):
+    return alpaca_prompt.format(question=message)
+
+
+def tokenize(llm, text, add_bos=True):
+    return llm.tokenize(text.encode("utf-8"), add_bos=add_bos, special=True)
+
+
+def prepare_prompt(llm, message, session_id):
+    """
+    Put the model in the best cached state for this turn and return the prompt tokens.
+    Follow-ups of a cached session restore that session's state and only add the
+    new question; everything else starts from the shared prefix.
+    """
+    entry = sessions.get(session_id) if session_id else None
+    if entry is not None:
+        tokens = entry.tokens + tokenize(llm, followup_prompt.format(question=message), add_bos=False)
+        if len(tokens) + GENERATION_KWARGS["max_tokens"] <= llm.n_ctx():
+            llm.load_state(entry.state)
+            return tokens
+        sessions.drop(session_id)
+
+    prefix_cache.restore()
+    return tokenize(llm, build_prompt(message))
+
+
+def cached_prefix_len(llm, tokens):
+    """How many prompt tokens are already in the KV cache."""
+    n = 0
+    for a, b in zip(llm.input_ids[:llm.n_tokens].tolist(), tokens):
+        if a != b:
+            break
+        n += 1
+    return n
+
+
+def generate_completion(llm, job, message, session_id, request_id=None):
+    """Runs on the inference worker. Streams tokens to the job and returns a summary."""
+    started = time.time()
+    first_token_at = None
+    pieces = []
+    finish_reason = None
+
+    stopped = None
 
-### Instruction:
-You are AgroShakti, an AI-powered agricultural assistant created to help Indian farmers.
-You are an expert in agriculture, farming schemes, crop management, soil health, irrigation,
-pest and disease control, weather-based advisories, and government programs such as KCC.
+    prompt_tokens = prepare_prompt(llm, message, session_id)
+    cached_tokens = cached_prefix_len(llm, prompt_tokens)
+    draft_before = draft_model.snapshot() if draft_model is not None else None
 
-# Follow these rules strictly:
-# 1. Provide accurate, practical, and farmer-friendly advice.
-# 2. Use simple language that is easy for farmers to understand.
-# 3. Explain concepts step by step.
-# 4. Give examples, best practices, and precautions.
-# 5. Respond in detail (minimum 500 words).
+    sampled = SampledTokens()
+    stream = llm(prompt_tokens, stream=True, logits_processor=LogitsProcessorList([sampled]), **GENERATION_KWARGS)
+    try:
+        for chunk in stream:
+            choice = chunk["choices"][0]
+            if choice.get("finish_reason"):
+                finish_reason = choice["finish_reason"]
+            text = choice.get("text", "")
+            if text:
+                if first_token_at is None:
+                    first_token_at = time.time()
+                pieces.append(text)
+                job.emit(text)
+            if job.should_stop():
+                # Client gone or out of time: stop decoding and free the worker.
+                stopped = "cancelled" if job.cancelled else "deadline"
+                break
+    finally:
+        stream.close()
+
+    response_text = "".join(pieces)
+    if session_id and stopped != "cancelled":
+        # Keep exactly the tokens in the KV cache: re-tokenizing the text does not
+        # always give the sampled ids back (stop sequences, multibyte merges). Drop
+        # draft tokens past the last verified one; the next eval() clears their KV.
+        llm.n_tokens = min(llm.n_tokens, len(prompt_tokens) + max(sampled.count - 1, 0))
+        sessions.put(session_id, llm.input_ids[:llm.n_tokens].tolist(), llm.save_state())
+
+    # Includes the end-of-generation token when the model stopped on its own.
+    completion_tokens = sampled.count
+    finished_at = time.time()
+    prefill_s = (first_token_at or finished_at) - started
+    decode_s = finished_at - first_token_at if first_token_at else 0.0
+
+    result = {
+        "text": response_text.strip(),
+        "finish_reason": stopped or finish_reason,
+        "truncated": stopped is not None,
+        "deadline_exceeded": stopped == "deadline",
+        "usage": {
+            "prompt_tokens": len(prompt_tokens),
+            "cached_tokens": cached_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": len(prompt_tokens) + completion_tokens
+        },
+        "queue_ms": round(job.queue_wait * 1000, 1),
+        "ttft_ms": round((first_token_at - started) * 1000, 1) if first_token_at else None,
+        "prefill_ms": round(prefill_s * 1000, 1),
+        "decode_ms": round(decode_s * 1000, 1),
+        # The first token comes out of prefill, so decode covers the rest.
+        "tokens_per_s": round((completion_tokens - 1) / decode_s, 2) if decode_s > 0 else None,
+        "total_ms": round((finished_at - started) * 1000, 1),
+        "speculative": draft_model.settle(draft_before, completion_tokens) if draft_model is not None else None
+    }
+    record_generation(result, session_id=session_id, request_id=request_id)
+    return result
+
+
+def request_timeout(data):
+    """
+    Seconds this request may take in total (queue + generation), from
+    `deadline_ms` in the body or the X-Request-Deadline-Ms header.
+    """
+    raw = data.get("deadline_ms") or request.headers.get("X-Request-Deadline-Ms")
+    try:
+        deadline_ms = float(raw)
+    except (TypeError, ValueError):
+        return REQUEST_TIMEOUT_S
+    return deadline_ms / 1000 if deadline_ms > 0 else REQUEST_TIMEOUT_S
+
+
+def priority_error(data):
+    """Error message when `priority` is not a string (unknown names run as normal)."""
+    priority = data.get("priority")
+    if priority is not None and not isinstance(priority, str):
+        return "priority must be one of: high, normal, low"
+    return None
+
+
+def client_disconnected(environ):
+    """True once the client has closed its connection (dev server / gunicorn sockets)."""
+    sock = environ.get("werkzeug.socket") or environ.get("gunicorn.socket")
+    if sock is None:
+        return False
+    try:
+        return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b""
+    except (BlockingIOError, InterruptedError):
+        return False
+    except OSError:
+        return True
+
+
+def submit_chat(data, stream=False):
+    message = data["message"]
+    session_id = data.get("session_id")
+    request_id = request.headers.get("X-Request-Id")
+    return scheduler.submit(
+        lambda llm, job: generate_completion(llm, job, message, session_id, request_id),
+        priority=data.get("priority", "normal"),
+        timeout=request_timeout(data),
+        stream=stream
+    )
+
+
+def response_cache_key(data):
+    """Cache key for a stateless turn, or None when the cache must not be used."""
+    if data.get("cache") is False or "no-cache" in request.headers.get("Cache-Control", ""):
+        response_cache.bypass()
+        return None
+    if data.get("session_id"):
+        # Session turns are never cached: a follow-up depends on the conversation
+        # so far, and a cache hit would not record this turn in the session.
+        return None
+    return cache_key(data["message"], model=MODEL_NAME, prompt=alpaca_prompt, **GENERATION_KWARGS)
+
+
+def lookup_cached(data, semantic=False):
+    """
+    Return (key, cached_result, cache_kind); cached_result is None on a miss.
+    Only free-form questions (semantic=True) may fall back to the semantic cache.
+    """
+    key = response_cache_key(data)
+    if key is None:
+        return None, None, None
+
+    session_id = data.get("session_id")
+    request_id = request.headers.get("X-Request-Id")
+
+    cached = response_cache.get(key)
+    if cached is not None:
+        record_cache_lookup("exact", session_id, request_id)
+        return key, cached, "exact"
 
+    cached, similarity = semantic_cache.lookup(data["message"]) if semantic else (None, 0.0)
+    if cached is not None:
+        record_cache_lookup("semantic", session_id, request_id, similarity)
+        return key, dict(cached, similarity=similarity), "semantic"
 
-Always respond as AgroShakti with a supportive tone.
+    record_cache_lookup(None)
+    return key, None, None
 
-### Question:
-{question}
 
-### Answer:
-"""
-# Follow these rules strictly:
-# 1. Provide accurate, practical, and farmer-friendly advice.
-# 2. Use simple language that is easy for farmers to understand.
-# 3. Explain concepts step by step.
-# 4. Give examples, best practices, and precautions.
-# 5. Respond in detail (minimum 500 words).
-# 6. Do NOT provide medical, legal, or veterinary advice.
-# 7. Do NOT give unsafe chemical dosages.
-# 8. If unsure, clearly say so.
-# 9. Do not give any mobile or phone number.
+def store_response(key, message, result, semantic=False):
+    if key is not None and result["finish_reason"] in ("stop", "length"):
+        value = {
+            "text": result["text"],
+            "finish_reason": result["finish_reason"],
+            "usage": result["usage"]
+        }
+        response_cache.put(key, value)
+        if semantic:
+            semantic_cache.add(message, value)
+
+
+def not_ready_response():
+    stats = startup.stats()
+    response = jsonify({
+        "success": False,
+        "error": "Model failed to load" if startup.failed else "Model is still loading",
+        "phase": stats["phase"],
+        "retry_after": STARTUP_RETRY_AFTER_S
+    })
+    response.status_code = 503
+    response.headers["Retry-After"] = str(STARTUP_RETRY_AFTER_S)
+    return response
+
+
+def busy_response(e, status):
+    response = jsonify({
+        "success": False,
+        "error": str(e),
+        "retry_after": e.retry_after
+    })
+    response.status_code = status
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response
+
+
+def sse_frame(payload, event=None):
+    """Format one Server-Sent Events frame."""
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
 
 # -------------------------------
-# Load LLM ONCE (IMPORTANT)
+# Scheduler (single worker owns the model)
 # -------------------------------
-print("🔄 Loading LLaMA model...")
+# Created after the helpers above, since its thread runs load_model() at once.
+scheduler = InferenceScheduler(max_queue=MAX_QUEUE, loader=load_model)
+QUEUE_DEPTH.set_function(lambda: scheduler.stats()["queue_depth"])
+READY.set_function(lambda: 1 if startup.is_ready else 0)
 
-llm = Llama(
-    model_path="models/meta-llama-3.1-8b.Q4_K_M.gguf",
-    n_ctx=4096,
-    n_threads=8,
-    n_batch=256,
-    use_mmap=True,
-    verbose=False
-)
 
-print("✅ Model loaded successfully")
+@app.after_request
+def count_request(response):
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUESTS.labels(endpoint, str(response.status_code)).inc()
+    return response
+
 
 # -------------------------------
-# Health Check
+# Health Check (liveness)
 # -------------------------------
+# Up as soon as the process serves HTTP; only a failed model load makes it
+# fail, so the orchestrator restarts us instead of waiting forever.
 @app.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "ok", "model": "llama-3.1-8b"})
+    return jsonify({
+        "status": "failed" if startup.failed else "ok",
+        "model": "llama-3.1-8b",
+        "phase": startup.phase
+    }), 503 if startup.failed else 200
+
+
+# -------------------------------
+# Readiness
+# -------------------------------
+# 200 once the model is loaded and warm; send traffic only after this.
+@app.route("/ready", methods=["GET"])
+def ready():
+    return jsonify(startup.stats()), 200 if startup.is_ready else 503
+
+
+# -------------------------------
+# Stats (queue depth, wait times)
+# -------------------------------
+@app.route("/stats", methods=["GET"])
+def stats():
+    return jsonify({
+        "startup": startup.stats(),
+        "scheduler": scheduler.stats(),
+        "response_cache": response_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "prefix_cache": prefix_cache.stats() if prefix_cache is not None else None,
+        "sessions": sessions.stats(),
+        "speculative": draft_model.stats() if draft_model is not None else None,
+        "cure_table": cure_table.stats()
+    })
+
+
+# -------------------------------
+# Prometheus Metrics
+# -------------------------------
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
 
 
 # -------------------------------
@@ -85,25 +446,46 @@ def chatbot():
                 "success": False,
                 "error": "Message is required"
             }), 400
+        if priority_error(data):
+            return jsonify({
+                "success": False,
+                "error": priority_error(data)
+            }), 400
 
-        prompt = alpaca_prompt.format(question=message)
-
-        output = llm(
-            prompt,
-            max_tokens=800,
-            temperature=0.7,
-            top_p=0.9,
-            repeat_penalty=1.05,
-            stop=["### Instruction:", "### Question:"]
-        )
+        key, cached, cache_kind = lookup_cached(data, semantic=True)
 
-        response_text = output["choices"][0]["text"].strip()
+        if cached is not None:
+            result = dict(cached, queue_ms=0.0)
+        elif not startup.is_ready:
+            return not_ready_response()
+        else:
+            environ = request.environ
+            try:
+                result = submit_chat(data).result(should_cancel=lambda: client_disconnected(environ))
+            except SchedulerOverloaded as e:
+                return busy_response(e, 429)
+            except DeadlineExceeded as e:
+                return busy_response(e, 503)
+            except JobCancelled as e:
+                # Nobody is listening any more; the status is only for the logs.
+                return jsonify({"success": False, "error": str(e)}), 499
+            store_response(key, message, result, semantic=True)
 
         return jsonify({
             "success": True,
-            "response": response_text,
+            "response": result["text"],
             "session_id": session_id,
-            "model": "meta-llama-3.1-8b"
+            "model": MODEL_NAME,
+            "finish_reason": result["finish_reason"],
+            "truncated": result.get("truncated", False),
+            "deadline_exceeded": result.get("deadline_exceeded", False),
+            "usage": result["usage"],
+            "queue_ms": result["queue_ms"],
+            "tokens_per_s": result.get("tokens_per_s"),
+            "speculative": result.get("speculative"),
+            "cached": cached is not None,
+            "cache": cache_kind,
+            "similarity": result.get("similarity")
         })
 
     except Exception as e:
@@ -114,12 +496,344 @@ def chatbot():
         }), 500
 
 
+# -------------------------------
+# DISEASE CURE ENDPOINT
+# -------------------------------
+# {"disease_name": "Early_Blight"} -> the pre-generated advisory from the cure
+# table at once; diseases missing from the table go through the same queue
+# and caches as /chatbot with cure_question() as the message.
+@app.route("/disease-cure", methods=["POST"])
+def disease_cure():
+    try:
+        data = request.get_json(silent=True) or {}
+        disease_name = data.get("disease_name") or data.get("disease")
+
+        if not disease_name:
+            return jsonify({
+                "success": False,
+                "error": "disease_name is required"
+            }), 400
+        if priority_error(data):
+            return jsonify({
+                "success": False,
+                "error": priority_error(data)
+            }), 400
+
+        entry = cure_table.get(disease_name)
+        if entry is not None:
+            return jsonify({
+                "success": True,
+                "disease": entry["disease"],
+                "cure_recommendation": entry["advisory"],
+                "source": "table",
+                "table_version": cure_table.version,
+                "model": entry.get("model", MODEL_NAME)
+            })
+
+        chat = {"message": cure_question(disease_name), "priority": data.get("priority", "normal")}
+        if "deadline_ms" in data:
+            chat["deadline_ms"] = data["deadline_ms"]
+
+        key, cached, cache_kind = lookup_cached(chat)
+        if cached is not None:
+            result = cached
+        elif not startup.is_ready:
+            return not_ready_response()
+        else:
+            environ = request.environ
+            try:
+                result = submit_chat(chat).result(should_cancel=lambda: client_disconnected(environ))
+            except SchedulerOverloaded as e:
+                return busy_response(e, 429)
+            except DeadlineExceeded as e:
+                return busy_response(e, 503)
+            except JobCancelled as e:
+                return jsonify({"success": False, "error": str(e)}), 499
+            store_response(key, chat["message"], result)
+
+        return jsonify({
+            "success": True,
+            "disease": disease_name,
+            "cure_recommendation": result["text"],
+            "source": "cache" if cached is not None else "generated",
+            "table_version": cure_table.version,
+            "model": MODEL_NAME,
+            "finish_reason": result["finish_reason"],
+            "truncated": result.get("truncated", False),
+            "usage": result["usage"]
+        })
+
+    except Exception as e:
+        print("❌ Disease Cure Error:", str(e))
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+# -------------------------------
+# STREAMING CHATBOT ENDPOINT (SSE)
+# -------------------------------
+# Same request body as /chatbot. Tokens are pushed as they are decoded:
+#   data: {"token": "..."}
+# and the stream ends with a summary frame:
+#   event: done
+#   data: {"session_id": ..., "finish_reason": ..., "truncated": ..., "usage": {...}}
+# Closing the connection stops generation at the next token.
+@app.route("/chatbot/stream", methods=["POST"])
+def chatbot_stream():
+    data = request.get_json(silent=True) or {}
+
+    message = data.get("message")
+    session_id = data.get("session_id", f"session_{int(time.time())}")
+
+    if not message:
+        return jsonify({
+            "success": False,
+            "error": "Message is required"
+        }), 400
+    if priority_error(data):
+        return jsonify({
+            "success": False,
+            "error": priority_error(data)
+        }), 400
+
+    key, cached, cache_kind = lookup_cached(data, semantic=True)
+
+    if cached is not None:
+        def replay():
+            yield sse_frame({"token": cached["text"]})
+            yield sse_frame({
+                "success": True,
+                "session_id": session_id,
+                "model": MODEL_NAME,
+                "finish_reason": cached["finish_reason"],
+                "truncated": False,
+                "deadline_exceeded": False,
+                "usage": cached["usage"],
+                "cached": True,
+                "cache": cache_kind,
+                "similarity": cached.get("similarity")
+            }, event="done")
+
+        return Response(replay(), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache"})
+
+    if not startup.is_ready:
+        return not_ready_response()
+
+    try:
+        job = submit_chat(data, stream=True)
+    except SchedulerOverloaded as e:
+        return busy_response(e, 429)
+
+    def generate():
+        try:
+            for token in job.events():
+                yield sse_frame({"token": token})
+
+            result = job.result_value
+            store_response(key, message, result, semantic=True)
+            yield sse_frame({
+                "success": True,
+                "session_id": session_id,
+                "model": MODEL_NAME,
+                "finish_reason": result["finish_reason"],
+                "truncated": result["truncated"],
+                "deadline_exceeded": result["deadline_exceeded"],
+                "usage": result["usage"],
+                "queue_ms": result["queue_ms"],
+                "ttft_ms": result["ttft_ms"],
+                "total_ms": result["total_ms"],
+                "tokens_per_s": result["tokens_per_s"],
+                "speculative": result["speculative"],
+                "cached": False
+            }, event="done")
+
+        except DeadlineExceeded as e:
+            yield sse_frame({
+                "success": False,
+                "session_id": session_id,
+                "error": str(e),
+                "retry_after": e.retry_after
+            }, event="error")
+
+        except Exception as e:
+            print("❌ Chatbot Stream Error:", str(e))
+            yield sse_frame({
+                "success": False,
+                "session_id": session_id,
+                "error": str(e)
+            }, event="error")
+
+        finally:
+            # Runs on GeneratorExit too, i.e. when the client disconnects mid-stream.
+            job.cancel()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# -------------------------------
+# BATCH CHATBOT ENDPOINT (NDJSON)
+# -------------------------------
+# Body: {"messages": ["...", {"id": "wheat-punjab", "message": "..."}, ...],
+#        "priority": "low", "deadline_ms": ...}
+# Every item is a stateless turn. Identical questions are generated once,
+# cache hits are answered straight away, and the rest run as low-priority
+# scheduler jobs (BATCH_IN_FLIGHT queued at a time) that all start from the
+# cached prompt prefix. One JSON line per item is written as soon as it
+# finishes, in completion order:
+#   {"index": 3, "id": ..., "success": true, "response": "...", "usage": {...}, ...}
+# followed by {"done": true, "items": ..., "unique": ..., ...}.
+# One process decodes one sequence at a time, so on its own this is no
+# faster than sequential /chatbot calls (bench_batch.py --spawn-stub: ~1.0x).
+# What it adds is dedupe, cache hits, one streamed response and low priority
+# next to live traffic. The bulk path is router.py, which splits the batch
+# across its workers so they decode in parallel (bench_batch.py
+# --spawn-router --workers 4: ~3.6x over sequential calls).
+def batch_line(index, item_id, result, cached, cache_kind):
+    return {
+        "index": index,
+        "id": item_id,
+        "success": True,
+        "response": result["text"],
+        "model": MODEL_NAME,
+        "finish_reason": result["finish_reason"],
+        "truncated": result.get("truncated", False),
+        "usage": result["usage"],
+        "queue_ms": result.get("queue_ms", 0.0),
+        "total_ms": result.get("total_ms"),
+        "cached": cached,
+        "cache": cache_kind
+    }
+
+
+@app.route("/chatbot/batch", methods=["POST"])
+def chatbot_batch():
+    data = request.get_json(silent=True) or {}
+    items = data.get("messages")
+
+    if not isinstance(items, list) or not items:
+        return jsonify({
+            "success": False,
+            "error": "messages must be a non-empty list"
+        }), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({
+            "success": False,
+            "error": f"At most {BATCH_MAX_ITEMS} messages per batch"
+        }), 413
+    if priority_error(data):
+        return jsonify({
+            "success": False,
+            "error": priority_error(data)
+        }), 400
+    if not startup.is_ready:
+        return not_ready_response()
+
+    # Group identical questions so each is generated once.
+    groups = OrderedDict()
+    invalid = []
+    for index, item in enumerate(items):
+        item_id = item.get("id") if isinstance(item, dict) else None
+        message = item.get("message") if isinstance(item, dict) else item
+        if not isinstance(message, str) or not message.strip():
+            invalid.append((index, item_id))
+            continue
+        group = groups.setdefault(normalize_message(message), {"message": message, "members": []})
+        group["members"].append((index, item_id))
+
+    base = {"priority": data.get("priority", "low"), "cache": data.get("cache")}
+    if "deadline_ms" in data:
+        base["deadline_ms"] = data["deadline_ms"]
+    environ = request.environ
+
+    def line(payload):
+        return json.dumps(payload, ensure_ascii=False) + "\n"
+
+    def generate():
+        started = time.time()
+        counts = {"cached": 0, "generated": 0, "failed": len(invalid)}
+        pending = deque(groups.values())
+        running = deque()
+
+        try:
+            for index, item_id in invalid:
+                yield line({"index": index, "id": item_id, "success": False, "error": "Message is required"})
+
+            while pending or running:
+                # Keep BATCH_IN_FLIGHT jobs queued; answer cache hits on the way.
+                while pending and len(running) < BATCH_IN_FLIGHT:
+                    group = pending.popleft()
+                    item_data = dict(base, message=group["message"])
+                    key, cached, cache_kind = lookup_cached(item_data)
+                    if cached is not None:
+                        counts["cached"] += len(group["members"])
+                        for index, item_id in group["members"]:
+                            yield line(batch_line(index, item_id, cached, True, cache_kind))
+                        continue
+                    try:
+                        job = submit_chat(item_data)
+                    except SchedulerOverloaded as e:
+                        if running:
+                            # Queue is full of other traffic; wait for one of ours first.
+                            pending.appendleft(group)
+                            break
+                        if client_disconnected(environ):
+                            return
+                        time.sleep(min(e.retry_after, 5))
+                        pending.appendleft(group)
+                        continue
+                    running.append((job, key, group))
+
+                if not running:
+                    continue
+
+                # One worker runs jobs in submission order, so wait on the oldest.
+                job, key, group = running.popleft()
+                try:
+                    result = job.result(should_cancel=lambda: client_disconnected(environ))
+                except Exception as e:  # DeadlineExceeded, JobCancelled, generation errors
+                    counts["failed"] += len(group["members"])
+                    for index, item_id in group["members"]:
+                        yield line({"index": index, "id": item_id, "success": False, "error": str(e)})
+                    continue
+
+                store_response(key, group["message"], result)
+                counts["generated"] += len(group["members"])
+                for index, item_id in group["members"]:
+                    yield line(batch_line(index, item_id, result, False, None))
+
+            yield line({
+                "done": True,
+                "items": len(items),
+                "unique": len(groups),
+                **counts,
+                "total_ms": round((time.time() - started) * 1000, 1)
+            })
+
+        finally:
+            # Client went away (or we are done): drop whatever is still queued.
+            for job, _, _ in running:
+                job.cancel()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # -------------------------------
 # Run Server
 # -------------------------------
 if __name__ == "__main__":
     app.run(
         host="0.0.0.0",
-        port=8000,
+        port=PORT,
         debug=False
     )
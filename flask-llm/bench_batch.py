@@ -0,0 +1,109 @@
+"""
+Bulk advisory benchmark: N sequential /chatbot calls vs. one /chatbot/batch.
+
+    python bench_batch.py --spawn-router --workers 4 --items 20 --min-speedup 2
+    python bench_batch.py --url http://localhost:8000 --items 20
+    python bench_batch.py --spawn-stub --items 20
+
+Sends the first --items questions of corpus/farmer_questions.txt both ways
+with the response cache bypassed, and prints wall time and items/s for
+each as JSON. The bulk path is router.py: it splits the batch across its
+workers, which decode in parallel, while sequential calls keep one worker
+busy at a time. --spawn-router starts it with --workers stub workers.
+A single app.py (--spawn-stub) decodes one sequence at a time either way,
+so there the batch only saves per-request overhead (about 1.0x).
+With the stub the workers sleep instead of computing, so the speedup shows
+the fan-out, not how the cores scale; use bench_workers.py for that.
+--min-speedup exits 1 if the batch is not at least that much faster.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import requests
+
+from loadtest import APP_DIR, DEFAULT_CORPUS, free_port, load_corpus, spawn_stub, wait_for
+
+
+def run_sequential(url, questions, timeout):
+    started = time.perf_counter()
+    ok = 0
+    for question in questions:
+        r = requests.post(f"{url}/chatbot", json={"message": question, "cache": False}, timeout=timeout)
+        ok += r.ok and r.json().get("success", False)
+    return ok, time.perf_counter() - started
+
+
+def run_batch(url, questions, timeout):
+    started = time.perf_counter()
+    ok = 0
+    with requests.post(f"{url}/chatbot/batch", json={"messages": questions, "cache": False},
+                       stream=True, timeout=timeout) as r:
+        r.raise_for_status()
+        for line in r.iter_lines(decode_unicode=True):
+            if line:
+                ok += json.loads(line).get("success", False) is True
+    return ok, time.perf_counter() - started
+
+
+def spawn_router(port, workers, base_port):
+    env = dict(os.environ, LLM_BACKEND="stub", LLM_SEMANTIC_CACHE="0", LLM_REQUEST_LOG="0")
+    return subprocess.Popen(
+        [sys.executable, "router.py", "--workers", str(workers), "--threads", "1",
+         "--port", str(port), "--base-port", str(base_port)],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn-stub", action="store_true", help="start app.py with the stub backend")
+    parser.add_argument("--spawn-router", action="store_true", help="start router.py with stub workers")
+    parser.add_argument("--workers", type=int, default=4, help="workers for --spawn-router")
+    parser.add_argument("--base-port", type=int, default=8100, help="first worker port for --spawn-router")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=3600)
+    parser.add_argument("--min-speedup", type=float, default=None, help="exit 1 below this batch speedup")
+    args = parser.parse_args()
+
+    questions = load_corpus(args.corpus)[:args.items]
+
+    server = None
+    url = args.url
+    if args.spawn_stub or args.spawn_router:
+        url = f"http://127.0.0.1:{free_port()}"
+        port = url.rsplit(":", 1)[1]
+        server = spawn_router(port, args.workers, args.base_port) if args.spawn_router else spawn_stub(port)
+        if not wait_for(url, 120):
+            server.kill()
+            sys.exit("❌ Stub server did not start")
+
+    try:
+        seq_ok, seq_s = run_sequential(url, questions, args.timeout)
+        batch_ok, batch_s = run_batch(url, questions, args.timeout)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    speedup = round(seq_s / batch_s, 2) if batch_s else None
+    print(json.dumps({
+        "url": url,
+        "mode": "router" if args.spawn_router else "app" if args.spawn_stub else "url",
+        "workers": args.workers if args.spawn_router else None,
+        "items": len(questions),
+        "sequential": {"ok": seq_ok, "wall_s": round(seq_s, 2), "items_per_s": round(seq_ok / seq_s, 3)},
+        "batch": {"ok": batch_ok, "wall_s": round(batch_s, 2), "items_per_s": round(batch_ok / batch_s, 3)},
+        "speedup": speedup
+    }, indent=2))
+    if args.min_speedup and (speedup or 0) < args.min_speedup:
+        sys.exit(f"❌ Batch speedup {speedup}x is below {args.min_speedup}x")
+
+
+if __name__ == "__main__":
+    main()
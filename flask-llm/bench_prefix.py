@@ -0,0 +1,69 @@
+"""
+Prefill benchmark: full prompt vs. restored AgroShakti prefix.
+
+    python bench_prefix.py --runs 3
+
+Runs each question once with a cold KV cache (whole prompt prefilled) and
+once after restoring the prefix snapshot, with max_tokens=1 so the timing is
+almost entirely prefill. Prints a JSON report.
+"""
+import argparse
+import json
+import statistics
+import time
+
+from llama_cpp import Llama
+
+from config import MODEL_PATH, LLAMA_KWARGS, alpaca_prompt, PROMPT_PREFIX
+from prefix_cache import PrefixCache
+
+QUESTIONS = [
+    "INFORMATION REGARDING FERTILIZER BAGS?",
+    "How do I control aphids on mustard without harming bees?",
+    "What is the Kisan Credit Card and how do I apply for it?",
+    "My wheat leaves are turning yellow from the tips. What should I do?",
+    "Which crops are suitable for rainfed areas in the rabi season?"
+]
+
+
+def time_prefill(llm, prompt):
+    started = time.perf_counter()
+    llm(prompt, max_tokens=1, temperature=0.0)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    llm = Llama(model_path=args.model, **LLAMA_KWARGS)
+    cache = PrefixCache(llm, PROMPT_PREFIX, enabled=True)
+    cache.warm()
+
+    cold, cached = [], []
+    for _ in range(args.runs):
+        for question in QUESTIONS:
+            prompt = alpaca_prompt.format(question=question)
+
+            llm.reset()
+            cold.append(time_prefill(llm, prompt))
+
+            llm.load_state(cache.state)
+            cached.append(time_prefill(llm, prompt))
+
+    report = {
+        "model": args.model,
+        "n_threads": LLAMA_KWARGS["n_threads"],
+        "prefix_tokens": len(cache.tokens),
+        "samples": len(cold),
+        "cold_prefill_ms": {"median": round(statistics.median(cold), 1), "mean": round(statistics.mean(cold), 1)},
+        "cached_prefill_ms": {"median": round(statistics.median(cached), 1), "mean": round(statistics.mean(cached), 1)},
+        "saved_ms_per_request": round(statistics.median(cold) - statistics.median(cached), 1)
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Decode benchmark: plain vs. speculative decoding.
+
+    python bench_speculative.py --modes off,prompt_lookup --max-tokens 400
+    python bench_speculative.py --modes off,draft --draft-model models/llama-3.2-1b.Q4_K_M.gguf
+
+Loads the model once per mode and answers the same questions greedily
+(temperature 0), so every mode must produce the same text; the report flags
+any mismatch. Prints decode tokens/s per mode, draft acceptance rate and
+the speedup over "off" as JSON. Tokens are counted with the same
+SampledTokens logits processor the service uses (streamed text chunks are
+not tokens), and acceptance is settled per answer like app.py does.
+"""
+import argparse
+import gc
+import json
+import statistics
+import time
+
+from llama_cpp import Llama, LogitsProcessorList
+
+from config import MODEL_PATH, LLAMA_KWARGS, DRAFT_MODEL_PATH, DRAFT_TOKENS, DRAFT_NGRAM_SIZE, alpaca_prompt
+from speculative import SampledTokens, build_draft_model
+
+QUESTIONS = [
+    "My wheat leaves are turning yellow from the tips. What should I do?",
+    "What is the Kisan Credit Card and how do I apply for it?",
+    # Disease-cure style prompt: the answer repeats the disease and crop names.
+    "Provide cure and prevention steps for the plant disease: Tomato Late Blight "
+    "(Phytophthora infestans) detected with 91.2% confidence on tomato leaves.",
+    "Give a week-by-week irrigation schedule for kharif paddy on clay soil."
+]
+
+
+def run_mode(mode, args):
+    draft = build_draft_model(
+        mode,
+        num_pred_tokens=args.draft_tokens,
+        max_ngram_size=args.ngram_size,
+        draft_model_path=args.draft_model,
+        **LLAMA_KWARGS
+    )
+    llm = Llama(model_path=args.model, draft_model=draft, **LLAMA_KWARGS)
+
+    texts, rates, tokens = [], [], 0
+    for question in QUESTIONS:
+        llm.reset()
+        draft_before = draft.snapshot() if draft is not None else None
+        sampled = SampledTokens()
+        started = time.perf_counter()
+        first_at, first_count = None, 0
+        pieces = []
+        for chunk in llm(alpaca_prompt.format(question=question), stream=True,
+                         logits_processor=LogitsProcessorList([sampled]),
+                         max_tokens=args.max_tokens, temperature=0.0):
+            text = chunk["choices"][0]["text"]
+            if text:
+                if first_at is None:
+                    first_at, first_count = time.perf_counter(), sampled.count
+                pieces.append(text)
+        decode_s = time.perf_counter() - (first_at or started)
+        # Decode rate over the tokens sampled after the first text arrived
+        if sampled.count > first_count and decode_s > 0:
+            rates.append((sampled.count - first_count) / decode_s)
+        if draft is not None:
+            draft.settle(draft_before, sampled.count)
+        tokens += sampled.count
+        texts.append("".join(pieces))
+
+    report = {
+        "decode_tokens_per_s": round(statistics.median(rates), 2) if rates else None,
+        "completion_tokens": tokens,
+        "draft": draft.stats() if draft is not None else None
+    }
+    del llm, draft
+    gc.collect()
+    return report, texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--modes", default="off,prompt_lookup")
+    parser.add_argument("--draft-model", default=DRAFT_MODEL_PATH)
+    parser.add_argument("--draft-tokens", type=int, default=DRAFT_TOKENS)
+    parser.add_argument("--ngram-size", type=int, default=DRAFT_NGRAM_SIZE)
+    parser.add_argument("--max-tokens", type=int, default=400)
+    args = parser.parse_args()
+
+    results, baseline_texts = {}, None
+    for mode in args.modes.split(","):
+        report, texts = run_mode(mode, args)
+        if baseline_texts is None:
+            baseline_texts = texts
+        report["same_output_as_first_mode"] = texts == baseline_texts
+        results[mode] = report
+
+    base = results.get("off", {}).get("decode_tokens_per_s")
+    for report in results.values():
+        rate = report["decode_tokens_per_s"]
+        report["speedup"] = round(rate / base, 2) if base and rate else None
+
+    print(json.dumps({
+        "model": args.model,
+        "n_threads": LLAMA_KWARGS["n_threads"],
+        "max_tokens": args.max_tokens,
+        "modes": results
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
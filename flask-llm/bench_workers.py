@@ -0,0 +1,57 @@
+"""
+Throughput comparison of worker layouts under concurrent load.
+
+    python bench_workers.py --configs 1x8,2x4,4x2 --concurrency 8 --requests 32
+
+For each WORKERSxTHREADS layout, starts router.py, replays the farmer
+question corpus with caching disabled (see loadtest.py), then shuts the
+router down. Prints a JSON report with requests/s, generated tokens/s,
+TTFT and latency percentiles.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from loadtest import load_corpus, run_load, wait_for
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--configs", default="1x8,2x4,4x2", help="comma separated WORKERSxTHREADS")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--startup-timeout", type=float, default=900)
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}"
+    questions = load_corpus()
+    report = []
+    for config in args.configs.split(","):
+        workers, threads = (int(x) for x in config.lower().split("x"))
+        print(f"🔄 {workers} worker(s) x {threads} thread(s)", file=sys.stderr)
+
+        router = subprocess.Popen(
+            [sys.executable, "router.py", "--workers", str(workers), "--threads", str(threads),
+             "--port", str(args.port)],
+            cwd=APP_DIR
+        )
+        try:
+            if not wait_for(url, args.startup_timeout):
+                report.append({"config": config, "error": "router did not become ready"})
+                continue
+            result = run_load(url, questions, args.requests, concurrency=args.concurrency)
+            report.append({"config": config, "workers": workers, "threads": threads, **result})
+        finally:
+            router.terminate()
+            router.wait(timeout=60)
+
+    print(json.dumps({"concurrency": args.concurrency, "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
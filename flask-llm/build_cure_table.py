@@ -0,0 +1,166 @@
+"""
+Pre-generate the cure advisory table for every disease class.
+
+    python build_cure_table.py --url http://127.0.0.1:8000
+    python build_cure_table.py --url http://127.0.0.1:8000 --only-missing
+
+Reads CLASS_NAMES from the disease service (flask_disease_detection/labels.py),
+skips the healthy/normal classes (the backend only asks for a cure after a
+detection), and sends cure_question() for every distinct disease name to the
+running LLM service's /chatbot/batch endpoint at low priority, so it can run
+next to live traffic (through router.py the batch is spread over the
+workers). Advisories are written to LLM_CURE_TABLE (cure_advisories.json)
+keyed by disease name, with a version of <date>-<content hash>. Each item
+gets --deadline-ms (15 minutes by default, not the service's interactive
+timeout). Answers that were cut short (deadline, error) or never came back
+are left out, logged with the reason and reported per disease, and
+--only-missing fills them in on the next run. app.py reads the table at
+startup.
+
+The response cache is off by default (--cache turns the exact cache on):
+a semantic cache hit could hand one disease the advisory of a similar
+sounding one, so any answer served from the semantic cache is rejected.
+"""
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import time
+
+import requests
+
+from config import CURE_TABLE_PATH
+from cure_table import cure_question, normalize_disease
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+LABELS_PATH = os.path.join(APP_DIR, "..", "flask_disease_detection", "labels.py")
+# Offline run at low priority: long advisories must not hit the service's
+# interactive REQUEST_TIMEOUT_S and be dropped as truncated
+DEFAULT_DEADLINE_MS = 15 * 60 * 1000
+
+
+def load_class_names(path):
+    spec = importlib.util.spec_from_file_location("disease_labels", path)
+    labels = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(labels)
+    return labels.CLASS_NAMES
+
+
+def diseases(class_names):
+    """Distinct disease names (first spelling wins), without the healthy classes."""
+    names = {}
+    for name in class_names.values():
+        if any(term in name.lower() for term in ("healthy", "normal")):
+            continue
+        names.setdefault(normalize_disease(name), name)
+    return list(names.values())
+
+
+def generate(url, names, cache, deadline_ms):
+    """
+    Yield (disease, line) for every NDJSON result line of one /chatbot/batch
+    call, matched by the line's index into names (error lines may carry no id).
+    """
+    body = {
+        "messages": [{"id": name, "message": cure_question(name)} for name in names],
+        "priority": "low",
+        "cache": cache
+    }
+    if deadline_ms:
+        body["deadline_ms"] = deadline_ms
+
+    with requests.post(f"{url}/chatbot/batch", json=body, stream=True, timeout=(10, None)) as response:
+        response.raise_for_status()
+        for raw in response.iter_lines():
+            if not raw:
+                continue
+            line = json.loads(raw)
+            if line.get("done"):
+                print(f"📦 Batch done: {json.dumps(line)}", file=sys.stderr)
+                continue
+            if isinstance(line.get("index"), int) and 0 <= line["index"] < len(names):
+                yield names[line["index"]], line
+            else:
+                print(f"⚠️ Unmatched batch line: {json.dumps(line, ensure_ascii=False)}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="LLM service (app.py or router.py)")
+    parser.add_argument("--labels", default=LABELS_PATH, help="labels.py with CLASS_NAMES")
+    parser.add_argument("--out", default=CURE_TABLE_PATH)
+    parser.add_argument("--only-missing", action="store_true", help="keep existing advisories, generate the rest")
+    parser.add_argument("--cache", action="store_true",
+                        help="reuse exact response cache hits (semantic hits are always rejected)")
+    parser.add_argument("--deadline-ms", type=int, default=DEFAULT_DEADLINE_MS,
+                        help="per-item deadline, queue + generation (default: %(default)s)")
+    args = parser.parse_args()
+
+    names = diseases(load_class_names(args.labels))
+    advisories = {}
+    if args.only_missing and os.path.exists(args.out):
+        with open(args.out, encoding="utf-8") as f:
+            advisories = json.load(f)["advisories"]
+    todo = [name for name in names if name not in advisories]
+    print(f"🔄 {len(todo)} of {len(names)} diseases to generate", file=sys.stderr)
+
+    failed = {}
+    started = time.time()
+    if todo:
+        try:
+            for name, line in generate(args.url, todo, args.cache, args.deadline_ms):
+                if not line.get("success") or line.get("truncated"):
+                    failed[name] = line.get("error") or f"truncated ({line.get('finish_reason')})"
+                elif line.get("cached") and line.get("cache") == "semantic":
+                    failed[name] = "semantic cache hit (may be another disease's advisory)"
+                if name in failed:
+                    print(f"❌ {name}: {failed[name]}", file=sys.stderr)
+                    continue
+                advisories[name] = {
+                    "disease": name,
+                    "advisory": line["response"].strip(),
+                    "model": line.get("model"),
+                    "finish_reason": line["finish_reason"],
+                    "completion_tokens": line["usage"].get("completion_tokens")
+                }
+                print(f"✅ {name}", file=sys.stderr)
+        except (requests.RequestException, ValueError) as e:
+            # Keep what arrived; everything else is reported below
+            print(f"⚠️ Batch request failed: {e}", file=sys.stderr)
+        for name in todo:
+            if name not in advisories and name not in failed:
+                failed[name] = "no result"
+                print(f"❌ {name}: no result", file=sys.stderr)
+
+    ordered = {name: advisories[name] for name in sorted(advisories)}
+    digest = hashlib.sha256(json.dumps(ordered, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+    table = {
+        "version": f"{time.strftime('%Y%m%d')}-{digest[:8]}",
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "question_template": cure_question("{disease_name}"),
+        "advisories": ordered
+    }
+    # Nothing came back (service down): leave the existing table alone
+    if not todo or len(failed) < len(todo):
+        tmp = f"{args.out}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(table, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, args.out)
+
+    print(json.dumps({
+        "out": args.out,
+        "version": table["version"],
+        "diseases": len(names),
+        "advisories": len(ordered),
+        "generated": len(todo) - len(failed),
+        "failed": failed,
+        "total_s": round(time.time() - started, 1)
+    }, indent=2))
+    if failed:
+        sys.exit(f"❌ {len(failed)} advisories missing, rerun with --only-missing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import os
+
+# -------------------------------
+# Server
+# -------------------------------
+PORT = int(os.environ.get("LLM_PORT", 8000))
+
+# -------------------------------
+# Model
+# -------------------------------
+MODEL_NAME = "meta-llama-3.1-8b"
+MODEL_PATH = os.environ.get("LLM_MODEL_PATH", "models/meta-llama-3.1-8b.Q4_K_M.gguf")
+
+# "llama_cpp" loads the GGUF; "stub" uses stub_llama.StubLlama, a fake backend
+# with deterministic timing for CI and load tests (no model file needed).
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "llama_cpp")
+STUB_PREFILL_MS = float(os.environ.get("LLM_STUB_PREFILL_MS", 1.0))
+STUB_DECODE_MS = float(os.environ.get("LLM_STUB_DECODE_MS", 10.0))
+STUB_COMPLETION_TOKENS = int(os.environ.get("LLM_STUB_COMPLETION_TOKENS", 120))
+
+LLAMA_KWARGS = dict(
+    n_ctx=4096,
+    n_threads=int(os.environ.get("LLM_N_THREADS", 8)),
+    n_batch=256,
+    use_mmap=True,
+    verbose=False
+)
+
+# Speculative decoding (speculative.py): "off", "prompt_lookup" (n-gram
+# drafts copied from the context, no extra model) or "draft" (a small GGUF
+# with the same tokenizer at LLM_DRAFT_MODEL_PATH). Forces logits_all, so
+# the main context keeps n_ctx rows of logits instead of n_batch.
+SPECULATIVE_MODE = os.environ.get("LLM_SPECULATIVE", "off")
+DRAFT_MODEL_PATH = os.environ.get("LLM_DRAFT_MODEL_PATH") or None
+DRAFT_TOKENS = int(os.environ.get("LLM_DRAFT_TOKENS", 10))
+DRAFT_NGRAM_SIZE = int(os.environ.get("LLM_DRAFT_NGRAM_SIZE", 2))
+
+# -------------------------------
+# Prompt Template
+# -------------------------------
+alpaca_prompt = """Below is an instruction that describes a task.
+
+### Instruction:
+You are AgroShakti, an AI-powered agricultural assistant created to help Indian farmers.
+You are an expert in agriculture, farming schemes, crop management, soil health, irrigation,
+pest and disease control, weather-based advisories, and government programs such as KCC.
+
+# Follow these rules strictly:
+# 1. Provide accurate, practical, and farmer-friendly advice.
+# 2. Use simple language that is easy for farmers to understand.
+# 3. Explain concepts step by step.
+# 4. Give examples, best practices, and precautions.
+# 5. Respond in detail (minimum 500 words).
+
+
+Always respond as AgroShakti with a supportive tone.
+
+### Question:
+{question}
+
+### Answer:
+"""
+# Follow these rules strictly:
+# 1. Provide accurate, practical, and farmer-friendly advice.
+# 2. Use simple language that is easy for farmers to understand.
+# 3. Explain concepts step by step.
+# 4. Give examples, best practices, and precautions.
+# 5. Respond in detail (minimum 500 words).
+# 6. Do NOT provide medical, legal, or veterinary advice.
+# 7. Do NOT give unsafe chemical dosages.
+# 8. If unsure, clearly say so.
+# 9. Do not give any mobile or phone number.
+
+# Everything before the question is identical for every request.
+PROMPT_PREFIX = alpaca_prompt.split("{question}")[0]
+
+# Follow-up turns of a cached session are appended after the previous answer.
+followup_prompt = """
+
+### Question:
+{question}
+
+### Answer:
+"""
+
+# -------------------------------
+# Generation Settings
+# -------------------------------
+GENERATION_KWARGS = dict(
+    max_tokens=800,
+    temperature=0.7,
+    top_p=0.9,
+    repeat_penalty=1.05,
+    stop=["### Instruction:", "### Question:"]
+)
+
+# -------------------------------
+# Scheduler
+# -------------------------------
+# Default total budget per request (queue + generation), matching the Node
+# backend's 60 s axios timeout. Requests that cannot start in time get a 503;
+# generation that runs out of time returns the partial answer, truncated.
+# Override per request with "deadline_ms" or X-Request-Deadline-Ms.
+REQUEST_TIMEOUT_S = float(os.environ.get("LLM_REQUEST_TIMEOUT_S", 60))
+MAX_QUEUE = int(os.environ.get("LLM_MAX_QUEUE", 32))
+
+# /chatbot/batch: at most BATCH_MAX_ITEMS messages per call, and at most
+# BATCH_IN_FLIGHT of them queued at a time, so a bulk job never fills the
+# queue and interactive requests keep getting in between its items.
+BATCH_MAX_ITEMS = int(os.environ.get("LLM_BATCH_MAX_ITEMS", 256))
+BATCH_IN_FLIGHT = int(os.environ.get("LLM_BATCH_IN_FLIGHT", 2))
+
+# -------------------------------
+# Startup
+# -------------------------------
+# The model loads in the background after the app starts serving /health.
+# A short warm-up generation then faults in the mmap'd weights so the first
+# real request is not the slow one; /ready turns 200 after it. 0 skips it.
+WARMUP_TOKENS = int(os.environ.get("LLM_WARMUP_TOKENS", 16))
+# Retry-After sent with 503s while the model is still loading.
+STARTUP_RETRY_AFTER_S = int(os.environ.get("LLM_STARTUP_RETRY_AFTER_S", 10))
+
+# -------------------------------
+# Prefix KV Cache
+# -------------------------------
+# Evaluate PROMPT_PREFIX once at startup and restore its llama.cpp state
+# before each request. Set LLM_PREFIX_CACHE=0 to re-prefill every time.
+PREFIX_CACHE_ENABLED = os.environ.get("LLM_PREFIX_CACHE", "1") != "0"
+
+# -------------------------------
+# Session State Cache
+# -------------------------------
+# Per-session token history + llama.cpp state, so follow-ups only prefill
+# the new message. Bounded by a memory budget (LRU) and an idle TTL.
+SESSION_MAX_BYTES = int(os.environ.get("LLM_SESSION_MAX_BYTES", 1 << 30))
+SESSION_TTL_S = float(os.environ.get("LLM_SESSION_TTL_S", 1800))
+
+# -------------------------------
+# Response Cache
+# -------------------------------
+# Exact-repeat answers for stateless turns. LLM_RESPONSE_CACHE_SIZE=0 disables;
+# set LLM_RESPONSE_CACHE_DB to a sqlite file to keep entries across restarts.
+RESPONSE_CACHE_SIZE = int(os.environ.get("LLM_RESPONSE_CACHE_SIZE", 512))
+RESPONSE_CACHE_TTL_S = float(os.environ.get("LLM_RESPONSE_CACHE_TTL_S", 86400))
+RESPONSE_CACHE_DB = os.environ.get("LLM_RESPONSE_CACHE_DB") or None
+
+# -------------------------------
+# Semantic Answer Cache
+# -------------------------------
+# Near-duplicate questions (cosine similarity >= threshold) reuse a cached
+# answer. Needs sentence-transformers + faiss-cpu; LLM_SEMANTIC_CACHE=0 disables.
+EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+SEMANTIC_CACHE_ENABLED = os.environ.get("LLM_SEMANTIC_CACHE", "1") != "0"
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("LLM_SEMANTIC_THRESHOLD", 0.92))
+SEMANTIC_CACHE_SIZE = int(os.environ.get("LLM_SEMANTIC_CACHE_SIZE", 1024))
+
+# -------------------------------
+# Cure Advisory Table
+# -------------------------------
+# Pre-generated advisories for the disease classes (build_cure_table.py),
+# served by POST /disease-cure; unknown diseases are generated live.
+CURE_TABLE_PATH = os.environ.get(
+    "LLM_CURE_TABLE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cure_advisories.json")
+)
+
+# -------------------------------
+# Multi-worker Router (router.py)
+# -------------------------------
+# N worker processes, each running app.py with its own Llama context and
+# LLM_N_THREADS = cores / N, all mapping the same GGUF file (use_mmap).
+ROUTER_WORKERS = int(os.environ.get("LLM_WORKERS", 2))
+ROUTER_WORKER_BASE_PORT = int(os.environ.get("LLM_WORKER_BASE_PORT", 8100))
+ROUTER_WORKER_START_TIMEOUT_S = float(os.environ.get("LLM_WORKER_START_TIMEOUT_S", 600))
+
+# -------------------------------
+# Metrics
+# -------------------------------
+# Prometheus counters/histograms on GET /metrics, plus one JSON log line per
+# request on the "agroshakti.llm.requests" logger. LLM_REQUEST_LOG=0 silences it.
+REQUEST_LOG_ENABLED = os.environ.get("LLM_REQUEST_LOG", "1") != "0"
@@ -0,0 +1,76 @@
+import json
+import os
+import re
+import threading
+
+# -------------------------------
+# Cure Advisory Table
+# -------------------------------
+# Pre-generated cure advisories for the disease model's classes, written by
+# build_cure_table.py and served by POST /disease-cure without touching the
+# LLM. The prompt depends only on the disease name, so every detection of a
+# known class gets the same advisory. Unknown names fall back to a live
+# generation of the same question.
+
+
+def normalize_disease(name):
+    """'Early_Blight', 'early blight ' -> 'early blight'"""
+    return re.sub(r"[\s_]+", " ", name).strip().casefold()
+
+
+def cure_question(disease_name):
+    """The cure question for one disease (used for the table and the live fallback)."""
+    return f"""
+A vision model has detected the following on the farmer's crop:
+- Disease name: {disease_name}
+
+Based on this, provide a clear, practical cure recommendation
+1) Explain what this disease is in 2–3 lines
+2) List step-by-step treatment actions (exact sprays/chemicals or organic options, with dosage if known)
+3) Mention precautions and follow-up monitoring
+4) If the diagnosis might be wrong, mention what the farmer should double-check.
+
+give answer in less than 1000 tokens complete for this cure
+""".strip()
+
+
+class CureTable:
+    def __init__(self, path):
+        self.path = path
+        self.version = None
+        self._advisories = {}
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0}
+        self.load()
+
+    def load(self):
+        """(Re)read the table file; a missing file leaves the table empty."""
+        if not os.path.exists(self.path):
+            print(f"⚠️ No cure advisory table at {self.path}, /disease-cure will generate live")
+            return
+        with open(self.path, encoding="utf-8") as f:
+            table = json.load(f)
+        advisories = {normalize_disease(name): entry for name, entry in table["advisories"].items()}
+        with self._lock:
+            self.version = table.get("version")
+            self._advisories = advisories
+        print(f"✅ Cure advisory table {self.version}: {len(advisories)} diseases")
+
+    def get(self, disease_name):
+        """Advisory entry ({"disease", "advisory", ...}) or None."""
+        with self._lock:
+            entry = self._advisories.get(normalize_disease(disease_name))
+            self._counters["hits" if entry is not None else "misses"] += 1
+            return entry
+
+    def __len__(self):
+        return len(self._advisories)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "path": self.path,
+                "version": self.version,
+                "diseases": len(self._advisories),
+                **self._counters
+            }
@@ -0,0 +1,257 @@
+"""
+Load test and benchmark for the /chatbot service.
+
+    python loadtest.py --spawn-stub --requests 100 --concurrency 8 --out report.json
+    python loadtest.py --url http://localhost:8000 --rate 0.5 --requests 60
+
+Replays corpus/farmer_questions.txt against /chatbot/stream, either at a fixed
+concurrency (closed loop) or at a Poisson arrival rate in requests/s (open
+loop). It records time-to-first-token, decode tokens/s, end-to-end latency
+percentiles and the error rate, and writes a JSON report.
+
+--spawn-stub starts app.py with LLM_BACKEND=stub (deterministic fake timing,
+see stub_llama.py) on a spare port, so the suite runs in CI without the GGUF.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPUS = os.path.join(APP_DIR, "corpus", "farmer_questions.txt")
+
+
+def load_corpus(path=DEFAULT_CORPUS):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] if values else None
+
+
+# -------------------------------
+# Single request
+# -------------------------------
+def send_stream(url, payload, timeout):
+    """POST /chatbot/stream and time the SSE frames."""
+    started = time.perf_counter()
+    result = {"status": None, "latency_s": None, "ttft_s": None,
+              "completion_tokens": 0, "truncated": False, "error": None}
+    try:
+        with requests.post(f"{url}/chatbot/stream", json=payload, stream=True, timeout=timeout) as r:
+            result["status"] = r.status_code
+            if r.status_code != 200:
+                result["error"] = f"HTTP {r.status_code}"
+                return result
+
+            event = None
+            for line in r.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data = json.loads(line[5:])
+                    if event is None and result["ttft_s"] is None:
+                        result["ttft_s"] = time.perf_counter() - started
+                    elif event == "done":
+                        result["completion_tokens"] = data.get("usage", {}).get("completion_tokens", 0)
+                        result["truncated"] = data.get("truncated", False)
+                    elif event == "error":
+                        result["error"] = data.get("error", "stream error")
+                    event = None
+    except requests.RequestException as e:
+        result["error"] = type(e).__name__
+    finally:
+        result["latency_s"] = time.perf_counter() - started
+    return result
+
+
+def send_plain(url, payload, timeout):
+    """POST /chatbot (no TTFT available)."""
+    started = time.perf_counter()
+    result = {"status": None, "latency_s": None, "ttft_s": None,
+              "completion_tokens": 0, "truncated": False, "error": None}
+    try:
+        r = requests.post(f"{url}/chatbot", json=payload, timeout=timeout)
+        result["status"] = r.status_code
+        if r.ok:
+            body = r.json()
+            result["completion_tokens"] = body.get("usage", {}).get("completion_tokens", 0)
+            result["truncated"] = body.get("truncated", False)
+        else:
+            result["error"] = f"HTTP {r.status_code}"
+    except requests.RequestException as e:
+        result["error"] = type(e).__name__
+    finally:
+        result["latency_s"] = time.perf_counter() - started
+    return result
+
+
+# -------------------------------
+# Load generation
+# -------------------------------
+def run_load(url, questions, n_requests, concurrency=None, rate=None, stream=True,
+             cache=False, deadline_ms=None, timeout=600, seed=0):
+    """
+    Fire n_requests questions at the service and return a summary dict.
+    Closed loop with `concurrency` in-flight requests, or open loop with
+    Poisson arrivals at `rate` requests/s.
+    """
+    send = send_stream if stream else send_plain
+
+    def payload(i):
+        body = {"message": questions[i % len(questions)], "cache": cache}
+        if deadline_ms:
+            body["deadline_ms"] = deadline_ms
+        return body
+
+    results = [None] * n_requests
+    started = time.perf_counter()
+
+    if rate:
+        rng = random.Random(seed)
+        threads = []
+        next_at = started
+        for i in range(n_requests):
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+            t = threading.Thread(target=lambda i=i: results.__setitem__(i, send(url, payload(i), timeout)))
+            t.start()
+            threads.append(t)
+            next_at += rng.expovariate(rate)
+        for t in threads:
+            t.join()
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency or 1) as pool:
+            results = list(pool.map(lambda i: send(url, payload(i), timeout), range(n_requests)))
+
+    return summarize(results, time.perf_counter() - started)
+
+
+def summarize(results, wall):
+    ok = [r for r in results if r["status"] == 200 and r["error"] is None]
+    latencies = [r["latency_s"] for r in ok]
+    ttfts = [r["ttft_s"] for r in ok if r["ttft_s"] is not None]
+    decode_rates = [
+        r["completion_tokens"] / (r["latency_s"] - r["ttft_s"])
+        for r in ok if r["ttft_s"] is not None and r["latency_s"] > r["ttft_s"] and r["completion_tokens"]
+    ]
+    tokens = sum(r["completion_tokens"] for r in ok)
+
+    def dist(values, scale=1000):
+        if not values:
+            return None
+        return {
+            "p50": round(percentile(values, 0.50) * scale, 1),
+            "p95": round(percentile(values, 0.95) * scale, 1),
+            "p99": round(percentile(values, 0.99) * scale, 1),
+            "mean": round(statistics.mean(values) * scale, 1)
+        }
+
+    return {
+        "requests": len(results),
+        "ok": len(ok),
+        "errors": len(results) - len(ok),
+        "error_rate": round((len(results) - len(ok)) / len(results), 4) if results else 0.0,
+        "status_codes": dict(Counter(str(r["status"]) for r in results)),
+        "truncated": sum(1 for r in ok if r["truncated"]),
+        "wall_s": round(wall, 2),
+        "requests_per_s": round(len(ok) / wall, 3) if wall else 0.0,
+        "tokens_per_s": round(tokens / wall, 2) if wall else 0.0,
+        "latency_ms": dist(latencies),
+        "ttft_ms": dist(ttfts),
+        "decode_tokens_per_s": dist(decode_rates, scale=1)
+    }
+
+
+# -------------------------------
+# Stub server
+# -------------------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{url}/ready", timeout=2).ok:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def spawn_stub(port, extra_env=None):
+    env = dict(os.environ, LLM_BACKEND="stub", LLM_PORT=str(port), LLM_SEMANTIC_CACHE="0")
+    env.update(extra_env or {})
+    return subprocess.Popen([sys.executable, "app.py"], cwd=APP_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn-stub", action="store_true", help="start app.py with the stub backend")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=None, help="open-loop arrivals per second")
+    parser.add_argument("--no-stream", action="store_true", help="use /chatbot instead of /chatbot/stream")
+    parser.add_argument("--cache", action="store_true", help="allow response/semantic cache hits")
+    parser.add_argument("--deadline-ms", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="write the JSON report here")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if args.spawn_stub:
+        url = f"http://127.0.0.1:{free_port()}"
+        server = spawn_stub(url.rsplit(":", 1)[1])
+        if not wait_for(url, 60):
+            server.kill()
+            sys.exit("❌ Stub server did not start")
+
+    try:
+        summary = run_load(
+            url, load_corpus(args.corpus), args.requests,
+            concurrency=None if args.rate else args.concurrency,
+            rate=args.rate, stream=not args.no_stream, cache=args.cache,
+            deadline_ms=args.deadline_ms, seed=args.seed
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = {
+        "url": url,
+        "backend": "stub" if args.spawn_stub else "remote",
+        "mode": f"rate={args.rate}/s" if args.rate else f"concurrency={args.concurrency}",
+        "stream": not args.no_stream,
+        **summary
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    sys.exit(1 if summary["ok"] == 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
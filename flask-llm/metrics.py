@@ -0,0 +1,141 @@
+import json
+import logging
+import os
+import resource
+import sys
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from config import REQUEST_LOG_ENABLED
+
+# -------------------------------
+# Prometheus Metrics
+# -------------------------------
+# Per-stage timings for every generation, so we can see whether prefill or
+# decode dominates and size hardware. Served by app.py on GET /metrics.
+
+REQUESTS = Counter(
+    "agroshakti_llm_requests_total", "HTTP requests by endpoint and status code",
+    ["endpoint", "status"]
+)
+CACHE_LOOKUPS = Counter(
+    "agroshakti_llm_cache_lookups_total", "Response cache lookups for stateless turns",
+    ["result"]  # exact / semantic / miss
+)
+GENERATIONS = Counter(
+    "agroshakti_llm_generations_total", "Finished generations by finish reason",
+    ["finish_reason"]
+)
+DRAFT_TOKENS = Counter(
+    "agroshakti_llm_draft_tokens_total", "Speculative draft tokens",
+    ["outcome"]  # proposed / accepted
+)
+
+QUEUE_WAIT = Histogram(
+    "agroshakti_llm_queue_wait_seconds", "Time a request waited for the inference worker",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 20, 30, 60)
+)
+PROMPT_TOKENS = Histogram(
+    "agroshakti_llm_prompt_tokens", "Prompt length in tokens",
+    buckets=(32, 64, 128, 256, 512, 1024, 2048, 4096)
+)
+PREFILLED_TOKENS = Histogram(
+    "agroshakti_llm_prefilled_tokens", "Prompt tokens actually evaluated (not served from the KV cache)",
+    buckets=(8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+)
+PREFILL_SECONDS = Histogram(
+    "agroshakti_llm_prefill_seconds", "Time to first token (prompt evaluation)",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20)
+)
+DECODE_SECONDS = Histogram(
+    "agroshakti_llm_decode_seconds", "Time from first to last generated token",
+    buckets=(1, 5, 10, 20, 30, 45, 60, 90, 120, 180)
+)
+DECODE_TOKENS_PER_SECOND = Histogram(
+    "agroshakti_llm_decode_tokens_per_second", "Decode speed per generation",
+    buckets=(1, 2, 4, 6, 8, 10, 15, 20, 30, 50, 100)
+)
+GENERATION_TOKENS = Histogram(
+    "agroshakti_llm_generation_tokens", "Generated tokens per request",
+    buckets=(16, 32, 64, 128, 256, 400, 600, 800, 1000)
+)
+
+MODEL_LOAD_SECONDS = Gauge("agroshakti_llm_model_load_seconds", "Time taken to load the model")
+READY = Gauge("agroshakti_llm_ready", "1 once the model is loaded and warmed up")
+QUEUE_DEPTH = Gauge("agroshakti_llm_queue_depth", "Requests waiting for the inference worker")
+PROCESS_RSS = Gauge("agroshakti_llm_process_rss_bytes", "Resident set size of this process")
+
+
+def current_rss():
+    """Current RSS from /proc; falls back to the peak RSS elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+PROCESS_RSS.set_function(current_rss)
+
+
+# -------------------------------
+# Structured request log
+# -------------------------------
+# One JSON line per finished generation or cache hit, carrying the same
+# numbers as the histograms plus the caller's X-Request-Id.
+request_log = logging.getLogger("agroshakti.llm.requests")
+if not request_log.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    request_log.addHandler(_handler)
+    request_log.propagate = False
+request_log.setLevel(logging.INFO if REQUEST_LOG_ENABLED else logging.WARNING)
+
+
+def log_event(event, **fields):
+    request_log.info(json.dumps({"event": event, **fields}, ensure_ascii=False, default=str))
+
+
+def record_generation(result, session_id=None, request_id=None):
+    """Observe one finished generation (called on the inference worker)."""
+    usage = result["usage"]
+    prefill_s = result["prefill_ms"] / 1000
+    decode_s = result["decode_ms"] / 1000
+
+    QUEUE_WAIT.observe(result["queue_ms"] / 1000)
+    PROMPT_TOKENS.observe(usage["prompt_tokens"])
+    PREFILLED_TOKENS.observe(usage["prompt_tokens"] - usage["cached_tokens"])
+    PREFILL_SECONDS.observe(prefill_s)
+    GENERATION_TOKENS.observe(usage["completion_tokens"])
+    GENERATIONS.labels(str(result["finish_reason"])).inc()
+    if decode_s > 0:
+        DECODE_SECONDS.observe(decode_s)
+        DECODE_TOKENS_PER_SECOND.observe(result["tokens_per_s"])
+    speculative = result.get("speculative")
+    if speculative:
+        DRAFT_TOKENS.labels("proposed").inc(speculative["proposed"])
+        DRAFT_TOKENS.labels("accepted").inc(speculative["accepted"])
+
+    log_event(
+        "generation",
+        request_id=request_id,
+        session_id=session_id,
+        finish_reason=result["finish_reason"],
+        truncated=result["truncated"],
+        prompt_tokens=usage["prompt_tokens"],
+        cached_tokens=usage["cached_tokens"],
+        completion_tokens=usage["completion_tokens"],
+        queue_ms=result["queue_ms"],
+        prefill_ms=result["prefill_ms"],
+        decode_ms=result["decode_ms"],
+        tokens_per_s=result["tokens_per_s"],
+        draft_acceptance=speculative["acceptance_rate"] if speculative else None
+    )
+
+
+def record_cache_lookup(kind, session_id=None, request_id=None, similarity=None):
+    CACHE_LOOKUPS.labels(kind or "miss").inc()
+    if kind:
+        log_event("cache_hit", request_id=request_id, session_id=session_id,
+                  cache=kind, similarity=similarity)
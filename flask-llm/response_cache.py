@@ -0,0 +1,118 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# -------------------------------
+# Response Cache
+# -------------------------------
+# Exact-repeat cache for stateless chatbot turns, keyed on the normalized
+# message plus everything that changes the generation (model, prompt,
+# sampling parameters). In-memory LRU with a TTL, optionally backed by a
+# sqlite file so entries survive restarts.
+
+
+def normalize_message(message):
+    return re.sub(r"\s+", " ", message).strip().casefold()
+
+
+def cache_key(message, **generation):
+    payload = json.dumps({"message": normalize_message(message), **generation},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, max_entries=512, ttl_s=86400, db_path=None):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.db_path = db_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._counters = {"hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0,
+                          "stores": 0, "evictions": 0, "expired": 0}
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - ttl_s,))
+            self._db.commit()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                created_at, value = item
+                if time.time() - created_at <= self.ttl_s:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return value
+                del self._entries[key]
+                self._counters["expired"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and time.time() - row[1] <= self.ttl_s:
+                    value = json.loads(row[0])
+                    self._insert(key, value, row[1])
+                    self._counters["hits"] += 1
+                    self._counters["disk_hits"] += 1
+                    return value
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+
+        created_at = time.time()
+        with self._lock:
+            self._insert(key, value, created_at)
+            self._counters["stores"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), created_at)
+                )
+                self._db.commit()
+
+    def bypass(self):
+        with self._lock:
+            self._counters["bypassed"] += 1
+
+    def _insert(self, key, value, created_at):
+        self._entries[key] = (created_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "persistent": self._db is not None,
+                "hit_rate": round(self._counters["hits"] / lookups, 3) if lookups else 0.0,
+                **self._counters
+            }
@@ -0,0 +1,489 @@
+"""
+Multi-worker serving for the AgroShakti LLM.
+
+    python router.py --workers 2 --threads 4
+
+Starts N copies of app.py, each with its own Llama context, LLM_N_THREADS
+threads and (on Linux) pinned to its own slice of the cores. All workers
+load the GGUF with use_mmap=True, so the weights live once in the page cache
+and are shared between processes. The router listens on LLM_PORT (8000) and
+forwards /chatbot and /chatbot/stream to the least-loaded worker, preferring
+the worker that already holds the request's session state.
+"""
+import argparse
+import atexit
+import http.client
+import json
+import os
+import queue
+import select
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+from flask import Flask, request, jsonify, Response, stream_with_context
+from flask_cors import CORS
+
+from config import (
+    PORT, ROUTER_WORKERS, ROUTER_WORKER_BASE_PORT, ROUTER_WORKER_START_TIMEOUT_S,
+    REQUEST_TIMEOUT_S, BATCH_MAX_ITEMS
+)
+from response_cache import normalize_message
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Request headers forwarded to a worker, and response headers passed back.
+FORWARD_HEADERS = ("Cache-Control", "X-Request-Id", "X-Request-Deadline-Ms")
+PASSTHROUGH_HEADERS = ("Content-Type", "Cache-Control", "Retry-After", "X-Accel-Buffering")
+
+
+# -------------------------------
+# Workers
+# -------------------------------
+class Worker:
+    def __init__(self, index, port, threads, cores):
+        self.index = index
+        self.port = port
+        self.threads = threads
+        self.cores = cores
+        self.url = f"http://127.0.0.1:{port}"
+        self.process = None
+        self.in_flight = 0
+        self.served = 0
+
+    def start(self):
+        env = dict(os.environ, LLM_PORT=str(self.port), LLM_N_THREADS=str(self.threads))
+        cores = self.cores
+
+        def pin_cores():
+            if cores and hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(0, cores)
+
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(APP_DIR, "app.py")],
+            cwd=APP_DIR,
+            env=env,
+            preexec_fn=pin_cores
+        )
+        print(f"🔄 Worker {self.index} starting on :{self.port} "
+              f"({self.threads} threads, cores {sorted(cores) if cores else 'any'})")
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def ready(self):
+        try:
+            return requests.get(f"{self.url}/ready", timeout=2).ok
+        except requests.RequestException:
+            return False
+
+    def stop(self):
+        if self.alive():
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class Router:
+    def __init__(self, workers, affinity_size=10000, affinity_slack=2):
+        self.workers = workers
+        self.affinity_size = affinity_size
+        # A session's home worker is skipped when it has this many more
+        # in-flight requests than the least-loaded worker.
+        self.affinity_slack = affinity_slack
+        self._affinity = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"affinity_hits": 0, "affinity_misses": 0, "retries": 0, "disconnects": 0}
+
+    def pick(self, session_id, exclude=()):
+        with self._lock:
+            candidates = [w for w in self.workers if w.alive() and w not in exclude]
+            if not candidates:
+                return None
+            least = min(candidates, key=lambda w: (w.in_flight, w.served))
+
+            home = self._affinity.get(session_id) if session_id else None
+            if home in candidates and home.in_flight <= least.in_flight + self.affinity_slack:
+                self._counters["affinity_hits"] += 1
+                chosen = home
+            else:
+                if session_id:
+                    self._counters["affinity_misses"] += 1
+                chosen = least
+
+            chosen.in_flight += 1
+            return chosen
+
+    def acquire(self, worker):
+        with self._lock:
+            worker.in_flight += 1
+
+    def release(self, worker):
+        with self._lock:
+            worker.in_flight -= 1
+            worker.served += 1
+
+    def remember(self, session_id, worker):
+        with self._lock:
+            self._affinity[session_id] = worker
+            self._affinity.move_to_end(session_id)
+            while len(self._affinity) > self.affinity_size:
+                self._affinity.popitem(last=False)
+
+    def count(self, key):
+        with self._lock:
+            self._counters[key] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": [{
+                    "index": w.index,
+                    "port": w.port,
+                    "threads": w.threads,
+                    "alive": w.alive(),
+                    "in_flight": w.in_flight,
+                    "served": w.served
+                } for w in self.workers],
+                "pinned_sessions": len(self._affinity),
+                **self._counters
+            }
+
+
+def core_slices(n_workers, threads=None):
+    """Split the usable cores into n_workers contiguous slices."""
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    per_worker = threads or max(1, len(cores) // n_workers)
+    slices = []
+    for i in range(n_workers):
+        chunk = cores[i * per_worker:(i + 1) * per_worker]
+        slices.append(set(chunk) if len(chunk) == per_worker else set())
+    return per_worker, slices
+
+
+# -------------------------------
+# Flask Router App
+# -------------------------------
+app = Flask(__name__)
+CORS(app)
+
+router = None
+
+
+def client_disconnected(environ):
+    """True once the client has closed its connection (same check as app.py)."""
+    sock = environ.get("werkzeug.socket") or environ.get("gunicorn.socket")
+    if sock is None:
+        return False
+    try:
+        return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b""
+    except (BlockingIOError, InterruptedError):
+        return False
+    except OSError:
+        return True
+
+
+def post_watching(url, data, headers, environ, poll_interval=0.25):
+    """
+    POST for the non-streaming endpoints that gives up when our own client
+    goes away. The worker only answers once generation is done, so this
+    waits for the response on the raw socket and polls the client meanwhile;
+    closing the connection makes the worker's client_disconnected() see EOF
+    and cancel the job. Returns (status, headers, body), or None when the
+    client disconnected.
+    """
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=5)
+    try:
+        conn.request("POST", parts.path, body=json.dumps(data).encode("utf-8"),
+                     headers=dict(headers, **{"Content-Type": "application/json"}))
+        deadline = time.monotonic() + REQUEST_TIMEOUT_S * 5
+        while not select.select([conn.sock], [], [], poll_interval)[0]:
+            if client_disconnected(environ):
+                return None
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"No response from {url}")
+        response = conn.getresponse()
+        return response.status, response.getheaders(), response.read()
+    finally:
+        conn.close()
+
+
+def forward(path, data, stream):
+    session_id = data.get("session_id")
+    headers = {k: v for k, v in request.headers.items() if k in FORWARD_HEADERS}
+    environ = request.environ
+    # A worker answers an item at most its deadline after the previous one
+    try:
+        item_timeout = max(REQUEST_TIMEOUT_S * 5, float(data.get("deadline_ms") or 0) / 1000 + REQUEST_TIMEOUT_S)
+    except (TypeError, ValueError):
+        item_timeout = REQUEST_TIMEOUT_S * 5
+    tried = []
+
+    while True:
+        worker = router.pick(session_id, exclude=tried)
+        if worker is None:
+            return jsonify({"success": False, "error": "No LLM worker available"}), 503
+
+        try:
+            if stream:
+                upstream = requests.post(
+                    f"{worker.url}{path}", json=data, headers=headers,
+                    stream=True, timeout=(5, REQUEST_TIMEOUT_S * 5)
+                )
+                status, upstream_headers = upstream.status_code, upstream.headers.items()
+            else:
+                answer = post_watching(f"{worker.url}{path}", data, headers, environ)
+                if answer is None:
+                    # Nobody is listening any more; the worker has stopped generating.
+                    router.release(worker)
+                    router.count("disconnects")
+                    return jsonify({"success": False, "error": "Client disconnected"}), 499
+                status, upstream_headers, body = answer
+        except (requests.RequestException, http.client.HTTPException, OSError) as e:
+            print(f"⚠️ Worker {worker.index} unreachable:", str(e))
+            router.release(worker)
+            tried.append(worker)
+            router.count("retries")
+            continue
+
+        if status == 429 and len(tried) + 1 < len(router.workers):
+            # That worker's queue is full; try the next one before giving up.
+            if stream:
+                upstream.close()
+            router.release(worker)
+            tried.append(worker)
+            router.count("retries")
+            continue
+        break
+
+    if status < 400 and session_id:
+        router.remember(session_id, worker)
+
+    response_headers = {k: v for k, v in upstream_headers if k in PASSTHROUGH_HEADERS}
+    response_headers["X-LLM-Worker"] = str(worker.index)
+
+    if not stream:
+        router.release(worker)
+        return Response(body, status=status, headers=response_headers)
+
+    def relay():
+        try:
+            for chunk in upstream.iter_content(chunk_size=None):
+                yield chunk
+        finally:
+            upstream.close()
+            router.release(worker)
+
+    return Response(stream_with_context(relay()), status=status, headers=response_headers)
+
+
+@app.route("/health", methods=["GET"])
+def health():
+    alive = sum(1 for w in router.workers if w.alive())
+    return jsonify({
+        "status": "ok" if alive else "down",
+        "mode": "router",
+        "workers_alive": alive,
+        "workers": len(router.workers)
+    }), 200 if alive else 503
+
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    ready_workers = sum(1 for w in router.workers if w.alive() and w.ready())
+    return jsonify({
+        "ready": ready_workers > 0,
+        "workers_ready": ready_workers,
+        "workers": len(router.workers)
+    }), 200 if ready_workers else 503
+
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    workers = []
+    for w in router.workers:
+        try:
+            workers.append(requests.get(f"{w.url}/stats", timeout=2).json())
+        except requests.RequestException:
+            workers.append(None)
+    return jsonify({"router": router.stats(), "workers": workers})
+
+
+@app.route("/chatbot", methods=["POST"])
+def chatbot():
+    return forward("/chatbot", request.get_json(silent=True) or {}, stream=False)
+
+
+@app.route("/chatbot/stream", methods=["POST"])
+def chatbot_stream():
+    return forward("/chatbot/stream", request.get_json(silent=True) or {}, stream=True)
+
+
+@app.route("/disease-cure", methods=["POST"])
+def disease_cure():
+    return forward("/disease-cure", request.get_json(silent=True) or {}, stream=False)
+
+
+@app.route("/chatbot/batch", methods=["POST"])
+def chatbot_batch():
+    """
+    Split a batch across the live workers (identical questions stay together
+    so the worker can dedupe them) and merge their NDJSON streams, mapping
+    each line's index back to the original position.
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get("messages")
+    if not isinstance(items, list) or not items:
+        return jsonify({"success": False, "error": "messages must be a non-empty list"}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"success": False, "error": f"At most {BATCH_MAX_ITEMS} messages per batch"}), 413
+
+    workers = [w for w in router.workers if w.alive()]
+    if not workers:
+        return jsonify({"success": False, "error": "No LLM worker available"}), 503
+
+    groups = {}
+    for index, item in enumerate(items):
+        message = item.get("message") if isinstance(item, dict) else item
+        groups.setdefault(normalize_message(str(message or "")), []).append(index)
+    shards = [[] for _ in workers]
+    for indexes in sorted(groups.values(), key=len, reverse=True):
+        min(shards, key=len).extend(indexes)
+    assigned = [(w, shard) for w, shard in zip(workers, shards) if shard]
+
+    headers = {k: v for k, v in request.headers.items() if k in FORWARD_HEADERS}
+    environ = request.environ
+    # A worker answers an item at most its deadline after the previous one
+    try:
+        item_timeout = max(REQUEST_TIMEOUT_S * 5, float(data.get("deadline_ms") or 0) / 1000 + REQUEST_TIMEOUT_S)
+    except (TypeError, ValueError):
+        item_timeout = REQUEST_TIMEOUT_S * 5
+    lines = queue.Queue()
+    # Set once the client is gone (merge() exits): shards stop reading and
+    # close their upstream, so each worker sees EOF and cancels what is left
+    stop = threading.Event()
+
+    def failure(i, error):
+        # Same shape as the worker's error lines, id included
+        item_id = items[i].get("id") if isinstance(items[i], dict) else None
+        return {"index": i, "id": item_id, "success": False, "error": error}
+
+    def run_shard(worker, shard):
+        body = dict(data, messages=[items[i] for i in shard])
+        router.acquire(worker)
+        try:
+            with requests.post(f"{worker.url}/chatbot/batch", json=body, headers=headers,
+                               stream=True, timeout=(5, item_timeout)) as upstream:
+                if not upstream.ok:
+                    for i in shard:
+                        lines.put(failure(i, f"Worker {worker.index}: HTTP {upstream.status_code}"))
+                    lines.put({"done": True, "failed": len(shard)})
+                    return
+                for raw in upstream.iter_lines(decode_unicode=True):
+                    if stop.is_set():
+                        upstream.close()
+                        return
+                    if raw:
+                        payload = json.loads(raw)
+                        if "index" in payload:
+                            payload["index"] = shard[payload["index"]]
+                        payload["worker"] = worker.index
+                        lines.put(payload)
+        except requests.RequestException as e:
+            print(f"⚠️ Worker {worker.index} batch failed:", str(e))
+            lines.put({"shard_error": True, "shard": shard, "error": str(e)})
+        finally:
+            router.release(worker)
+            lines.put(None)
+
+    for worker, shard in assigned:
+        threading.Thread(target=run_shard, args=(worker, shard), daemon=True).start()
+
+    def merge():
+        started = time.time()
+        answered = set()
+        summary = {"done": True, "items": len(items), "unique": 0, "cached": 0, "generated": 0, "failed": 0}
+        remaining = len(assigned)
+        try:
+            while remaining:
+                try:
+                    payload = lines.get(timeout=0.25)
+                except queue.Empty:
+                    if client_disconnected(environ):
+                        router.count("disconnects")
+                        return
+                    continue
+                if payload is None:
+                    remaining -= 1
+                elif payload.get("done"):
+                    for k in ("unique", "cached", "generated", "failed"):
+                        summary[k] += payload.get(k, 0)
+                elif payload.get("shard_error"):
+                    # Connection dropped mid-stream: fail whatever that worker had not answered.
+                    for i in payload["shard"]:
+                        if i not in answered:
+                            summary["failed"] += 1
+                            yield json.dumps(failure(i, payload["error"]), ensure_ascii=False) + "\n"
+                else:
+                    answered.add(payload["index"])
+                    yield json.dumps(payload, ensure_ascii=False) + "\n"
+            summary["workers"] = len(assigned)
+            summary["total_ms"] = round((time.time() - started) * 1000, 1)
+            yield json.dumps(summary) + "\n"
+        finally:
+            # Also runs when the server closes the generator on a failed write
+            stop.set()
+
+    return Response(stream_with_context(merge()), mimetype="application/x-ndjson",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# -------------------------------
+# Startup
+# -------------------------------
+def start_workers(n_workers, threads, base_port):
+    per_worker, slices = core_slices(n_workers, threads)
+    workers = [Worker(i, base_port + i, per_worker, slices[i]) for i in range(n_workers)]
+    for w in workers:
+        w.start()
+
+    def stop_all(*_):
+        for w in workers:
+            w.stop()
+
+    atexit.register(stop_all)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    deadline = time.time() + ROUTER_WORKER_START_TIMEOUT_S
+    pending = list(workers)
+    while pending and time.time() < deadline:
+        pending = [w for w in pending if w.alive() and not w.ready()]
+        if any(not w.alive() for w in workers):
+            raise RuntimeError("An LLM worker exited during startup")
+        time.sleep(1)
+    if pending:
+        raise RuntimeError(f"{len(pending)} LLM worker(s) not ready after {ROUTER_WORKER_START_TIMEOUT_S:.0f}s")
+
+    print(f"✅ {n_workers} LLM workers ready ({per_worker} threads each)")
+    return workers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=ROUTER_WORKERS)
+    parser.add_argument("--threads", type=int, default=None, help="threads per worker (default: cores / workers)")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--base-port", type=int, default=ROUTER_WORKER_BASE_PORT)
+    args = parser.parse_args()
+
+    router = Router(start_workers(args.workers, args.threads, args.base_port))
+    app.run(host="0.0.0.0", port=args.port, debug=False, threaded=True)
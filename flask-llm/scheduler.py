@@ -0,0 +1,237 @@
+import itertools
+import math
+import queue
+import threading
+import time
+from collections import deque
+
+# -------------------------------
+# Inference Scheduler
+# -------------------------------
+# A llama.cpp context is not safe for concurrent use, so exactly one worker
+# thread owns the model. Request threads submit jobs into a bounded priority
+# queue and wait for the result (or for streamed tokens). With a `loader`,
+# that thread also creates the model before taking its first job.
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+_DONE = object()
+
+
+class SchedulerOverloaded(Exception):
+    """Queue is full; the caller should retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """The job could not start before its deadline."""
+
+    def __init__(self, retry_after):
+        super().__init__("Request deadline expired while waiting in queue")
+        self.retry_after = retry_after
+
+
+class JobCancelled(Exception):
+    """The caller went away before the job started."""
+
+    def __init__(self):
+        super().__init__("Request was cancelled before it started")
+
+
+class Job:
+    def __init__(self, fn, priority, deadline, stream):
+        self.fn = fn
+        self.priority = priority
+        self.deadline = deadline
+        self.stream = stream
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+        self.cancelled = False
+        self.result_value = None
+        self.error = None
+        self._events = queue.Queue() if stream else None
+        self._done = threading.Event()
+
+    @property
+    def queue_wait(self):
+        end = self.started_at if self.started_at is not None else time.monotonic()
+        return end - self.enqueued_at
+
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def emit(self, item):
+        """Push a partial result (e.g. one token) to a streaming caller."""
+        if self._events is not None:
+            self._events.put(item)
+
+    def cancel(self):
+        """Ask the worker to skip this job, or to stop it at the next token."""
+        self.cancelled = True
+
+    def should_stop(self):
+        """Checked by the running job between tokens."""
+        return self.cancelled or self.expired()
+
+    def _finish(self, value=None, error=None):
+        self.result_value = value
+        self.error = error
+        self._done.set()
+        if self._events is not None:
+            self._events.put(_DONE)
+
+    def _wait_for_start(self, should_cancel=None):
+        """Block until the job is picked up, its queue deadline passes or the caller goes away."""
+        while not self._done.is_set() and self.started_at is None:
+            if self.expired():
+                self.cancel()
+                if self.started_at is None:
+                    raise DeadlineExceeded(retry_after=1)
+                return
+            if should_cancel is not None and should_cancel():
+                self.cancel()
+                if self.started_at is None:
+                    raise JobCancelled()
+                return
+            self._done.wait(0.05)
+
+    def result(self, should_cancel=None, poll_interval=0.25):
+        """
+        Wait for the job. `should_cancel` is polled while waiting (e.g. to
+        detect a disconnected client) and cancels the job when it returns True.
+        """
+        self._wait_for_start(should_cancel)
+        while not self._done.wait(poll_interval):
+            if should_cancel is not None and not self.cancelled and should_cancel():
+                self.cancel()
+        if self.error is not None:
+            raise self.error
+        return self.result_value
+
+    def events(self):
+        """Yield emitted items until the job finishes, then the final result."""
+        self._wait_for_start()
+        while True:
+            item = self._events.get()
+            if item is _DONE:
+                break
+            yield item
+        if self.error is not None:
+            raise self.error
+
+
+class InferenceScheduler:
+    def __init__(self, llm=None, max_queue=32, stats_window=500, loader=None):
+        self.llm = llm
+        self._loader = loader
+        self.max_queue = max_queue
+        self._queue = queue.PriorityQueue(maxsize=max_queue)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._busy = False
+        self._waits = deque(maxlen=stats_window)
+        self._service_times = deque(maxlen=stats_window)
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0,
+                          "rejected": 0, "expired": 0, "cancelled": 0}
+        self._worker = threading.Thread(target=self._run, name="llm-worker", daemon=True)
+        self._worker.start()
+
+    # ---------- submission ----------
+    def submit(self, fn, priority="normal", timeout=None, stream=False):
+        """
+        Queue `fn(llm, job)` for the inference worker.
+        Raises SchedulerOverloaded immediately if the queue is full.
+        """
+        level = PRIORITIES.get(priority, PRIORITIES["normal"])
+        deadline = time.monotonic() + timeout if timeout else None
+        job = Job(fn, level, deadline, stream)
+
+        try:
+            self._queue.put_nowait((level, next(self._seq), job))
+        except queue.Full:
+            with self._lock:
+                self._counters["rejected"] += 1
+            raise SchedulerOverloaded(retry_after=self.estimate_wait())
+
+        with self._lock:
+            self._counters["submitted"] += 1
+        return job
+
+    def estimate_wait(self):
+        """Rough seconds until a newly queued job would start."""
+        with self._lock:
+            avg = (sum(self._service_times) / len(self._service_times)
+                   if self._service_times else 1.0)
+        ahead = self._queue.qsize() + (1 if self._busy else 0)
+        return max(1, math.ceil(avg * ahead))
+
+    # ---------- worker ----------
+    def _run(self):
+        if self._loader is not None:
+            try:
+                self.llm = self._loader()
+            except Exception:
+                # The loader reports its own failure; queued jobs then fail
+                # with whatever calling into a missing model raises.
+                pass
+
+        while True:
+            _, _, job = self._queue.get()
+
+            if job.expired():
+                self._count("expired")
+                job._finish(error=DeadlineExceeded(retry_after=self.estimate_wait()))
+                continue
+
+            if job.cancelled:
+                self._count("cancelled")
+                job._finish(error=JobCancelled())
+                continue
+
+            job.started_at = time.monotonic()
+            self._busy = True
+            try:
+                value = job.fn(self.llm, job)
+                self._count("completed")
+                job._finish(value=value)
+            except Exception as e:
+                self._count("failed")
+                job._finish(error=e)
+            finally:
+                self._busy = False
+                with self._lock:
+                    self._waits.append(job.queue_wait)
+                    self._service_times.append(time.monotonic() - job.started_at)
+
+    def _count(self, key):
+        with self._lock:
+            self._counters[key] += 1
+
+    # ---------- stats ----------
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._waits)
+            service = list(self._service_times)
+            counters = dict(self._counters)
+
+        def pct(p):
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1)
+
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            "busy": self._busy,
+            "wait_ms": {
+                "avg": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                "p50": pct(0.50),
+                "p95": pct(0.95),
+                "max": round(waits[-1] * 1000, 1) if waits else 0.0
+            },
+            "avg_service_ms": round(sum(service) / len(service) * 1000, 1) if service else 0.0,
+            **counters
+        }
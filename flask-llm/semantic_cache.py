@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from response_cache import normalize_message
+
+# -------------------------------
+# Semantic Answer Cache
+# -------------------------------
+# Serves a previous answer when a new question is a near-duplicate of one
+# already answered ("fertilizer bag info" vs "INFORMATION REGARDING
+# FERTILIZER BAGS?"). Questions are embedded with the same MiniLM model the
+# RAG pipeline uses and kept in a small in-memory FAISS inner-product index
+# (embeddings are normalized, so inner product == cosine similarity).
+# Entries are keyed on the normalized free-form question only: app.py uses
+# it for /chatbot and /chatbot/stream, never for templated prompts (batch
+# items, /disease-cure), where two questions differing only in the entity
+# embed as near-duplicates but need different answers.
+# The encoder is loaded by load(), after the LLM, so importing torch does not
+# delay the service's liveness; until then every lookup is a miss.
+
+
+class SemanticCache:
+    def __init__(self, model_name, threshold=0.92, max_entries=1024, ttl_s=86400, enabled=True, candidates=8):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        # Neighbours checked per lookup, so an expired best match does not hide a live one.
+        self.candidates = candidates
+        self.enabled = enabled and max_entries > 0
+        self._encoder = None
+        self._index = None
+        self._entries = OrderedDict()  # id -> (question, value, created_at)
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._lookup_ms = 0.0
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+
+    def load(self):
+        if not self.enabled:
+            return
+        try:
+            import faiss
+            from sentence_transformers import SentenceTransformer
+        except ImportError:  # optional dependencies
+            print("⚠️ Semantic cache disabled: install sentence-transformers and faiss-cpu")
+            self.enabled = False
+            return
+
+        try:
+            encoder = SentenceTransformer(self.model_name, device="cpu")
+            dim = encoder.get_sentence_embedding_dimension()
+        except Exception as e:  # download / load failure; the cache is optional
+            print(f"⚠️ Semantic cache disabled: could not load {self.model_name}: {e}")
+            self.enabled = False
+            return
+        with self._lock:
+            self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+            self._encoder = encoder
+        print(f"✅ Semantic cache ready ({self.model_name}, threshold {self.threshold})")
+
+    @property
+    def loaded(self):
+        return self.enabled and self._encoder is not None
+
+    def _embed(self, text):
+        vector = self._encoder.encode([normalize_message(text)], normalize_embeddings=True)
+        return np.asarray(vector, dtype="float32")
+
+    def lookup(self, question):
+        """Return (value, similarity) for the closest cached question above the threshold."""
+        if not self.loaded:
+            return None, 0.0
+
+        started = time.perf_counter()
+        vector = self._embed(question)
+
+        with self._lock:
+            similarity, match = 0.0, None
+            if self._index.ntotal:
+                scores, ids = self._index.search(vector, min(self.candidates, self._index.ntotal))
+                similarity = float(scores[0][0])
+                for score, entry_id in zip(scores[0].tolist(), ids[0].tolist()):
+                    if score < self.threshold:
+                        break
+                    entry = self._entries.get(entry_id)
+                    if entry is None:
+                        continue
+                    if time.time() - entry[2] > self.ttl_s:
+                        self._remove(entry_id)
+                        self._counters["expired"] += 1
+                        continue
+                    self._entries.move_to_end(entry_id)
+                    similarity, match = score, entry[1]
+                    break
+
+            self._counters["hits" if match is not None else "misses"] += 1
+            self._lookup_ms = round((time.perf_counter() - started) * 1000, 2)
+            return match, round(similarity, 4)
+
+    def add(self, question, value):
+        if not self.loaded:
+            return
+
+        vector = self._embed(question)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.array([entry_id], dtype="int64"))
+            self._entries[entry_id] = (question, value, time.time())
+            self._counters["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+
+    def _remove(self, entry_id):
+        self._entries.pop(entry_id, None)
+        self._index.remove_ids(np.array([entry_id], dtype="int64"))
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "enabled": self.enabled,
+                "loaded": self.loaded,
+                "model": self.model_name,
+                "threshold": self.threshold,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "last_lookup_ms": self._lookup_ms,
+                "hit_rate": round(self._counters["hits"] / lookups, 3) if lookups else 0.0,
+                **self._counters
+            }
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+
+from prefix_cache import compact_state, state_bytes
+
+# -------------------------------
+# Session State Cache
+# -------------------------------
+# Keeps, per session_id, the token history of the conversation and the
+# llama.cpp state after the last turn. Restoring it means a follow-up turn
+# only prefills the new message. Bounded by a memory budget (LRU) and a TTL.
+
+
+class SessionEntry:
+    def __init__(self, tokens, state):
+        self.tokens = tokens
+        self.state = state
+        self.size = state_bytes(state)
+        self.turns = 1
+        self.last_used = time.monotonic()
+
+
+class SessionStore:
+    def __init__(self, max_bytes, ttl_s):
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "expired": 0,
+                          "evictions": 0, "overflows": 0}
+
+    def __contains__(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            return entry is not None and time.monotonic() - entry.last_used <= self.ttl_s
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            if time.monotonic() - entry.last_used > self.ttl_s:
+                self._remove(session_id)
+                self._counters["expired"] += 1
+                self._counters["misses"] += 1
+                return None
+            entry.last_used = time.monotonic()
+            self._entries.move_to_end(session_id)
+            self._counters["hits"] += 1
+            return entry
+
+    def put(self, session_id, tokens, state):
+        entry = SessionEntry(tokens, compact_state(state))
+        with self._lock:
+            previous = self._entries.get(session_id)
+            if previous is not None:
+                entry.turns = previous.turns + 1
+                self._remove(session_id)
+            if entry.size > self.max_bytes:
+                return
+            self._entries[session_id] = entry
+            self._bytes += entry.size
+            self._evict()
+
+    def drop(self, session_id, reason="overflows"):
+        """Forget a session, e.g. when its history no longer fits the context."""
+        with self._lock:
+            if session_id in self._entries:
+                self._remove(session_id)
+                self._counters[reason] += 1
+
+    def _remove(self, session_id):
+        entry = self._entries.pop(session_id)
+        self._bytes -= entry.size
+
+    def _evict(self):
+        now = time.monotonic()
+        for session_id in [k for k, e in self._entries.items() if now - e.last_used > self.ttl_s]:
+            self._remove(session_id)
+            self._counters["expired"] += 1
+        while self._bytes > self.max_bytes and self._entries:
+            session_id = next(iter(self._entries))
+            self._remove(session_id)
+            self._counters["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "sessions": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_s": self.ttl_s,
+                "hit_rate": round(self._counters["hits"] / lookups, 3) if lookups else 0.0,
+                **self._counters
+            }
@@ -0,0 +1,117 @@
+import numpy as np
+
+# -------------------------------
+# Speculative Decoding
+# -------------------------------
+# llama-cpp-python verifies draft tokens in the same batch as the next real
+# token, so every accepted draft token is a decode step saved. Two drafters:
+#   prompt_lookup - copy the continuation of the last n-gram seen earlier in
+#                   the context (no extra model; good when answers quote the
+#                   question or repeat themselves)
+#   draft         - greedy tokens from a small GGUF sharing the main
+#                   model's tokenizer (e.g. Llama-3.2-1B for Llama-3.1-8B)
+# Every token is still sampled from the main model's logits; drafts that
+# disagree are discarded, so only speed changes.
+
+
+class SampledTokens:
+    """
+    Logits processor that only counts. llama-cpp-python calls it once per
+    sampled token (with speculative decoding: once per verified position),
+    which streamed text chunks are not: text is held back and merged for
+    partial UTF-8 characters (Devanagari) and possible stop sequences.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, input_ids, scores):
+        self.count += 1
+        return scores
+
+
+class CountingDraft:
+    """
+    Wraps a draft model and counts proposals, so we can report acceptance.
+    Only called from the inference worker thread.
+    """
+
+    def __init__(self, drafter, mode):
+        self.drafter = drafter
+        self.mode = mode
+        self.steps = 0
+        self.proposed = 0
+        self.accepted = 0
+
+    def __call__(self, input_ids, **kwargs):
+        draft = self.drafter(input_ids, **kwargs)
+        self.steps += 1
+        self.proposed += len(draft)
+        return draft
+
+    def snapshot(self):
+        return self.steps, self.proposed
+
+    def settle(self, before, completion_tokens):
+        """
+        Per-request numbers since `before`. Each verification step yields one
+        sampled token plus the accepted drafts, so after the first token
+        accepted = generated - 1 - steps.
+        """
+        steps = self.steps - before[0]
+        proposed = self.proposed - before[1]
+        accepted = min(proposed, max(0, completion_tokens - 1 - steps))
+        self.accepted += accepted
+        return {
+            "mode": self.mode,
+            "steps": steps,
+            "proposed": proposed,
+            "accepted": accepted,
+            "acceptance_rate": round(accepted / proposed, 3) if proposed else None
+        }
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "steps": self.steps,
+            "proposed": self.proposed,
+            "accepted": self.accepted,
+            "acceptance_rate": round(self.accepted / self.proposed, 3) if self.proposed else None
+        }
+
+
+class GGUFDraft:
+    """A small GGUF decoded greedily; same call signature as LlamaDraftModel."""
+
+    def __init__(self, model_path, num_pred_tokens=10, **llama_kwargs):
+        from llama_cpp import Llama
+        self.llm = Llama(model_path=model_path, **llama_kwargs)
+        self.num_pred_tokens = num_pred_tokens
+
+    def __call__(self, input_ids, **kwargs):
+        # generate() reuses the draft model's own KV prefix, so only the
+        # tokens accepted since the last step are evaluated.
+        draft = []
+        for token in self.llm.generate(input_ids.tolist(), temp=0.0, top_k=1, repeat_penalty=1.0):
+            draft.append(token)
+            if len(draft) >= self.num_pred_tokens:
+                break
+        return np.array(draft, dtype=np.intc)
+
+
+def build_draft_model(mode, num_pred_tokens=10, max_ngram_size=2, draft_model_path=None, **llama_kwargs):
+    """Return a CountingDraft for LLM_SPECULATIVE, or None when it is off."""
+    if mode in ("", "off", "0"):
+        return None
+
+    if mode == "prompt_lookup":
+        from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
+        drafter = LlamaPromptLookupDecoding(max_ngram_size=max_ngram_size, num_pred_tokens=num_pred_tokens)
+    elif mode == "draft":
+        if not draft_model_path:
+            raise ValueError("LLM_SPECULATIVE=draft needs LLM_DRAFT_MODEL_PATH")
+        drafter = GGUFDraft(draft_model_path, num_pred_tokens, **llama_kwargs)
+    else:
+        raise ValueError(f"Unknown LLM_SPECULATIVE mode: {mode!r}")
+
+    return CountingDraft(drafter, mode)
@@ -0,0 +1,68 @@
+import threading
+import time
+
+# -------------------------------
+# Startup Sequence
+# -------------------------------
+# The Flask app answers /health as soon as it is imported; the model is
+# loaded and warmed on the inference worker thread afterwards. This tracks
+# which phase we are in and how long each one took, for /ready and the logs:
+#   starting -> loading_model -> warming_prefix -> warming_up
+#            -> loading_embedder -> ready   (or failed)
+
+
+class Startup:
+    def __init__(self):
+        self.phase = "starting"
+        self.error = None
+        self.timings_ms = {}
+        self._started = time.time()
+        self._phase_started = self._started
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def _close_phase(self, now):
+        if self.phase not in ("starting", "ready", "failed"):
+            self.timings_ms[self.phase] = round((now - self._phase_started) * 1000, 1)
+            print(f"✅ {self.phase} took {self.timings_ms[self.phase] / 1000:.1f}s")
+
+    def enter(self, phase):
+        now = time.time()
+        with self._lock:
+            self._close_phase(now)
+            self.phase = phase
+            self._phase_started = now
+        print(f"🔄 Startup: {phase}...")
+
+    def ready(self):
+        now = time.time()
+        with self._lock:
+            self._close_phase(now)
+            self.phase = "ready"
+            self.timings_ms["total"] = round((now - self._started) * 1000, 1)
+        self._ready.set()
+        print(f"✅ Ready in {self.timings_ms['total'] / 1000:.1f}s")
+
+    def fail(self, error):
+        with self._lock:
+            self.phase = "failed"
+            self.error = str(error)
+        print("❌ Startup failed:", str(error))
+
+    @property
+    def is_ready(self):
+        return self._ready.is_set()
+
+    @property
+    def failed(self):
+        return self.phase == "failed"
+
+    def stats(self):
+        with self._lock:
+            return {
+                "phase": self.phase,
+                "ready": self.is_ready,
+                "uptime_s": round(time.time() - self._started, 1),
+                "timings_ms": dict(self.timings_ms),
+                "error": self.error
+            }
@@ -0,0 +1,135 @@
+import random
+import re
+import time
+import zlib
+
+import numpy as np
+
+from config import STUB_PREFILL_MS, STUB_DECODE_MS, STUB_COMPLETION_TOKENS
+
+# -------------------------------
+# Stub Llama Backend
+# -------------------------------
+# Stand-in for llama_cpp.Llama with deterministic fake timing, so the service
+# and the load-testing suite run without the 8B GGUF (LLM_BACKEND=stub).
+# It implements only what app.py uses: tokenize, eval, reset, save/load_state,
+# KV prefix matching, logits processors and streaming completions. Prefill
+# costs STUB_PREFILL_MS per uncached prompt token, decode STUB_DECODE_MS per
+# token. Like llama.cpp, a sampled token is only evaluated into the context
+# when the next one is sampled, so the last one never is.
+
+BOS = 1
+VOCAB_SIZE = 32000
+
+WORDS = (
+    "soil crop seed water irrigation fertilizer urea compost yield farmer field "
+    "spray neem pest disease leaf root harvest sowing rabi kharif scheme subsidy "
+    "apply acre week morning evening monitor check moisture nitrogen potash"
+).split()
+
+
+class LogitsProcessorList(list):
+    def __call__(self, input_ids, scores):
+        for processor in self:
+            scores = processor(input_ids, scores)
+        return scores
+
+
+class StubState:
+    def __init__(self, input_ids, n_tokens, llama_state_size):
+        self.input_ids = input_ids
+        self.scores = np.zeros((1, 8), dtype=np.single)
+        self.n_tokens = n_tokens
+        self.llama_state_size = llama_state_size
+
+
+class StubLlama:
+    # Rough KV footprint of one token for an 8B model, so session/prefix
+    # memory accounting behaves like the real thing.
+    KV_BYTES_PER_TOKEN = 128 * 1024
+
+    def __init__(self, model_path=None, n_ctx=4096, prefill_ms=STUB_PREFILL_MS,
+                 decode_ms=STUB_DECODE_MS, completion_tokens=STUB_COMPLETION_TOKENS, **kwargs):
+        self.model_path = model_path
+        self._n_ctx = n_ctx
+        self.prefill_s = prefill_ms / 1000
+        self.decode_s = decode_ms / 1000
+        self.completion_tokens = completion_tokens
+        self.input_ids = np.zeros((n_ctx,), dtype=np.intc)
+        self.n_tokens = 0
+        self._vocab = {}
+
+    # ---------- tokenizer ----------
+    def tokenize(self, text, add_bos=True, special=False):
+        tokens = [BOS] if add_bos else []
+        for piece in re.findall(r"\s*\S+", text.decode("utf-8", errors="ignore")):
+            token = 256 + zlib.crc32(piece.encode("utf-8")) % (VOCAB_SIZE - 256)
+            self._vocab[token] = piece
+            tokens.append(token)
+        return tokens
+
+    def detokenize(self, tokens, **kwargs):
+        return "".join(self._vocab.get(t, "") for t in tokens).encode("utf-8")
+
+    def n_ctx(self):
+        return self._n_ctx
+
+    # ---------- KV cache ----------
+    def reset(self):
+        self.n_tokens = 0
+
+    def eval(self, tokens):
+        time.sleep(len(tokens) * self.prefill_s)
+        self.input_ids[self.n_tokens:self.n_tokens + len(tokens)] = tokens
+        self.n_tokens += len(tokens)
+
+    def save_state(self):
+        return StubState(self.input_ids[:self.n_tokens].copy(), self.n_tokens,
+                         self.n_tokens * self.KV_BYTES_PER_TOKEN)
+
+    def load_state(self, state):
+        self.input_ids[:state.n_tokens] = state.input_ids[:state.n_tokens]
+        self.n_tokens = state.n_tokens
+
+    # ---------- generation ----------
+    def __call__(self, prompt, stream=False, max_tokens=16, stop=None, logits_processor=None, **kwargs):
+        tokens = prompt if isinstance(prompt, list) else self.tokenize(prompt.encode("utf-8"), special=True)
+        chunks = self._generate(tokens, max_tokens, logits_processor)
+        if stream:
+            return chunks
+
+        text, finish_reason = "", None
+        for chunk in chunks:
+            text += chunk["choices"][0]["text"]
+            finish_reason = chunk["choices"][0]["finish_reason"] or finish_reason
+        return {"choices": [{"text": text, "index": 0, "finish_reason": finish_reason}]}
+
+    def _generate(self, tokens, max_tokens, logits_processor=None):
+        # Reuse the longest cached prefix, like llama-cpp-python does.
+        cached = 0
+        for a, b in zip(self.input_ids[:self.n_tokens].tolist(), tokens):
+            if a != b:
+                break
+            cached += 1
+        self.n_tokens = min(cached, len(tokens) - 1)
+        self.eval(tokens[self.n_tokens:])
+
+        rng = random.Random(zlib.crc32(np.asarray(tokens, dtype=np.intc).tobytes()))
+        target = int(self.completion_tokens * rng.uniform(0.75, 1.25))
+        n_generate = min(max_tokens, max(1, target), self._n_ctx - self.n_tokens)
+
+        scores = np.zeros((VOCAB_SIZE,), dtype=np.single)
+        previous = None
+        for _ in range(n_generate):
+            if previous is not None:
+                self.input_ids[self.n_tokens] = previous
+                self.n_tokens += 1
+            word = " " + rng.choice(WORDS)
+            time.sleep(self.decode_s)
+            if logits_processor is not None:
+                logits_processor(self.input_ids[:self.n_tokens], scores)
+            previous = self.tokenize(word.encode("utf-8"), add_bos=False)[0]
+            yield {"choices": [{"text": word, "index": 0, "finish_reason": None}]}
+
+        finish_reason = "length" if n_generate == max_tokens else "stop"
+        yield {"choices": [{"text": "", "index": 0, "finish_reason": finish_reason}]}
@@ -0,0 +1,111 @@
+"""
+Smoke test of the chatbot service on the stub backend (no GGUF needed).
+
+    cd flask-llm && python -m pytest -q tests
+
+Starts app.py with LLM_BACKEND=stub on a spare port and checks /chatbot,
+the exact response cache, the SSE done frame and deadline truncation.
+"""
+import json
+import os
+import sys
+
+import pytest
+import requests
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from loadtest import free_port, spawn_stub, wait_for  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def url():
+    url = f"http://127.0.0.1:{free_port()}"
+    server = spawn_stub(url.rsplit(":", 1)[1], {
+        "LLM_STUB_DECODE_MS": "5",
+        "LLM_STUB_COMPLETION_TOKENS": "60",
+        "LLM_REQUEST_LOG": "0"
+    })
+    try:
+        if not wait_for(url, 60):
+            pytest.fail("stub server did not become ready")
+        yield url
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def chat(url, **body):
+    response = requests.post(f"{url}/chatbot", json=body, timeout=30)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_chatbot_answers(url):
+    data = chat(url, message="Which fertilizer is best for wheat?", cache=False)
+    assert data["success"] is True
+    assert data["response"]
+    assert data["finish_reason"] in ("stop", "length")
+    assert data["truncated"] is False
+    assert data["cached"] is False
+    # The stub emits one word per token.
+    assert data["usage"]["completion_tokens"] == len(data["response"].split())
+    assert data["usage"]["cached_tokens"] > 0  # shared prompt prefix
+
+
+def test_repeat_is_a_cache_hit(url):
+    first = chat(url, message="How much urea per acre for paddy?")
+    again = chat(url, message="  how much UREA per acre for paddy? ")
+    assert first["cached"] is False
+    assert again["cached"] is True
+    assert again["cache"] == "exact"
+    assert again["response"] == first["response"]
+
+
+def test_session_turns_skip_the_cache(url):
+    chat(url, message="When should I sow mustard?")
+    first = chat(url, message="When should I sow mustard?", session_id="smoke-session")
+    follow_up = chat(url, message="And how much seed per acre?", session_id="smoke-session")
+    assert first["cached"] is False
+    # The follow-up is prefilled on top of the first turn's history
+    assert follow_up["usage"]["cached_tokens"] > first["usage"]["prompt_tokens"]
+
+
+def test_stream_ends_with_done_frame(url):
+    body = {"message": "When should I sow mustard?", "cache": False}
+    tokens, done, event = [], None, None
+    with requests.post(f"{url}/chatbot/stream", json=body, stream=True, timeout=30) as response:
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/event-stream")
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                payload = json.loads(line[len("data: "):])
+                if event == "done":
+                    done = payload
+                else:
+                    assert event is None, payload
+                    tokens.append(payload["token"])
+                event = None
+
+    assert done is not None
+    assert done["success"] is True
+    assert done["finish_reason"] in ("stop", "length")
+    assert done["usage"]["completion_tokens"] == len(tokens)
+
+
+def test_deadline_truncates(url):
+    # ~60 tokens at 5 ms each cannot finish in 100 ms.
+    data = chat(url, message="Explain drip irrigation for sugarcane", cache=False, deadline_ms=100)
+    assert data["truncated"] is True
+    assert data["deadline_exceeded"] is True
+    assert data["finish_reason"] == "deadline"
+    assert data["usage"]["completion_tokens"] < 45
+
+
+def test_invalid_priority_is_a_400(url):
+    response = requests.post(f"{url}/chatbot", json={"message": "Hi", "priority": ["a"]}, timeout=30)
+    assert response.status_code == 400
+    assert response.json()["success"] is False
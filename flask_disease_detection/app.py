@@ -1,149 +1,98 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Request, request, jsonify
 from flask_cors import CORS
 import torch
-import torch.nn as nn
-from torchvision import models, transforms
-from PIL import Image
+from PIL import UnidentifiedImageError
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 import os
-from werkzeug.utils import secure_filename
+import time
+import zipfile
+from werkzeug.exceptions import RequestEntityTooLarge
 import logging
 
+from backends import BACKENDS, TorchForward, build_resnet50, build_student, load_backend
+from batcher import MicroBatcher
+from cascade import Cascade
+from labels import CLASS_NAMES, NUM_CLASSES
+from prediction_cache import PredictionCache, content_hash, perceptual_hash
+from preprocess import BatchPreprocessor, decode
+
 # ---------- CONFIGURATION ----------
+class InMemoryRequest(Request):
+    """Keep uploaded files in memory (Werkzeug spools anything over 500 KB to a temp file)"""
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return BytesIO()
+
+    @property
+    def max_content_length(self):
+        """Batch uploads get their own, larger size limit"""
+        if self.path == '/detect-disease/batch':
+            return int(MAX_BATCH_UPLOAD_MB * 1024 * 1024)
+        return super().max_content_length
+
 app = Flask(__name__)
+app.request_class = InMemoryRequest
 CORS(app)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 MODEL_PATH = "trained_model/best_resnet50_3.pth"   # to use this model first download it from this drive link  --- "https://drive.google.com/file/d/1IL-BGWYyYWqAFMKVrsYTwW8kTRmHq0cb/view?usp=sharing"
-UPLOAD_FOLDER = "temp_uploads"
 IMG_SIZE = 224
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
+# CPU inference backend (see backends.py): eager, torchscript, onnx,
+# int8_dynamic or int8_static. Validate with compare_backends.py first.
+INFERENCE_BACKEND = os.environ.get("DISEASE_BACKEND", "eager")
+CALIBRATION_DIR = os.environ.get("DISEASE_CALIBRATION_DIR")
+
+# Cascade (cascade.py): a small student distilled from ResNet50
+# (distill_student.py) answers when its confidence is >= CASCADE_THRESHOLD,
+# the rest go on to ResNet50. Off unless CASCADE_MODEL_PATH is set; pick the
+# threshold with calibrate_cascade.py
+CASCADE_MODEL_PATH = os.environ.get("DISEASE_CASCADE_MODEL_PATH")
+CASCADE_ARCH = os.environ.get("DISEASE_CASCADE_ARCH", "mobilenet_v3_large")
+CASCADE_THRESHOLD = float(os.environ.get("DISEASE_CASCADE_THRESHOLD", 0.9))
+
+# Dynamic micro-batching: concurrent requests are stacked into one forward
+# pass of up to MAX_BATCH_SIZE images, waiting at most MAX_WAIT_MS for more
+MAX_BATCH_SIZE = int(os.environ.get("DISEASE_MAX_BATCH_SIZE", 16))
+MAX_WAIT_MS = float(os.environ.get("DISEASE_MAX_WAIT_MS", 10))
+
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
 
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-# Class names mapping (all 94 classes)
-CLASS_NAMES = {
-    0: "Black_Pitting_or_Banana_Rust",
-    1: "Crown_Rot",
-    2: "Healthy",
-    3: "fungal_disease",
-    4: "leaf_Banana_Scab_Moth",
-    5: "leaf_Black_Sigatoka",
-    6: "leaf_Healthy",
-    7: "Black_Leaf_Streak",
-    8: "Panama_Disease",
-    9: "Bacterial_spot_rot",
-    10: "Black_Rot",
-    11: "Downy_Mildew",
-    12: "Healthy",
-    13: "Blight",
-    14: "Common_Rust",
-    15: "Gray_Leaf_Spot",
-    16: "Healthy",
-    17: "Aphids",
-    18: "Army worm",
-    19: "Bacterial blight",
-    20: "Healthy",
-    21: "fruit_Anthracnose",
-    22: "fruit_Healthy",
-    23: "fruit_Scab",
-    24: "fruit_Styler_end_root",
-    25: "leaf_Anthracnose",
-    26: "leaf_Canker",
-    27: "leaf_Dot",
-    28: "leaf_Healthy",
-    29: "leaf_Rust",
-    30: "Cescospora Leaf Spot",
-    31: "Golden Mosaic",
-    32: "Healthy Leaf",
-    33: "Anthracnose",
-    34: "Bacterial_Canker",
-    35: "Cutting_Weevil",
-    36: "Gall_Midge",
-    37: "Healthy",
-    38: "Powdery_Mildew",
-    39: "Sooty_Mould",
-    40: "die_back",
-    41: "Anthracnose",
-    42: "BacterialSpot",
-    43: "Curl",
-    44: "Healthy",
-    45: "Mealybug",
-    46: "Mite_disease",
-    47: "Mosaic",
-    48: "Ringspot",
-    49: "Black_Scurf",
-    50: "Blackleg",
-    51: "Blackspot_Bruising",
-    52: "Brown_Rot",
-    53: "Common_Scab",
-    54: "Dry_Rot",
-    55: "Healthy_Potatoes",
-    56: "Miscellaneous",
-    57: "Pink_Rot",
-    58: "Soft_Rot",
-    59: "Blast",
-    60: "Brownspot",
-    61: "Tungro",
-    62: "bacterial_leaf_blight",
-    63: "bacterial_leaf_streak",
-    64: "bacterial_panicle_blight",
-    65: "dead_heart",
-    66: "downy_mildew",
-    67: "hispa",
-    68: "normal",
-    69: "Healthy",
-    70: "Mosaic",
-    71: "RedRot",
-    72: "Rust",
-    73: "Yellow",
-    74: "Anthracnose",
-    75: "algal_leaf",
-    76: "bird_eye_spot",
-    77: "brown_blight",
-    78: "gray_light",
-    79: "healthy",
-    80: "red_leaf_spot",
-    81: "white_spot",
-    82: "Bacterial_Spot",
-    83: "Early_Blight",
-    84: "Late_Blight",
-    85: "Leaf_Mold",
-    86: "Septoria_Leaf_Spot",
-    87: "Spider_Mites_Two-spotted_Spider_Mite",
-    88: "Target_Spot",
-    89: "Yellow_Leaf_Curl_Virus",
-    90: "healthy",
-    91: "Healthy",
-    92: "septoria",
-    93: "stripe_rust"
-}
-
-NUM_CLASSES = len(CLASS_NAMES)
-
-# Image preprocessing
-transform = transforms.Compose([
-    transforms.Resize((IMG_SIZE, IMG_SIZE)),
-    transforms.ToTensor(),
-    transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-])
+# Uploads are decoded in memory, so cap the request size (larger bodies get a 413)
+MAX_UPLOAD_MB = float(os.environ.get("DISEASE_MAX_UPLOAD_MB", 10))
+app.config['MAX_CONTENT_LENGTH'] = int(MAX_UPLOAD_MB * 1024 * 1024)
+
+# /detect-disease/batch: many images per request (multipart parts or one zip),
+# decoded in parallel on DECODE_THREADS threads
+MAX_BATCH_UPLOAD_MB = float(os.environ.get("DISEASE_MAX_BATCH_UPLOAD_MB", 200))
+MAX_BATCH_IMAGES = int(os.environ.get("DISEASE_MAX_BATCH_IMAGES", 64))
+# Total image bytes per batch after unzipping, counted as they are read
+MAX_BATCH_UNCOMPRESSED_MB = float(os.environ.get("DISEASE_MAX_BATCH_UNCOMPRESSED_MB", MAX_BATCH_UPLOAD_MB))
+DECODE_THREADS = int(os.environ.get("DISEASE_DECODE_THREADS", min(8, os.cpu_count() or 1)))
+
+# Number of ranked (disease, confidence) candidates returned as top_k
+TOP_K = max(1, int(os.environ.get("DISEASE_TOP_K", 3)))
+
+# Prediction cache (prediction_cache.py): results keyed by the sha256 of the
+# upload bytes. DISEASE_CACHE_MODE=phash also matches re-encoded/forwarded
+# copies of a photo by perceptual hash. DISEASE_CACHE_SIZE=0 disables it
+CACHE_SIZE = int(os.environ.get("DISEASE_CACHE_SIZE", 4096))
+CACHE_MAX_MB = float(os.environ.get("DISEASE_CACHE_MAX_MB", 16))
+CACHE_TTL_S = float(os.environ.get("DISEASE_CACHE_TTL_S", 6 * 3600))
+CACHE_MODE = os.environ.get("DISEASE_CACHE_MODE", "exact")
+CACHE_MAX_DISTANCE = int(os.environ.get("DISEASE_CACHE_MAX_DISTANCE", 4))
 
 # ---------- LOAD MODEL ----------
 def load_model():
-    """Load the trained ResNet50 model"""
+    """Load the trained ResNet50 model (weights memory-mapped, see backends.load_weights)"""
     try:
         logger.info(f"Loading model from {MODEL_PATH}")
         logger.info(f"Using device: {DEVICE}")
         
-        checkpoint = torch.load(MODEL_PATH, map_location=DEVICE)
-        model = models.resnet50(pretrained=False)
-        model.fc = nn.Linear(model.fc.in_features, NUM_CLASSES)
-        model.load_state_dict(checkpoint["model_state_dict"])
-        model.to(DEVICE)
-        model.eval()
+        model = build_resnet50(NUM_CLASSES, MODEL_PATH, DEVICE)
         
         logger.info("✅ Model loaded successfully!")
         return model
@@ -151,37 +100,187 @@ def load_model():
         logger.error(f"❌ Failed to load model: {str(e)}")
         raise e
 
+def load_inference_backend():
+    """
+    Wrap the fp32 model in INFERENCE_BACKEND (non-eager backends are CPU only)
+    The model is only loaded if the backend needs it: a ready TorchScript or
+    int8 artifact next to the checkpoint is used directly
+    """
+    backend = INFERENCE_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"DISEASE_BACKEND must be one of: {', '.join(BACKENDS)}")
+    if DEVICE.type != "cpu" and backend != "eager":
+        logger.warning(f"⚠️ {backend} backend is CPU only, using eager on {DEVICE}")
+        backend = "eager"
+    
+    started = time.perf_counter()
+    forward = load_backend(backend, load_model, checkpoint_path=MODEL_PATH,
+                           calibration_dir=CALIBRATION_DIR, img_size=IMG_SIZE)
+    # First calls of frozen/ORT graphs do their own optimization passes
+    with torch.inference_mode():
+        for _ in range(2):
+            forward(torch.randn(1, 3, IMG_SIZE, IMG_SIZE, device=DEVICE))
+    logger.info(f"✅ Inference backend: {backend} ({(time.perf_counter() - started):.1f}s to prepare)")
+    return backend, forward
+
+def load_cascade(forward):
+    """Put the student model in front of `forward` (None when the cascade is off)"""
+    if not CASCADE_MODEL_PATH:
+        return None
+    
+    student = build_student(CASCADE_ARCH, NUM_CLASSES, CASCADE_MODEL_PATH, DEVICE)
+    student_forward = TorchForward(student.to(memory_format=torch.channels_last))
+    with torch.inference_mode():
+        student_forward(torch.randn(1, 3, IMG_SIZE, IMG_SIZE, device=DEVICE))
+    logger.info(f"✅ Cascade: {CASCADE_ARCH} first, ResNet50 below {CASCADE_THRESHOLD} confidence")
+    return Cascade(student_forward, forward, CASCADE_THRESHOLD)
+
 # Load model at startup
-model = load_model()
+active_backend, forward = load_inference_backend()
+cascade = load_cascade(forward)
+
+def run_batch(batch):
+    """
+    Forward pass for a stacked (N, 3, H, W) batch
+    Returns: one list of TOP_K (class_id, confidence) per image, best first
+    """
+    with torch.inference_mode():
+        batch = batch.to(DEVICE)
+        probs = cascade(batch) if cascade else torch.softmax(forward(batch), dim=1)
+        confidence, predicted = torch.topk(probs, min(TOP_K, probs.shape[1]), dim=1)
+    return [list(zip(ids, confs)) for ids, confs in zip(predicted.tolist(), confidence.tolist())]
+
+# Images are resized to uint8 on the request/decode threads; the batcher worker
+# normalizes each whole batch in one pass into preallocated buffers
+preprocessor = BatchPreprocessor(IMG_SIZE, MAX_BATCH_SIZE, device=DEVICE)
+batcher = MicroBatcher(run_batch, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, collate=preprocessor)
+
+prediction_cache = PredictionCache(max_entries=CACHE_SIZE, max_bytes=int(CACHE_MAX_MB * 1024 * 1024),
+                                   ttl_s=CACHE_TTL_S, mode=CACHE_MODE, max_distance=CACHE_MAX_DISTANCE)
+
+# PIL decoding and resizing release the GIL, so these run in parallel
+decode_pool = ThreadPoolExecutor(max_workers=DECODE_THREADS, thread_name_prefix="decode")
 
 # ---------- HELPER FUNCTIONS ----------
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def predict_disease(image_path):
+def decode_image(stream):
+    """
+    Decode an uploaded image in memory (JPEGs in draft mode, see preprocess.decode)
+    Returns: RGB PIL image, decode time in ms
+    """
+    started = time.perf_counter()
+    image = decode(stream, IMG_SIZE)
+    return image, (time.perf_counter() - started) * 1000
+
+def prediction_result(top_k):
+    """Cacheable prediction from a run_batch row of (class_id, confidence)"""
+    return {
+        "disease": CLASS_NAMES[top_k[0][0]],
+        "confidence": round(top_k[0][1], 4),
+        "top_k": [{"disease": CLASS_NAMES[class_id], "confidence": round(conf, 4)}
+                  for class_id, conf in top_k]
+    }
+
+def detection_response(prediction, decode_ms, cached=False):
+    """Response body shared by /detect-disease and each /detect-disease/batch item"""
+    disease_name = prediction["disease"]
+    
+    # Determine if disease was detected (not healthy)
+    is_healthy = any(healthy_term in disease_name.lower() 
+                   for healthy_term in ['healthy', 'normal'])
+    
+    return {
+        "detected": not is_healthy,
+        "disease": disease_name,
+        "confidence": prediction["confidence"],
+        "top_k": prediction["top_k"],
+        "message": "Disease detected successfully" if not is_healthy else "Plant appears healthy",
+        "decode_ms": round(decode_ms, 2),
+        "cached": cached
+    }
+
+def cache_lookup(data):
+    """
+    Look an upload up in prediction_cache, decoding it only if needed
+    (exact hits skip decoding; phash mode decodes to fingerprint the image)
+    Returns: cached prediction or None, decoded image or None, decode time in ms,
+    cache key to store the fresh prediction under
     """
-    Run disease detection on the image
-    Returns: disease_name, confidence
+    digest = content_hash(data)
+    prediction = prediction_cache.get(digest)
+    if prediction is not None:
+        return prediction, None, 0.0, (digest, None)
+    
+    image, decode_ms = decode_image(BytesIO(data))
+    fingerprint = None
+    if prediction_cache.perceptual:
+        fingerprint = perceptual_hash(image)
+        prediction = prediction_cache.get_similar(fingerprint)
+        if prediction is not None:
+            # Remember this exact copy too, so its next upload skips decoding
+            prediction_cache.put(digest, fingerprint, prediction)
+    return prediction, image, decode_ms, (digest, fingerprint)
+
+def batch_uploads():
+    """
+    Collect (filename, bytes) for every image in a batch request: all file
+    parts, and the images inside any uploaded .zip
+    Every image (part or zip member) is capped at MAX_UPLOAD_MB and the whole
+    batch at MAX_BATCH_UNCOMPRESSED_MB, both on the bytes actually read
+    """
+    uploads = []
+    member_limit = int(MAX_UPLOAD_MB * 1024 * 1024)
+    budget = int(MAX_BATCH_UNCOMPRESSED_MB * 1024 * 1024)
+    total = 0
+
+    def read(name, stream):
+        # Never read (or decompress) more than either limit allows, whatever the header says
+        nonlocal total
+        data = stream.read(min(member_limit, budget - total) + 1)
+        if len(data) > member_limit:
+            raise RequestEntityTooLarge(f"{name} exceeds {MAX_UPLOAD_MB:g} MB")
+        total += len(data)
+        if total > budget:
+            raise RequestEntityTooLarge(f"Batch exceeds {MAX_BATCH_UNCOMPRESSED_MB:g} MB of image data")
+        return data
+
+    for file in request.files.getlist('images') + request.files.getlist('image'):
+        if len(uploads) > MAX_BATCH_IMAGES:
+            break
+        if file.filename.lower().endswith('.zip'):
+            with zipfile.ZipFile(file.stream) as archive:
+                for info in archive.infolist():
+                    name = info.filename
+                    if info.is_dir() or name.startswith('__MACOSX/') or not allowed_file(name):
+                        continue
+                    if info.file_size > member_limit:
+                        raise RequestEntityTooLarge(f"{name} exceeds {MAX_UPLOAD_MB:g} MB")
+                    with archive.open(info) as member:
+                        uploads.append((name, read(name, member)))
+                    if len(uploads) > MAX_BATCH_IMAGES:
+                        break
+        else:
+            uploads.append((file.filename, read(file.filename, file.stream)))
+    return uploads
+
+def predict_disease(image):
+    """
+    Run disease detection on a decoded RGB image
+    Returns: dict with disease, confidence and top_k
     """
     try:
-        # Load and preprocess image
-        image = Image.open(image_path).convert("RGB")
-        image_tensor = transform(image).unsqueeze(0).to(DEVICE)
+        # Resize here; normalization happens per batch in the batcher
+        resized = preprocessor.resize(image)
         
-        # Run inference
-        with torch.no_grad():
-            outputs = model(image_tensor)
-            probs = torch.softmax(outputs, dim=1)
-            confidence, predicted = torch.max(probs, 1)
+        # Run inference (batched with any concurrent requests)
+        prediction = prediction_result(batcher.predict(resized))
         
-        class_id = predicted.item()
-        class_name = CLASS_NAMES[class_id]
-        conf = confidence.item()
+        logger.info(f"Prediction: {prediction['disease']} (confidence: {prediction['confidence']:.4f})")
         
-        logger.info(f"Prediction: {class_name} (confidence: {conf:.4f})")
-        
-        return class_name, conf
+        return prediction
     
     except Exception as e:
         logger.error(f"Prediction error: {str(e)}")
@@ -196,7 +295,26 @@ def health_check():
         "status": "healthy",
         "service": "Disease Detection API",
         "device": str(DEVICE),
-        "model_loaded": model is not None
+        "backend": active_backend,
+        "cascade": CASCADE_ARCH if cascade else None,
+        "model_loaded": forward is not None
+    }), 200
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    """Upload exceeded MAX_CONTENT_LENGTH"""
+    return jsonify({
+        "error": f"Upload too large. Maximum size is {MAX_UPLOAD_MB:g} MB",
+        "detected": False
+    }), 413
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Micro-batcher statistics (batch sizes, queue wait), prediction cache hit/miss counters and cascade escalations"""
+    return jsonify({
+        "batcher": batcher.stats(),
+        "cache": prediction_cache.stats(),
+        "cascade": cascade.stats() if cascade else None
     }), 200
 
 @app.route('/detect-disease', methods=['POST'])
@@ -230,36 +348,29 @@ def detect_disease():
                 "detected": False
             }), 400
         
-        # Save file temporarily
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
-        
-        logger.info(f"Processing image: {filename}")
+        logger.info(f"Processing image: {file.filename}")
         
+        # Repeat uploads are answered from the cache; otherwise decode in memory (no temp file)
         try:
+            prediction, image, decode_ms, cache_key = cache_lookup(file.stream.read())
+        except (UnidentifiedImageError, OSError) as e:
+            return jsonify({
+                "error": f"Could not decode image: {str(e)}",
+                "detected": False
+            }), 400
+        
+        cached = prediction is not None
+        if not cached:
             # Run disease detection
-            disease_name, confidence = predict_disease(filepath)
-            
-            # Determine if disease was detected (not healthy)
-            is_healthy = any(healthy_term in disease_name.lower() 
-                           for healthy_term in ['healthy', 'normal'])
-            
-            response = {
-                "detected": not is_healthy,
-                "disease": disease_name,
-                "confidence": round(confidence, 4),
-                "message": "Disease detected successfully" if not is_healthy else "Plant appears healthy"
-            }
-            
-            logger.info(f"✅ Detection complete: {response}")
-            return jsonify(response), 200
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(filepath):
-                os.remove(filepath)
-                logger.info(f"Cleaned up temporary file: {filename}")
+            prediction = predict_disease(image)
+            prediction_cache.put(*cache_key, prediction)
+        response = detection_response(prediction, decode_ms, cached)
+        
+        logger.info(f"✅ Detection complete: {response}")
+        return jsonify(response), 200
+    
+    except RequestEntityTooLarge:
+        return upload_too_large(None)
     
     except Exception as e:
         logger.error(f"❌ Detection error: {str(e)}")
@@ -269,11 +380,94 @@ def detect_disease():
             "message": "Failed to process image"
         }), 500
 
+@app.route('/detect-disease/batch', methods=['POST'])
+def detect_disease_batch():
+    """
+    Batch disease detection endpoint
+    Expected: multipart/form-data with several 'images' parts, and/or a .zip
+    of images (up to MAX_BATCH_IMAGES in total)
+    Returns: JSON with one /detect-disease result (or error) per image, in upload order
+    """
+    started = time.perf_counter()
+    try:
+        uploads = batch_uploads()
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": f"Upload too large: {e.description}", "results": []}), 413
+    except (zipfile.BadZipFile, ValueError) as e:
+        return jsonify({"error": f"Invalid archive: {str(e)}", "results": []}), 400
+    
+    if not uploads:
+        return jsonify({"error": "No image files provided", "results": []}), 400
+    if len(uploads) > MAX_BATCH_IMAGES:
+        return jsonify({
+            "error": f"Too many images. Maximum is {MAX_BATCH_IMAGES} per request",
+            "results": []
+        }), 413
+    
+    logger.info(f"Processing batch of {len(uploads)} images")
+    
+    # Cache lookup + decode + resize in parallel, then hand every remaining
+    # image to the batcher at once so the model sees full batches
+    def prepare(upload):
+        filename, data = upload
+        if not allowed_file(filename):
+            raise ValueError(f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}")
+        prediction, image, decode_ms, cache_key = cache_lookup(data)
+        resized = preprocessor.resize(image) if prediction is None else None
+        return prediction, resized, decode_ms, cache_key
+    
+    decoding = [decode_pool.submit(prepare, upload) for upload in uploads]
+    pending = []
+    for (filename, _), future in zip(uploads, decoding):
+        try:
+            prediction, resized, decode_ms, cache_key = future.result()
+            if prediction is None:
+                prediction = batcher.submit(resized)
+            pending.append((filename, prediction, decode_ms, cache_key, None))
+        except (UnidentifiedImageError, OSError) as e:
+            pending.append((filename, None, None, None, f"Could not decode image: {str(e)}"))
+        except ValueError as e:
+            pending.append((filename, None, None, None, str(e)))
+        except Exception as e:
+            # Anything else a decoder throws only fails this image, not the batch
+            logger.warning(f"⚠️ Could not process {filename}: {type(e).__name__}: {e}")
+            pending.append((filename, None, None, None, f"Could not decode image: {str(e)}"))
+    
+    results = []
+    for index, (filename, prediction, decode_ms, cache_key, error) in enumerate(pending):
+        item = {"index": index, "filename": filename}
+        if error is None:
+            try:
+                cached = isinstance(prediction, dict)
+                if not cached:
+                    prediction = prediction_result(prediction.result())
+                    prediction_cache.put(*cache_key, prediction)
+                item.update(detection_response(prediction, decode_ms, cached))
+            except Exception as e:
+                error = str(e)
+        if error is not None:
+            item.update({"error": error, "detected": False})
+        results.append(item)
+    
+    failed = sum(1 for item in results if "error" in item)
+    total_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"✅ Batch complete: {len(results) - failed}/{len(results)} images in {total_ms:.0f} ms")
+    
+    return jsonify({
+        "results": results,
+        "count": len(results),
+        "failed": failed,
+        "total_ms": round(total_ms, 2)
+    }), 200
+
 # ---------- RUN SERVER ----------
 if __name__ == '__main__':
     logger.info("🚀 Starting Disease Detection Flask Server...")
     logger.info(f"📍 Device: {DEVICE}")
     logger.info(f"🔢 Number of classes: {NUM_CLASSES}")
+    logger.info(f"📦 Micro-batching: up to {MAX_BATCH_SIZE} images, {MAX_WAIT_MS} ms max wait")
+    logger.info(f"🗂️ Prediction cache: {prediction_cache.stats()['mode']}, {CACHE_SIZE} entries, {CACHE_TTL_S:g}s TTL")
     
     # Run on port 8001 (as configured in your flaskService.js)
-    app.run(host='0.0.0.0', port=8001, debug=True)
+    # Development only; serve with gunicorn (gunicorn.conf.py) in production
+    app.run(host='0.0.0.0', port=8001, debug=False)
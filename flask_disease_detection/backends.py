@@ -0,0 +1,346 @@
+"""
+CPU inference backends for the ResNet50 disease model.
+
+    eager        - the fp32 nn.Module, channels_last (conv weights are stored
+                   that way in the weights file, so they stay memory-mapped)
+    torchscript  - traced + frozen graph (BatchNorm folded into the convs),
+                   optimize_for_inference
+    onnx         - exported graph run by ONNX Runtime (needs onnx + onnxruntime)
+    int8_dynamic - int8 weights for the Linear layers, no calibration
+                   (for ResNet50 that is only the fc head, so a small win)
+    int8_static  - FX post-training static quantization of the whole network,
+                   activations calibrated on real leaf images
+
+Every backend is a callable taking an (N, 3, H, W) float batch and returning
+logits. TorchScript / ONNX / int8 artifacts are written next to the checkpoint
+and rebuilt when the checkpoint is newer. Check a backend against fp32 with
+compare_backends.py before switching DISEASE_BACKEND in production.
+
+The fp32 weights are loaded from an inference-only copy of the training
+checkpoint (<checkpoint>.weights.pt, made on first use), memory-mapped
+straight into a module built on the meta device: no unpickling of the
+optimizer state, no random init and no extra copy. torchvision is only
+imported when a module actually has to be built, so a backend served from
+a ready artifact (torchscript, int8_static) starts without it.
+"""
+import copy
+import glob
+import logging
+import os
+import tempfile
+
+import torch
+import torch.nn as nn
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("eager", "torchscript", "onnx", "int8_dynamic", "int8_static")
+
+# Small backbones for the cascade's first stage (cascade.py)
+STUDENT_ARCHS = ("mobilenet_v3_large", "mobilenet_v3_small", "resnet18")
+
+IMAGE_EXTENSIONS = ("png", "jpg", "jpeg", "webp")
+
+
+def weights_path(checkpoint_path):
+    """Inference-only weights file kept next to the training checkpoint"""
+    return os.path.splitext(checkpoint_path)[0] + ".weights.pt"
+
+
+def convert_checkpoint(checkpoint_path, path=None):
+    """
+    Save just the model state dict (contiguous tensors, no optimizer / epoch
+    state) in a file torch.load can memory-map. Conv weights are saved
+    channels_last, the layout the eager backend runs in, so converting the
+    loaded module is a no-op instead of a private copy of the mmap'd pages
+    Returns: path of the weights file
+    """
+    path = path or weights_path(checkpoint_path)
+    checkpoint = torch.load(checkpoint_path, map_location="cpu")
+    # Write a temp file next to it and rename: another process may have the old
+    # file mmap'd, and a crash mid-write must not leave a truncated file behind
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            torch.save({k: v.contiguous(memory_format=_memory_format(v))
+                        for k, v in checkpoint["model_state_dict"].items()}, f)
+        os.chmod(tmp, 0o644)  # mkstemp creates it 0600
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    logger.info(f"Converted {checkpoint_path} to inference weights {path}")
+    return path
+
+
+def load_weights(checkpoint_path):
+    """
+    State dict for a training checkpoint, memory-mapped from its converted
+    weights file (converted on first use, again when the checkpoint is newer,
+    and when the file predates the channels_last layout)
+    """
+    path = weights_path(checkpoint_path)
+    weights = None
+    if _fresh(path, checkpoint_path):
+        weights = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+        if all(v.is_contiguous(memory_format=_memory_format(v)) for v in weights.values()):
+            return weights
+    try:
+        convert_checkpoint(checkpoint_path, path)
+    except OSError as e:
+        if weights is not None:
+            # Read-only model directory: the older layout still loads, eager just copies it
+            logger.warning(f"⚠️ Could not rewrite {path} ({e}), conv weights are not channels_last")
+            return weights
+        # Read-only model directory: fall back to the full checkpoint
+        logger.warning(f"⚠️ Could not write {path} ({e}), loading the full checkpoint")
+        return torch.load(checkpoint_path, map_location="cpu")["model_state_dict"]
+    return torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+
+
+def build_resnet50(num_classes, checkpoint_path=None, device="cpu"):
+    """ResNet50 with our classification head, weights from the training checkpoint"""
+    from torchvision.models import resnet50
+
+    if not checkpoint_path:
+        model = resnet50(weights=None)
+        model.fc = nn.Linear(model.fc.in_features, num_classes)
+        return model.to(device).eval()
+
+    # Parameters on the meta device have no storage and skip random init;
+    # assign=True then makes the mmap'd tensors the parameters (no copy)
+    with torch.device("meta"):
+        model = resnet50(weights=None)
+        model.fc = nn.Linear(model.fc.in_features, num_classes)
+    model.load_state_dict(load_weights(checkpoint_path), assign=True)
+    return model.to(device).eval()
+
+
+def build_student(arch, num_classes, checkpoint_path=None, device="cpu", pretrained=False):
+    """
+    Small backbone with a num_classes head, for the cascade's first stage
+    The checkpoint (from distill_student.py) records its arch; it must match
+    pretrained: start from the ImageNet backbone (for distillation)
+    """
+    if arch not in STUDENT_ARCHS:
+        raise ValueError(f"Unknown student arch {arch!r}. Choose from: {', '.join(STUDENT_ARCHS)}")
+    from torchvision import models
+
+    model = getattr(models, arch)(weights="DEFAULT" if pretrained else None)
+    if arch == "resnet18":
+        model.fc = nn.Linear(model.fc.in_features, num_classes)
+    else:
+        model.classifier[-1] = nn.Linear(model.classifier[-1].in_features, num_classes)
+    if checkpoint_path:
+        checkpoint = torch.load(checkpoint_path, map_location=device)
+        if checkpoint.get("arch", arch) != arch:
+            raise ValueError(f"{checkpoint_path} is a {checkpoint['arch']} checkpoint, not {arch}")
+        model.load_state_dict(checkpoint["model_state_dict"])
+    return model.to(device).eval()
+
+
+def example_batch(batch_size=1, img_size=224):
+    return torch.randn(batch_size, 3, img_size, img_size).contiguous(memory_format=torch.channels_last)
+
+
+def _use_x86_quantized_engine():
+    engines = torch.backends.quantized.supported_engines
+    torch.backends.quantized.engine = "x86" if "x86" in engines else "fbgemm"
+
+
+def _memory_format(tensor):
+    """Layout a weight is saved in: channels_last for 4-D (conv) weights, else contiguous"""
+    return torch.channels_last if tensor.dim() == 4 else torch.contiguous_format
+
+
+def _fresh(artifact_path, source_path):
+    """True if the artifact exists and is at least as new as the checkpoint"""
+    if not os.path.exists(artifact_path):
+        return False
+    return source_path is None or os.path.getmtime(artifact_path) >= os.path.getmtime(source_path)
+
+
+# ---------- BUILDERS ----------
+def trace_torchscript(model, img_size=224):
+    """Trace with a channels_last example and freeze (inlines weights, folds BatchNorm)"""
+    model = copy.deepcopy(model).cpu().to(memory_format=torch.channels_last).eval()
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example_batch(1, img_size))
+        return torch.jit.freeze(traced)
+
+
+def quantize_dynamic_int8(model):
+    """int8 weights for nn.Linear, activations quantized on the fly"""
+    return torch.ao.quantization.quantize_dynamic(copy.deepcopy(model).cpu().eval(), {nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_static_int8(model, calibration_batches, img_size=224):
+    """
+    FX graph mode post-training static quantization (x86 / fbgemm kernels)
+    calibration_batches: iterable of preprocessed (N, 3, H, W) float batches
+    Returns: TorchScript module of the quantized network
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    _use_x86_quantized_engine()
+    model = copy.deepcopy(model).cpu().eval()
+    prepared = prepare_fx(model, get_default_qconfig_mapping(torch.backends.quantized.engine),
+                          (example_batch(1, img_size),))
+
+    seen = 0
+    with torch.no_grad():
+        for batch in calibration_batches:
+            prepared(batch.contiguous(memory_format=torch.channels_last))
+            seen += batch.shape[0]
+    if seen == 0:
+        raise ValueError("int8_static needs at least one calibration image")
+    logger.info(f"Calibrated int8 activations on {seen} images")
+
+    quantized = convert_fx(prepared)
+    with torch.no_grad():
+        return torch.jit.freeze(torch.jit.trace(quantized, example_batch(1, img_size)))
+
+
+def export_onnx(model, path, img_size=224):
+    """Export with a dynamic batch axis"""
+    model = copy.deepcopy(model).cpu().eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            model, torch.randn(1, 3, img_size, img_size), path,
+            input_names=["input"], output_names=["logits"],
+            dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+            opset_version=17
+        )
+
+
+def list_images(directory, limit=None):
+    """Image files under `directory`, searched recursively, in sorted order"""
+    return sorted(
+        path for ext in IMAGE_EXTENSIONS
+        for path in glob.glob(os.path.join(directory, "**", f"*.{ext}"), recursive=True)
+    )[:limit]
+
+
+def reference_transform(img_size=224):
+    """The per-image Resize -> ToTensor -> Normalize pipeline (calibration and the tools)"""
+    from torchvision import transforms
+
+    return transforms.Compose([
+        transforms.Resize((img_size, img_size)),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+    ])
+
+
+def image_batches(directory, transform, batch_size=16, limit=512):
+    """Preprocessed batches from the images under `directory` (calibration / validation)"""
+    from PIL import Image
+
+    paths = list_images(directory, limit)
+    for start in range(0, len(paths), batch_size):
+        chunk = paths[start:start + batch_size]
+        yield chunk, torch.stack([transform(Image.open(p).convert("RGB")) for p in chunk])
+
+
+# ---------- RUNTIME WRAPPERS ----------
+class TorchForward:
+    """Runs a torch module on channels_last input"""
+
+    def __init__(self, module):
+        self.module = module
+
+    def __call__(self, batch):
+        with torch.inference_mode():
+            return self.module(batch.contiguous(memory_format=torch.channels_last))
+
+
+class OnnxForward:
+    """
+    Runs the exported graph in ONNX Runtime
+    The session (and its thread pool) is created per process, so a forked
+    gunicorn worker builds its own with its torch thread budget
+    """
+
+    def __init__(self, path, threads=None):
+        self.path = path
+        self.threads = threads
+        self._session = None
+        self._pid = None
+        self.session  # fail fast on a missing onnxruntime or a bad graph
+
+    @property
+    def session(self):
+        if self._pid != os.getpid():
+            import onnxruntime as ort
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.intra_op_num_threads = self.threads or torch.get_num_threads()
+            self._session = ort.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+            self._pid = os.getpid()
+        return self._session
+
+    def __call__(self, batch):
+        logits = self.session.run(None, {"input": batch.contiguous().cpu().numpy()})[0]
+        return torch.from_numpy(logits)
+
+
+def load_backend(name, model, checkpoint_path=None, artifact_dir=None, calibration_dir=None,
+                 transform=None, img_size=224, threads=None):
+    """
+    Wrap the fp32 model in the selected backend
+    model: the fp32 nn.Module, or a zero-argument callable building it, called
+    only if the backend's artifact has to be (re)built
+    transform: per-image preprocessing for int8_static calibration
+    (default: reference_transform)
+    Returns: callable (N, 3, H, W) float batch -> logits
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}. Choose from: {', '.join(BACKENDS)}")
+
+    artifact_dir = artifact_dir or (os.path.dirname(checkpoint_path) if checkpoint_path else ".")
+
+    def fp32():
+        return model if isinstance(model, nn.Module) else model()
+
+    if name == "eager":
+        # A no-op for build_resnet50's mmap'd weights (already channels_last);
+        # a copy only for modules whose conv weights are still NCHW
+        return TorchForward(fp32().to(memory_format=torch.channels_last))
+
+    if name == "torchscript":
+        path = os.path.join(artifact_dir, "resnet50_frozen.pt")
+        if _fresh(path, checkpoint_path):
+            scripted = torch.jit.load(path)
+        else:
+            scripted = trace_torchscript(fp32(), img_size)
+            torch.jit.save(scripted, path)
+            logger.info(f"Saved TorchScript graph to {path}")
+        return TorchForward(torch.jit.optimize_for_inference(scripted))
+
+    if name == "onnx":
+        path = os.path.join(artifact_dir, "resnet50.onnx")
+        if not _fresh(path, checkpoint_path):
+            export_onnx(fp32(), path, img_size)
+            logger.info(f"Exported ONNX graph to {path}")
+        return OnnxForward(path, threads)
+
+    if name == "int8_dynamic":
+        return TorchForward(quantize_dynamic_int8(fp32()))
+
+    # int8_static
+    path = os.path.join(artifact_dir, "resnet50_int8.pt")
+    if _fresh(path, checkpoint_path):
+        _use_x86_quantized_engine()
+        return TorchForward(torch.jit.load(path))
+    if not calibration_dir:
+        raise RuntimeError(
+            f"{path} is missing: set DISEASE_CALIBRATION_DIR to a folder of leaf photos, "
+            "or run compare_backends.py --calibration-dir ... first"
+        )
+    batches = (batch for _, batch in image_batches(calibration_dir, transform or reference_transform(img_size)))
+    quantized = quantize_static_int8(fp32(), batches, img_size)
+    torch.jit.save(quantized, path)
+    logger.info(f"Saved int8 model to {path}")
+    return TorchForward(quantized)
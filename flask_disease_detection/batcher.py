@@ -0,0 +1,118 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching for the ResNet50 forward pass.
+
+    Request threads submit one preprocessed image tensor (C, H, W) each and
+    wait on a Future. A single worker thread collects queued images and
+    flushes them as one (N, C, H, W) batch when either max_batch_size images
+    are waiting or the oldest one has waited max_wait_ms. `run_batch` gets
+    the stacked tensor and must return one result per row, in order.
+
+    `collate` turns the list of submitted items into that batch (torch.stack
+    by default). With a preprocess.BatchPreprocessor, items are resized uint8
+    arrays and normalization happens once per batch on the worker thread.
+
+    The worker thread starts on the first submit, and again in a forked
+    child (threads do not survive fork), so a batcher built at import time
+    works under a preloading server like gunicorn --preload.
+    """
+
+    def __init__(self, run_batch, max_batch_size=16, max_wait_ms=10.0, stats_window=1000, collate=torch.stack):
+        self.run_batch = run_batch
+        self.collate = collate
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = deque(maxlen=stats_window)
+        self._waits = deque(maxlen=stats_window)
+        self._counters = {"images": 0, "batches": 0, "failed_batches": 0}
+        self._worker_pid = None
+
+    def _ensure_worker(self):
+        """Start the worker thread in this process if it is not running yet."""
+        if self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker_pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, args=(self._queue,), name="resnet-batcher", daemon=True).start()
+                self._worker_pid = os.getpid()
+
+    def submit(self, image_tensor):
+        """Queue one image tensor; the Future resolves to its result."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((image_tensor, future, time.monotonic()))
+        return future
+
+    def predict(self, image_tensor, timeout=None):
+        """Submit and wait for the result."""
+        return self.submit(image_tensor).result(timeout)
+
+    def _collect(self, pending):
+        """Block for the first image, then gather more until the batch is full or its wait is up."""
+        batch = [pending.get()]
+        flush_at = batch[0][2] + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = flush_at - time.monotonic()
+            try:
+                batch.append(pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, pending):
+        while True:
+            batch = self._collect(pending)
+            started = time.monotonic()
+            futures = [future for _, future, _ in batch]
+
+            try:
+                results = self.run_batch(self.collate([tensor for tensor, _, _ in batch]))
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"❌ Batch of {len(batch)} failed: {str(e)}")
+                with self._lock:
+                    self._counters["failed_batches"] += 1
+                for future in futures:
+                    future.set_exception(e)
+
+            with self._lock:
+                self._counters["images"] += len(batch)
+                self._counters["batches"] += 1
+                self._batch_sizes.append(len(batch))
+                self._waits.extend(started - enqueued for _, _, enqueued in batch)
+
+    def stats(self):
+        """Batch-size and queue-wait figures over the recent window."""
+        with self._lock:
+            sizes = list(self._batch_sizes)
+            waits = sorted(self._waits)
+            counters = dict(self._counters)
+
+        def pct(p):
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 2) if waits else 0.0
+
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_s * 1000,
+            "queue_depth": self._queue.qsize(),
+            "avg_batch_size": round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+            "wait_ms": {"p50": pct(0.50), "p95": pct(0.95)},
+            **counters
+        }
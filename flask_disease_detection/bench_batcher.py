@@ -0,0 +1,103 @@
+"""
+Throughput / latency benchmark for the ResNet50 micro-batcher.
+
+    python bench_batcher.py --images 256 --concurrency 32 --batch-sizes 1,4,8,16,32 --wait-ms 5,10,20
+
+Simulates a burst of uploads: --concurrency client threads push --images
+preprocessed tensors through a MicroBatcher wrapped around ResNet50 and we
+record per-image latency. --batch-sizes 1 is the old one-image-per-forward
+behaviour. Uses the trained checkpoint if --checkpoint is given, otherwise
+random weights (same architecture and cost). Prints a JSON report.
+"""
+import argparse
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+import torch.nn as nn
+from torchvision import models
+
+from batcher import MicroBatcher
+
+NUM_CLASSES = 94
+IMG_SIZE = 224
+
+
+def build_model(checkpoint):
+    model = models.resnet50()
+    model.fc = nn.Linear(model.fc.in_features, NUM_CLASSES)
+    if checkpoint:
+        model.load_state_dict(torch.load(checkpoint, map_location="cpu")["model_state_dict"])
+    return model.eval()
+
+
+def run(model, images, concurrency, max_batch_size, max_wait_ms):
+    def run_batch(batch):
+        with torch.no_grad():
+            confidence, predicted = torch.max(torch.softmax(model(batch), dim=1), 1)
+        return list(zip(predicted.tolist(), confidence.tolist()))
+
+    batcher = MicroBatcher(run_batch, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    def one(tensor):
+        started = time.perf_counter()
+        batcher.predict(tensor)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(one, images))
+    wall = time.perf_counter() - started
+
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+    stats = batcher.stats()
+    return {
+        "max_batch_size": max_batch_size,
+        "max_wait_ms": max_wait_ms,
+        "images_per_s": round(len(images) / wall, 2),
+        "latency_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99),
+                       "mean": round(statistics.mean(latencies) * 1000, 1)},
+        "avg_batch_size": stats["avg_batch_size"],
+        "batches": stats["batches"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", default=None)
+    parser.add_argument("--images", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch-sizes", default="1,4,8,16,32")
+    parser.add_argument("--wait-ms", default="10")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    model = build_model(args.checkpoint)
+    images = [torch.randn(3, IMG_SIZE, IMG_SIZE) for _ in range(args.images)]
+
+    # Warm-up so the first configuration does not pay for allocator/kernel setup.
+    with torch.no_grad():
+        model(torch.stack(images[:4]))
+
+    results = []
+    for max_batch_size in (int(b) for b in args.batch_sizes.split(",")):
+        for max_wait_ms in (float(w) for w in args.wait_ms.split(",")):
+            results.append(run(model, images, args.concurrency, max_batch_size, max_wait_ms))
+
+    print(json.dumps({
+        "images": args.images,
+        "concurrency": args.concurrency,
+        "torch_threads": torch.get_num_threads(),
+        "results": results
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Benchmark / regression suite for the disease detection pipeline.
+
+    python bench_detection.py
+    python bench_detection.py --backends eager,torchscript,int8_static --threads 1,4,8 --batch-sizes 1,8,16
+    python bench_detection.py --out baseline.json
+    python bench_detection.py --baseline baseline.json --max-regression 0.15
+
+Generates synthetic leaf-coloured images for every --sizes x --formats
+(the service's ALLOWED_EXTENSIONS) and times each stage of /detect-disease
+separately:
+  - decode:     bytes -> RGB PIL image (preprocess.decode, JPEG draft mode)
+  - preprocess: resize to uint8 + batched normalize (BatchPreprocessor)
+  - forward:    the model, for every --backends x --threads x --batch-sizes
+Each reports images/s and p50/p99 latency (per image for decode, per batch
+for the others) as JSON. The model is a randomly initialized 94-class
+ResNet50 (same architecture and cost as the trained one) unless --checkpoint
+is given, so the suite runs without the checkpoint from Drive. Exported
+graphs go to a temporary directory, and int8_static is calibrated on the
+synthetic images.
+
+With --baseline, every images/s figure is compared with the same entry in
+an earlier report, and the suite exits 1 if any is more than
+--max-regression slower or missing from this run. A backend that fails to
+load or run also exits 1, baseline or not. tests/test_bench_detection.py
+runs this gate on a tiny configuration.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+import numpy as np
+import torch
+from PIL import Image
+
+from backends import BACKENDS, build_resnet50, load_backend
+from compare_backends import IMG_SIZE, transform
+from labels import NUM_CLASSES
+from preprocess import BatchPreprocessor, decode
+
+FORMATS = ("jpg", "jpeg", "png", "webp")
+PIL_FORMATS = {"jpg": "JPEG", "jpeg": "JPEG", "png": "PNG", "webp": "WEBP"}
+
+
+def synthetic_image(width, height, rng):
+    """Smooth green/brown gradient with blotches: compresses like a photo, unlike pure noise"""
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([60 + 40 * x / width, 110 + 60 * y / height, 40 + 20 * (x + y) / (width + height)], axis=-1)
+    for _ in range(12):
+        cx, cy, r = rng.uniform(0, width), rng.uniform(0, height), rng.uniform(0.02, 0.1) * width
+        spot = np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / (2 * r * r))[..., None]
+        base = base * (1 - spot) + np.array([120, 80, 30], dtype=np.float32) * spot
+    noise = rng.normal(0, 6, base.shape)
+    return Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8))
+
+
+def encode(image, fmt):
+    buffer = BytesIO()
+    image.save(buffer, PIL_FORMATS[fmt], **({"quality": 85} if PIL_FORMATS[fmt] in ("JPEG", "WEBP") else {}))
+    return buffer.getvalue()
+
+
+def summarize(seconds, images_per_call=1):
+    """images/s and latency percentiles (ms per call) from a list of call durations"""
+    times = sorted(seconds)
+
+    def pct(p):
+        return round(times[min(len(times) - 1, int(p * len(times)))] * 1000, 3)
+
+    return {
+        "images_per_s": round(images_per_call * len(times) / sum(times), 2),
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99)
+    }
+
+
+def timed_calls(fn, args_list):
+    times = []
+    for args in args_list:
+        started = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def bench_decode(files, repeats):
+    results = {}
+    for (size, fmt), data in files.items():
+        times = timed_calls(lambda d: decode(BytesIO(d), IMG_SIZE), [(data,)] * repeats)
+        results[f"{size}/{fmt}"] = {"bytes": len(data), **summarize(times)}
+    return results
+
+
+def bench_preprocess(images, batch_sizes, repeats):
+    results = {}
+    for batch_size in batch_sizes:
+        preprocessor = BatchPreprocessor(IMG_SIZE, batch_size)
+        chunk = (images * batch_size)[:batch_size]
+
+        def run(chunk=chunk):
+            preprocessor([preprocessor.resize(image) for image in chunk])
+
+        results[f"batch{batch_size}"] = summarize(timed_calls(run, [()] * repeats), batch_size)
+    return results
+
+
+def bench_forward(forward, batch_sizes, repeats):
+    results = {}
+    with torch.inference_mode():
+        for batch_size in batch_sizes:
+            batch = torch.randn(batch_size, 3, IMG_SIZE, IMG_SIZE).contiguous(memory_format=torch.channels_last)
+            for _ in range(3):
+                forward(batch)
+            results[f"batch{batch_size}"] = summarize(timed_calls(forward, [(batch,)] * repeats), batch_size)
+    return results
+
+
+def throughputs(report, prefix=""):
+    """Flatten a report to {path: images_per_s}"""
+    found = {}
+    for key, value in report.items():
+        if isinstance(value, dict):
+            if "images_per_s" in value:
+                found[prefix + key] = value["images_per_s"]
+            else:
+                found.update(throughputs(value, f"{prefix}{key}/"))
+    return found
+
+
+def regressions(report, baseline, max_regression):
+    """Baseline figures that are more than max_regression lower, or absent, in this report"""
+    current = throughputs(report)
+    slower = {}
+    for key, before in throughputs(baseline).items():
+        if key not in current:
+            slower[key] = {"baseline": before, "current": None, "change": None}
+        elif current[key] < before * (1 - max_regression):
+            slower[key] = {"baseline": before, "current": current[key],
+                           "change": round(current[key] / before - 1, 3)}
+    return slower
+
+
+def failures(report, max_regression):
+    """Exit message for a failed run, or None"""
+    errors = [key for key, value in report["forward"].items() if "error" in value]
+    if errors:
+        return f"❌ Backend(s) failed: {', '.join(errors)}"
+    if report.get("regressions"):
+        return f"❌ {len(report['regressions'])} figure(s) more than {max_regression:.0%} below the baseline or missing"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", default=None, help="trained checkpoint (default: random 94-class ResNet50)")
+    parser.add_argument("--sizes", default="640x480,1280x960,3000x4000", help="WxH of the synthetic images")
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--backends", default="eager,torchscript")
+    parser.add_argument("--threads", default=str(torch.get_num_threads()), help="torch thread counts to sweep")
+    parser.add_argument("--batch-sizes", default="1,4,8,16")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--out", default=None, help="also write the report here")
+    parser.add_argument("--baseline", default=None, help="earlier report to compare images/s against")
+    parser.add_argument("--max-regression", type=float, default=0.15)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    torch.manual_seed(0)
+    sizes = [tuple(int(v) for v in size.split("x")) for size in args.sizes.split(",")]
+    formats = args.formats.split(",")
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+
+    images = {size: synthetic_image(*size, rng) for size in sizes}
+    files = {(f"{w}x{h}", fmt): encode(image, fmt) for (w, h), image in images.items() for fmt in formats}
+    decoded = [decode(BytesIO(data), IMG_SIZE) for data in files.values()]
+
+    report = {
+        "model": args.checkpoint or "random ResNet50 (94 classes)",
+        "torch_version": torch.__version__,
+        "cpu_count": os.cpu_count(),
+        "decode": bench_decode(files, args.repeats),
+        "preprocess": bench_preprocess(decoded, batch_sizes, args.repeats),
+        "forward": {}
+    }
+
+    with tempfile.TemporaryDirectory() as artifact_dir:
+        # Calibration images for int8_static: the synthetic set, written as files
+        calibration_dir = os.path.join(artifact_dir, "calibration")
+        os.makedirs(calibration_dir)
+        for (size, fmt), data in files.items():
+            with open(os.path.join(calibration_dir, f"{size}.{fmt}"), "wb") as f:
+                f.write(data)
+
+        for name in args.backends.split(","):
+            if name not in BACKENDS:
+                sys.exit(f"❌ Unknown backend {name!r}. Choose from: {', '.join(BACKENDS)}")
+            for threads in (int(t) for t in args.threads.split(",")):
+                torch.set_num_threads(threads)
+                key = f"{name}/threads{threads}"
+                try:
+                    model = build_resnet50(NUM_CLASSES, args.checkpoint)
+                    forward = load_backend(name, model, checkpoint_path=args.checkpoint, artifact_dir=artifact_dir,
+                                           calibration_dir=calibration_dir, transform=transform,
+                                           img_size=IMG_SIZE, threads=threads)
+                    report["forward"][key] = bench_forward(forward, batch_sizes, args.repeats)
+                    print(f"✅ {key}", file=sys.stderr)
+                except Exception as e:
+                    report["forward"][key] = {"error": str(e)}
+                    print(f"❌ {key}: {e}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = regressions(report, json.load(f), args.max_regression)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    failed = failures(report, args.max_regression)
+    if failed:
+        sys.exit(failed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Check and time the batched preprocessing against the per-image transform.
+
+    python bench_preprocess.py --images 256 --batch-size 16 --sizes 640x480,1600x1200
+
+Generates random RGB images of each --sizes, runs them through the
+reference pipeline (Resize -> ToTensor -> Normalize, one image at a time,
+then torch.stack) and through BatchPreprocessor (resize to uint8 per image,
+one normalize per batch), and reports the max absolute difference and
+per-image ms for both. Exits 1 if the difference exceeds --tolerance.
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+
+from compare_backends import IMG_SIZE, transform
+from preprocess import BatchPreprocessor
+
+
+def synthetic_images(count, width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    return [Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8)) for _ in range(count)]
+
+
+def timed(fn, chunks):
+    started = time.perf_counter()
+    outputs = [fn(chunk).clone() for chunk in chunks]
+    return outputs, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--sizes", default="640x480,1600x1200", help="WxH of the synthetic images")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--tolerance", type=float, default=1e-5)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    preprocessor = BatchPreprocessor(IMG_SIZE, args.batch_size)
+    results, failed = [], []
+    for size in args.sizes.split(","):
+        width, height = (int(v) for v in size.split("x"))
+        images = synthetic_images(args.images, width, height)
+        chunks = [images[i:i + args.batch_size] for i in range(0, len(images), args.batch_size)]
+
+        reference, reference_s = timed(lambda chunk: torch.stack([transform(image) for image in chunk]), chunks)
+        batched, batched_s = timed(lambda chunk: preprocessor([preprocessor.resize(image) for image in chunk]), chunks)
+
+        max_diff = max(float((r - b).abs().max()) for r, b in zip(reference, batched))
+        if max_diff > args.tolerance:
+            failed.append(size)
+        results.append({
+            "size": size,
+            "max_abs_diff": max_diff,
+            "per_image_ms": {
+                "transform": round(reference_s / len(images) * 1000, 3),
+                "batched": round(batched_s / len(images) * 1000, 3)
+            },
+            "speedup": round(reference_s / batched_s, 2)
+        })
+
+    print(json.dumps({
+        "images": args.images,
+        "batch_size": args.batch_size,
+        "torch_threads": torch.get_num_threads(),
+        "results": results
+    }, indent=2))
+    if failed:
+        sys.exit(f"❌ Batched preprocessing differs by more than {args.tolerance} for: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Throughput and memory of gunicorn worker layouts for the disease service.
+
+    python bench_serving.py --configs 1x16,2x8,4x4,8x2,16x1 --concurrency 32 --requests 512
+
+For each WORKERSxTHREADS layout, starts `gunicorn -c gunicorn.conf.py app:app`
+(model preloaded in the master, workers forked), uploads --requests random
+JPEGs to /detect-disease from --concurrency client threads with the
+prediction cache off, then shuts it down. Reports images/s, latency
+percentiles and memory summed over the master and its workers: RSS (counts
+shared copy-on-write pages once per process) and PSS (splits shared pages
+between processes, so it shows what the layout really costs). Linux only.
+"""
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import numpy as np
+import requests
+from PIL import Image
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def synthetic_jpegs(count, width=1024, height=768, seed=0):
+    rng = np.random.default_rng(seed)
+    jpegs = []
+    for _ in range(count):
+        buffer = BytesIO()
+        Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8)).save(buffer, "JPEG", quality=85)
+        jpegs.append(buffer.getvalue())
+    return jpegs
+
+
+def wait_for(url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{url}/health", timeout=2).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    return False
+
+
+def process_tree(pid):
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children += [int(child) for child in f.read().split()]
+    return [pid] + children
+
+
+def memory_mb(pids):
+    """Summed RSS and PSS (MB) from /proc/<pid>/smaps_rollup"""
+    totals = {"Rss": 0, "Pss": 0}
+    for pid in pids:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key = line.split(":")[0]
+                if key in totals:
+                    totals[key] += int(line.split()[1])
+    return {"rss_mb": round(totals["Rss"] / 1024, 1), "pss_mb": round(totals["Pss"] / 1024, 1)}
+
+
+def run_load(url, jpegs, requests_total, concurrency):
+    def one(i):
+        started = time.perf_counter()
+        response = requests.post(f"{url}/detect-disease",
+                                 files={"image": (f"leaf_{i}.jpg", jpegs[i % len(jpegs)], "image/jpeg")},
+                                 timeout=120)
+        return time.perf_counter() - started, response.status_code == 200
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests_total)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in results)
+
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+    return {
+        "images_per_s": round(requests_total / wall, 2),
+        "latency_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99),
+                       "mean": round(statistics.mean(latencies) * 1000, 1)},
+        "errors": sum(1 for _, ok in results if not ok)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--configs", default="1x16,2x8,4x4,8x2,16x1", help="comma separated WORKERSxTHREADS")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}"
+    jpegs = synthetic_jpegs(min(args.requests, 64))
+    report = []
+    for config in args.configs.split(","):
+        workers, threads = (int(x) for x in config.lower().split("x"))
+        print(f"🔄 {workers} worker(s) x {threads} thread(s)", file=sys.stderr)
+
+        env = dict(os.environ, DISEASE_WORKERS=str(workers), DISEASE_TORCH_THREADS=str(threads),
+                   DISEASE_BIND=f"127.0.0.1:{args.port}", DISEASE_CACHE_SIZE="0")
+        server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+                                  cwd=APP_DIR, env=env)
+        try:
+            if not wait_for(url, args.startup_timeout):
+                report.append({"config": config, "error": "server did not become ready"})
+                continue
+            idle = memory_mb(process_tree(server.pid))
+            result = run_load(url, jpegs, args.requests, args.concurrency)
+            loaded = memory_mb(process_tree(server.pid))
+            report.append({"config": config, "workers": workers, "threads": threads, **result,
+                           "memory_idle": idle, "memory_after_load": loaded})
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+    print(json.dumps({"concurrency": args.concurrency, "requests": args.requests, "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
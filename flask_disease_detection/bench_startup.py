@@ -0,0 +1,158 @@
+"""
+Cold-start time and memory of loading the disease model.
+
+    python bench_startup.py --checkpoint trained_model/best_resnet50_3.pth
+    python bench_startup.py --synthetic
+
+Each mode runs --repeats times in a fresh Python process:
+  - checkpoint:  the old load_model(): import torchvision, torch.load the whole
+                 training checkpoint, build resnet50 with random init, copy
+                 the state dict in
+  - mmap:        backends.load_backend("eager") on backends.build_resnet50,
+                 what the app serves: meta-device module + the converted
+                 inference weights memory-mapped in with assign=True, then
+                 the channels_last conversion
+  - torchscript: backends.load_backend("torchscript") from the frozen
+                 artifact, never building the nn.Module (or importing torchvision)
+and reports the median import / load / total seconds, the peak RSS
+(ru_maxrss), whether torchvision got imported and, after one forward pass,
+the process's RSS / PSS and anonymous (private, not file-backed) memory from
+/proc/self/smaps_rollup (Linux). Weights that stay memory-mapped show up in
+RSS but not in anon_mb; weights copied into private memory (e.g. by a
+channels_last conversion) add their full size to anon_mb in every worker.
+The weights file and the
+TorchScript artifact are prepared before timing. --synthetic writes a
+random-weight checkpoint in the training format (with Adam state, like the
+real one) to a temp dir, so this runs without the checkpoint from Drive.
+Memory-mapped weights only count towards RSS once their pages are touched
+(the first forward pass), and then as shared, reclaimable page cache.
+The page cache is warm after the first run; drop it
+(echo 3 > /proc/sys/vm/drop_caches) between runs for truly cold numbers.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ("checkpoint", "mmap", "torchscript")
+
+
+def child(mode, checkpoint_path):
+    """One cold start in this process; prints a JSON line"""
+    started = time.perf_counter()
+    import torch
+    from backends import build_resnet50, load_backend
+    from labels import NUM_CLASSES
+    imported = time.perf_counter()
+
+    if mode == "checkpoint":
+        import torch.nn as nn
+        from torchvision import models
+
+        model = models.resnet50(weights=None)
+        model.fc = nn.Linear(model.fc.in_features, NUM_CLASSES)
+        model.load_state_dict(torch.load(checkpoint_path, map_location="cpu")["model_state_dict"])
+        model.eval()
+        forward = model
+    else:
+        forward = load_backend("eager" if mode == "mmap" else "torchscript",
+                               lambda: build_resnet50(NUM_CLASSES, checkpoint_path),
+                               checkpoint_path=checkpoint_path)
+    loaded = time.perf_counter()
+    torchvision_imported = "torchvision" in sys.modules
+
+    with torch.inference_mode():
+        forward(torch.randn(1, 3, 224, 224))
+
+    print(json.dumps({
+        "import_s": imported - started,
+        "load_s": loaded - imported,
+        "total_s": loaded - started,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "torchvision_imported": torchvision_imported,
+        **memory_mb()
+    }))
+
+
+def memory_mb():
+    """RSS, PSS and anonymous memory (MB) of this process, from /proc/self/smaps_rollup"""
+    totals = {"Rss": 0, "Pss": 0, "Anonymous": 0}
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        return {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key = line.split(":")[0]
+            if key in totals:
+                totals[key] += int(line.split()[1])
+    return {"rss_mb": totals["Rss"] / 1024, "pss_mb": totals["Pss"] / 1024, "anon_mb": totals["Anonymous"] / 1024}
+
+
+def write_synthetic_checkpoint(path):
+    import torch
+    from backends import build_resnet50
+    from labels import NUM_CLASSES
+
+    model = build_resnet50(NUM_CLASSES)
+    optimizer = torch.optim.Adam(model.parameters())
+    model(torch.randn(2, 3, 224, 224)).sum().backward()
+    optimizer.step()
+    torch.save({"epoch": 1, "model_state_dict": model.state_dict(),
+                "optimizer_state_dict": optimizer.state_dict()}, path)
+
+
+def prepare(checkpoint_path):
+    """Create the weights file and TorchScript artifact so only loading is timed"""
+    from backends import build_resnet50, load_backend, load_weights
+    from labels import NUM_CLASSES
+
+    load_weights(checkpoint_path)
+    load_backend("torchscript", lambda: build_resnet50(NUM_CLASSES, checkpoint_path), checkpoint_path=checkpoint_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", default="trained_model/best_resnet50_3.pth")
+    parser.add_argument("--synthetic", action="store_true", help="use a random-weight checkpoint")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.checkpoint)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint = os.path.abspath(args.checkpoint)
+        if args.synthetic:
+            checkpoint = os.path.join(tmp, "synthetic_resnet50.pth")
+            write_synthetic_checkpoint(checkpoint)
+        prepare(checkpoint)
+
+        report = {"checkpoint": args.checkpoint if not args.synthetic else "synthetic",
+                  "checkpoint_mb": round(os.path.getsize(checkpoint) / 2 ** 20, 1), "modes": {}}
+        for mode in args.modes.split(","):
+            runs = []
+            for _ in range(args.repeats):
+                out = subprocess.run([sys.executable, __file__, "--child", mode, "--checkpoint", checkpoint],
+                                     cwd=os.path.dirname(os.path.abspath(__file__)),
+                                     capture_output=True, text=True, check=True).stdout
+                runs.append(json.loads(out.strip().splitlines()[-1]))
+            report["modes"][mode] = {
+                **{key: round(statistics.median(run[key] for run in runs), 3)
+                   for key in ("import_s", "load_s", "total_s", "peak_rss_mb", "rss_mb", "pss_mb", "anon_mb")
+                   if key in runs[0]},
+                "torchvision_imported": runs[0]["torchvision_imported"]
+            }
+            print(f"✅ {mode}", file=sys.stderr)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Pick the cascade confidence threshold from a validation set.
+
+    python calibrate_cascade.py --images val_images/ --student trained_model/student_mobilenet_v3_large.pth
+    python calibrate_cascade.py --images val_images/ --student ... --arch resnet18 --min-agreement 0.995
+
+Runs every image under --images through the student and through ResNet50
+once, then replays the cascade offline for each of --thresholds:
+  - escalated: fraction of images below the threshold (sent on to ResNet50)
+  - agreement: top-1 agreement of the cascade with ResNet50 alone
+  - median / mean ms per image at batch 1 (student, plus ResNet50 when escalated)
+and recommends the lowest threshold whose agreement is >= --min-agreement,
+which is the one that escalates the fewest images. Set it as
+DISEASE_CASCADE_THRESHOLD. Exits 1 if no threshold qualifies.
+"""
+import argparse
+import json
+import statistics
+import sys
+
+import torch
+
+from backends import STUDENT_ARCHS, TorchForward, build_resnet50, build_student, image_batches
+from compare_backends import latency, probabilities, transform
+from labels import NUM_CLASSES
+
+
+def replay(student_probs, teacher_probs, threshold, student_s, teacher_s):
+    """What the cascade would have answered at `threshold`"""
+    confidence, student_top1 = student_probs.max(dim=1)
+    escalate = confidence < threshold
+    top1 = torch.where(escalate, teacher_probs.argmax(dim=1), student_top1)
+    per_image = [student_s + teacher_s if e else student_s for e in escalate.tolist()]
+    return {
+        "threshold": threshold,
+        "escalated": round(float(escalate.float().mean()), 4),
+        "agreement": round(float((top1 == teacher_probs.argmax(dim=1)).float().mean()), 4),
+        "median_ms": round(statistics.median(per_image) * 1000, 2),
+        "mean_ms": round(statistics.mean(per_image) * 1000, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", default="trained_model/best_resnet50_3.pth")
+    parser.add_argument("--student", required=True, help="distill_student.py checkpoint")
+    parser.add_argument("--arch", default="mobilenet_v3_large", choices=STUDENT_ARCHS)
+    parser.add_argument("--images", required=True, help="folder of validation images (searched recursively)")
+    parser.add_argument("--thresholds", default="0.5,0.6,0.7,0.8,0.85,0.9,0.95,0.97,0.99")
+    parser.add_argument("--limit", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--min-agreement", type=float, default=0.99)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    teacher = TorchForward(build_resnet50(NUM_CLASSES, args.checkpoint).to(memory_format=torch.channels_last))
+    student = TorchForward(build_student(args.arch, NUM_CLASSES, args.student).to(memory_format=torch.channels_last))
+    batches = [batch for _, batch in image_batches(args.images, transform, args.batch_size, args.limit)]
+    if not batches:
+        sys.exit(f"❌ No images found under {args.images}")
+
+    teacher_probs = probabilities(teacher, batches)
+    student_probs = probabilities(student, batches)
+    teacher_s, student_s = latency(teacher, 1), latency(student, 1)
+
+    sweep = [replay(student_probs, teacher_probs, float(t), student_s, teacher_s)
+             for t in sorted(args.thresholds.split(","), key=float)]
+    passing = [row for row in sweep if row["agreement"] >= args.min_agreement]
+    recommended = passing[0] if passing else None
+
+    print(json.dumps({
+        "student": args.arch,
+        "images": int(teacher_probs.shape[0]),
+        "torch_threads": torch.get_num_threads(),
+        "resnet50_batch1_ms": round(teacher_s * 1000, 2),
+        "student_batch1_ms": round(student_s * 1000, 2),
+        "student_agreement": round(float((student_probs.argmax(1) == teacher_probs.argmax(1)).float().mean()), 4),
+        "thresholds": sweep,
+        "recommended": recommended
+    }, indent=2))
+    if recommended is None:
+        sys.exit(f"❌ No threshold reaches {args.min_agreement} agreement with ResNet50")
+    print(f"✅ DISEASE_CASCADE_THRESHOLD={recommended['threshold']} "
+          f"({recommended['escalated']:.1%} escalated, median {recommended['median_ms']} ms "
+          f"vs {round(teacher_s * 1000, 2)} ms)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
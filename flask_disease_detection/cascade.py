@@ -0,0 +1,46 @@
+import threading
+
+import torch
+
+
+class Cascade:
+    """
+    Two-stage classifier: a small student model answers first, and only the
+    images whose top softmax probability is below `threshold` are run through
+    the ResNet50 teacher.
+
+    Both stages are callables taking an (N, 3, H, W) float batch and returning
+    logits over the same classes (see backends.py). Calling the cascade
+    returns (N, num_classes) probabilities, taken from the teacher for the
+    escalated rows. Pick the threshold with calibrate_cascade.py.
+    """
+
+    def __init__(self, student, teacher, threshold):
+        self.student = student
+        self.teacher = teacher
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._counters = {"images": 0, "escalated": 0}
+
+    def __call__(self, batch):
+        probs = torch.softmax(self.student(batch).float(), dim=1)
+        escalate = probs.max(dim=1).values < self.threshold
+        escalated = int(escalate.sum())
+        if escalated:
+            probs[escalate] = torch.softmax(self.teacher(batch[escalate]).float(), dim=1)
+
+        with self._lock:
+            self._counters["images"] += batch.shape[0]
+            self._counters["escalated"] += escalated
+        return probs
+
+    def stats(self):
+        """Share of images the student could not answer alone."""
+        with self._lock:
+            counters = dict(self._counters)
+
+        return {
+            "threshold": self.threshold,
+            "escalated_fraction": round(counters["escalated"] / counters["images"], 4) if counters["images"] else 0.0,
+            **counters
+        }
@@ -0,0 +1,147 @@
+"""
+Compare CPU inference backends against the fp32 ResNet50 checkpoint.
+
+    python compare_backends.py --images val_images/ --calibration-dir calib_images/
+    python compare_backends.py --images val_images/ --backends torchscript,int8_static --min-agreement 0.99
+
+Runs every image under --images through plain fp32 eager (the reference) and
+through each backend, then reports:
+  - top-1 agreement with fp32, overall and per class (all 94 CLASS_NAMES;
+    classes fp32 never predicted on this set are listed as unseen)
+  - confidence drift: |p_backend - p_fp32| of the fp32 top-1 class
+  - latency: median batch-1 ms and batch throughput (images/s)
+Also writes the TorchScript / ONNX / int8 artifacts next to the checkpoint,
+so the service picks them up. Exits 1 if any backend fails to load or its
+agreement is below --min-agreement.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+
+import torch
+
+from backends import BACKENDS, build_resnet50, image_batches, load_backend, reference_transform
+from labels import CLASS_NAMES, NUM_CLASSES
+
+IMG_SIZE = 224
+
+# Per-image equivalent of app.py's batched preprocessing
+transform = reference_transform(IMG_SIZE)
+
+
+def probabilities(forward, batches):
+    with torch.inference_mode():
+        return torch.cat([torch.softmax(forward(batch).float(), dim=1) for batch in batches])
+
+
+def latency(forward, batch_size, repeats=20):
+    batch = torch.randn(batch_size, 3, IMG_SIZE, IMG_SIZE)
+    times = []
+    with torch.inference_mode():
+        for _ in range(3):
+            forward(batch)
+        for _ in range(repeats):
+            started = time.perf_counter()
+            forward(batch)
+            times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def compare(reference, probs):
+    ref_conf, ref_top1 = reference.max(dim=1)
+    top1 = probs.argmax(dim=1)
+    agree = top1 == ref_top1
+    drift = (probs.gather(1, ref_top1[:, None]).squeeze(1) - ref_conf).abs()
+
+    per_class, unseen = {}, []
+    for class_id in range(NUM_CLASSES):
+        mask = ref_top1 == class_id
+        n = int(mask.sum())
+        if n == 0:
+            unseen.append(class_id)
+            continue
+        per_class[class_id] = (int(agree[mask].sum()), n)
+
+    disagreeing = {
+        f"{class_id}:{CLASS_NAMES[class_id]}": f"{ok}/{n}"
+        for class_id, (ok, n) in per_class.items() if ok < n
+    }
+    return {
+        "top1_agreement": round(float(agree.float().mean()), 4),
+        "confidence_drift": {
+            "mean": round(float(drift.mean()), 4),
+            "p95": round(float(drift.quantile(0.95)), 4),
+            "max": round(float(drift.max()), 4)
+        },
+        "classes_seen": len(per_class),
+        "classes_unseen": len(unseen),
+        "classes_with_disagreement": disagreeing
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", default="trained_model/best_resnet50_3.pth")
+    parser.add_argument("--images", required=True, help="folder of validation images (searched recursively)")
+    parser.add_argument("--calibration-dir", default=None, help="images for int8_static calibration")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--limit", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--min-agreement", type=float, default=0.99)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    model = build_resnet50(NUM_CLASSES, args.checkpoint)
+    batches = [batch for _, batch in image_batches(args.images, transform, args.batch_size, args.limit)]
+    if not batches:
+        sys.exit(f"❌ No images found under {args.images}")
+
+    # Reference: fp32 eager exactly as the service ran it before (contiguous NCHW)
+    def reference_forward(batch):
+        return model(batch)
+
+    reference = probabilities(reference_forward, batches)
+    report = {
+        "checkpoint": args.checkpoint,
+        "images": int(reference.shape[0]),
+        "torch_threads": torch.get_num_threads(),
+        "fp32": {
+            "batch1_ms": round(latency(reference_forward, 1) * 1000, 2),
+            "images_per_s": round(args.batch_size / latency(reference_forward, args.batch_size), 1)
+        },
+        "backends": {}
+    }
+
+    failed = []
+    for name in args.backends.split(","):
+        try:
+            forward = load_backend(name, build_resnet50(NUM_CLASSES, args.checkpoint),
+                                   checkpoint_path=args.checkpoint, calibration_dir=args.calibration_dir,
+                                   transform=transform, img_size=IMG_SIZE)
+        except Exception as e:
+            report["backends"][name] = {"error": str(e)}
+            failed.append(name)
+            continue
+
+        result = compare(reference, probabilities(forward, batches))
+        batch1 = latency(forward, 1)
+        result["batch1_ms"] = round(batch1 * 1000, 2)
+        result["images_per_s"] = round(args.batch_size / latency(forward, args.batch_size), 1)
+        result["batch1_speedup"] = round(report["fp32"]["batch1_ms"] / result["batch1_ms"], 2)
+        result["passes"] = result["top1_agreement"] >= args.min_agreement
+        if not result["passes"]:
+            failed.append(name)
+        report["backends"][name] = result
+
+    print(json.dumps(report, indent=2))
+    if failed:
+        sys.exit(f"❌ Failed to load or below {args.min_agreement} top-1 agreement: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
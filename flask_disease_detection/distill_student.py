@@ -0,0 +1,129 @@
+"""
+Distill the ResNet50 disease model into a small backbone for the cascade.
+
+    python distill_student.py --images train_images/ --val-images val_images/ --arch mobilenet_v3_large
+
+The student starts from its ImageNet weights and learns to match the
+teacher's softened softmax over the 94 classes (KL divergence at
+--temperature), so no labels are needed: any folder of leaf photos from the
+training distribution works. Both models see the same augmented batch. After
+each epoch the student's top-1 agreement with ResNet50 on --val-images is
+printed, and the best epoch is saved to --out as
+{"arch", "num_classes", "model_state_dict"} for DISEASE_CASCADE_MODEL_PATH.
+Then run calibrate_cascade.py to pick DISEASE_CASCADE_THRESHOLD.
+"""
+import argparse
+import time
+
+import torch
+import torch.nn.functional as F
+from PIL import Image
+from torch.utils.data import DataLoader, Dataset
+from torchvision import transforms
+
+from backends import STUDENT_ARCHS, build_resnet50, build_student, image_batches, list_images
+from compare_backends import IMG_SIZE, transform
+from labels import NUM_CLASSES
+
+train_transform = transforms.Compose([
+    transforms.RandomResizedCrop(IMG_SIZE, scale=(0.6, 1.0)),
+    transforms.RandomHorizontalFlip(),
+    transforms.RandomVerticalFlip(),
+    transforms.ColorJitter(0.2, 0.2, 0.2),
+    transforms.ToTensor(),
+    transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+])
+
+
+class ImageFiles(Dataset):
+    def __init__(self, paths, transform):
+        self.paths = paths
+        self.transform = transform
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, index):
+        return self.transform(Image.open(self.paths[index]).convert("RGB"))
+
+
+def distillation_loss(student_logits, teacher_logits, temperature):
+    """KL(teacher || student) on temperature-softened distributions, scaled by T^2"""
+    return F.kl_div(
+        F.log_softmax(student_logits / temperature, dim=1),
+        F.softmax(teacher_logits / temperature, dim=1),
+        reduction="batchmean"
+    ) * temperature ** 2
+
+
+def agreement(student, teacher, batches):
+    """Top-1 agreement of the student with the teacher"""
+    student.eval()
+    agree = total = 0
+    with torch.inference_mode():
+        for batch in batches:
+            agree += int((student(batch).argmax(1) == teacher(batch).argmax(1)).sum())
+            total += batch.shape[0]
+    return agree / total if total else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", default="trained_model/best_resnet50_3.pth", help="ResNet50 teacher")
+    parser.add_argument("--images", required=True, help="folder of training images (searched recursively)")
+    parser.add_argument("--val-images", default=None, help="held-out images for the agreement check")
+    parser.add_argument("--arch", default="mobilenet_v3_large", choices=STUDENT_ARCHS)
+    parser.add_argument("--out", default=None, help="default: trained_model/student_<arch>.pth")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--lr", type=float, default=3e-4)
+    parser.add_argument("--temperature", type=float, default=4.0)
+    parser.add_argument("--workers", type=int, default=4, help="DataLoader workers")
+    args = parser.parse_args()
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    out = args.out or f"trained_model/student_{args.arch}.pth"
+
+    teacher = build_resnet50(NUM_CLASSES, args.checkpoint, device)
+    student = build_student(args.arch, NUM_CLASSES, device=device, pretrained=True)
+
+    paths = list_images(args.images)
+    if not paths:
+        raise SystemExit(f"❌ No images found under {args.images}")
+    loader = DataLoader(ImageFiles(paths, train_transform), batch_size=args.batch_size, shuffle=True,
+                        num_workers=args.workers, drop_last=True)
+    val_batches = [batch.to(device) for _, batch in image_batches(args.val_images, transform, args.batch_size)] \
+        if args.val_images else []
+
+    optimizer = torch.optim.AdamW(student.parameters(), lr=args.lr, weight_decay=1e-4)
+    scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=args.epochs * len(loader))
+
+    print(f"🎓 Distilling ResNet50 -> {args.arch} on {len(paths)} images ({device})")
+    best = -1.0
+    for epoch in range(1, args.epochs + 1):
+        student.train()
+        started, total_loss = time.perf_counter(), 0.0
+        for batch in loader:
+            batch = batch.to(device)
+            with torch.no_grad():
+                teacher_logits = teacher(batch)
+            loss = distillation_loss(student(batch), teacher_logits, args.temperature)
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            scheduler.step()
+            total_loss += loss.item()
+
+        score = agreement(student, teacher, val_batches) if val_batches else float(epoch)
+        print(f"epoch {epoch}: loss {total_loss / max(1, len(loader)):.4f}, "
+              f"{'agreement ' + format(score, '.4f') if val_batches else 'no --val-images'}, "
+              f"{time.perf_counter() - started:.0f}s")
+        if score > best:
+            best = score
+            torch.save({"arch": args.arch, "num_classes": NUM_CLASSES,
+                        "model_state_dict": student.state_dict()}, out)
+            print(f"✅ Saved {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Production serving for the disease detection service.
+
+    gunicorn -c gunicorn.conf.py app:app
+    DISEASE_WORKERS=4 DISEASE_TORCH_THREADS=4 gunicorn -c gunicorn.conf.py app:app
+
+The app (checkpoint, backend, cascade) is loaded once in the gunicorn master
+(preload_app) and the workers are forked from it. The weights are never
+written after loading, so all workers share the same physical pages
+copy-on-write and memory does not grow N-fold. The master loads and warms up
+the model with a single torch thread, so no OpenMP pool exists at fork time.
+Each worker then gets its own torch.set_num_threads budget and is pinned to
+its own slice of the cores (Linux), like flask-llm/router.py. Requests are
+handled by DISEASE_HTTP_THREADS threads per worker, which feed that worker's
+micro-batcher.
+
+Compare layouts with: python bench_serving.py --configs 1x16,2x8,4x4,8x2
+"""
+import gc
+import os
+
+cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+
+workers = int(os.environ.get("DISEASE_WORKERS", max(1, len(cores) // 4)))
+torch_threads = int(os.environ.get("DISEASE_TORCH_THREADS", max(1, len(cores) // workers)))
+
+bind = os.environ.get("DISEASE_BIND", "0.0.0.0:8001")
+preload_app = True
+worker_class = "gthread"
+threads = int(os.environ.get("DISEASE_HTTP_THREADS", 16))
+timeout = 120
+graceful_timeout = 30
+
+# Per-worker pools sized to the worker's core slice (read when app.py is imported)
+os.environ.setdefault("DISEASE_DECODE_THREADS", str(torch_threads))
+
+# This file runs in the master before app.py is preloaded: keep the model load
+# and warm-up single-threaded so forked workers do not inherit an OpenMP pool
+import torch  # noqa: E402
+torch.set_num_threads(1)
+
+# Master-side: live workers per core slice. A replacement worker takes the
+# slice its dead predecessor freed (child_exit), not one by spawn count.
+slice_users = [0] * workers
+
+
+def when_ready(server):
+    # Move everything allocated while loading into the permanent generation, so
+    # the garbage collector does not touch (and copy) those pages in the workers
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Model loaded once, forking {workers} worker(s) x {torch_threads} torch thread(s)")
+
+
+def pre_fork(server, worker):
+    # Runs in the master; the forked worker inherits worker.core_slice.
+    # During a reload old and new workers overlap, so take the least used slice.
+    worker.core_slice = min(range(workers), key=lambda i: (slice_users[i], i))
+    slice_users[worker.core_slice] += 1
+
+
+def child_exit(server, worker):
+    # Runs in the master once the worker process has exited
+    index = getattr(worker, "core_slice", None)
+    if index is not None:
+        slice_users[index] -= 1
+
+
+def post_fork(server, worker):
+    import torch
+
+    index = worker.core_slice
+    worker_cores = cores[index * torch_threads:(index + 1) * torch_threads]
+    if len(worker_cores) == torch_threads and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, worker_cores)
+    torch.set_num_threads(torch_threads)
+    server.log.info(f"Worker {worker.pid}: slice {index}, {torch_threads} torch thread(s), cores {worker_cores or 'any'}")
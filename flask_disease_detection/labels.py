@@ -0,0 +1,104 @@
+"""
+Class index -> label for the trained ResNet50 disease model (94 classes).
+Kept separate from app.py so tools can use it without loading the model.
+"""
+
+# Class names mapping (all 94 classes)
+CLASS_NAMES = {
+    0: "Black_Pitting_or_Banana_Rust",
+    1: "Crown_Rot",
+    2: "Healthy",
+    3: "fungal_disease",
+    4: "leaf_Banana_Scab_Moth",
+    5: "leaf_Black_Sigatoka",
+    6: "leaf_Healthy",
+    7: "Black_Leaf_Streak",
+    8: "Panama_Disease",
+    9: "Bacterial_spot_rot",
+    10: "Black_Rot",
+    11: "Downy_Mildew",
+    12: "Healthy",
+    13: "Blight",
+    14: "Common_Rust",
+    15: "Gray_Leaf_Spot",
+    16: "Healthy",
+    17: "Aphids",
+    18: "Army worm",
+    19: "Bacterial blight",
+    20: "Healthy",
+    21: "fruit_Anthracnose",
+    22: "fruit_Healthy",
+    23: "fruit_Scab",
+    24: "fruit_Styler_end_root",
+    25: "leaf_Anthracnose",
+    26: "leaf_Canker",
+    27: "leaf_Dot",
+    28: "leaf_Healthy",
+    29: "leaf_Rust",
+    30: "Cescospora Leaf Spot",
+    31: "Golden Mosaic",
+    32: "Healthy Leaf",
+    33: "Anthracnose",
+    34: "Bacterial_Canker",
+    35: "Cutting_Weevil",
+    36: "Gall_Midge",
+    37: "Healthy",
+    38: "Powdery_Mildew",
+    39: "Sooty_Mould",
+    40: "die_back",
+    41: "Anthracnose",
+    42: "BacterialSpot",
+    43: "Curl",
+    44: "Healthy",
+    45: "Mealybug",
+    46: "Mite_disease",
+    47: "Mosaic",
+    48: "Ringspot",
+    49: "Black_Scurf",
+    50: "Blackleg",
+    51: "Blackspot_Bruising",
+    52: "Brown_Rot",
+    53: "Common_Scab",
+    54: "Dry_Rot",
+    55: "Healthy_Potatoes",
+    56: "Miscellaneous",
+    57: "Pink_Rot",
+    58: "Soft_Rot",
+    59: "Blast",
+    60: "Brownspot",
+    61: "Tungro",
+    62: "bacterial_leaf_blight",
+    63: "bacterial_leaf_streak",
+    64: "bacterial_panicle_blight",
+    65: "dead_heart",
+    66: "downy_mildew",
+    67: "hispa",
+    68: "normal",
+    69: "Healthy",
+    70: "Mosaic",
+    71: "RedRot",
+    72: "Rust",
+    73: "Yellow",
+    74: "Anthracnose",
+    75: "algal_leaf",
+    76: "bird_eye_spot",
+    77: "brown_blight",
+    78: "gray_light",
+    79: "healthy",
+    80: "red_leaf_spot",
+    81: "white_spot",
+    82: "Bacterial_Spot",
+    83: "Early_Blight",
+    84: "Late_Blight",
+    85: "Leaf_Mold",
+    86: "Septoria_Leaf_Spot",
+    87: "Spider_Mites_Two-spotted_Spider_Mite",
+    88: "Target_Spot",
+    89: "Yellow_Leaf_Curl_Virus",
+    90: "healthy",
+    91: "Healthy",
+    92: "septoria",
+    93: "stripe_rust"
+}
+
+NUM_CLASSES = len(CLASS_NAMES)
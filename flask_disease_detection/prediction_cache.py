@@ -0,0 +1,165 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+MODES = ("exact", "phash")
+
+
+def content_hash(data):
+    """sha256 of the raw upload bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II basis, so dct(x) = D @ x @ D.T"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix.astype(np.float32)
+
+
+_PHASH_SIZE = 8
+_PHASH_SAMPLE = 32
+_DCT = _dct_matrix(_PHASH_SAMPLE)
+
+
+def perceptual_hash(image):
+    """
+    64-bit pHash: the sign (vs the median) of the lowest 8x8 DCT frequencies
+    of a 32x32 grayscale thumbnail. Survives re-encoding, resizing and the
+    recompression WhatsApp applies to forwarded photos.
+    Returns: int
+    """
+    thumbnail = image.convert("L").resize((_PHASH_SAMPLE, _PHASH_SAMPLE), Image.BILINEAR)
+    pixels = np.asarray(thumbnail, dtype=np.float32)
+    low = (_DCT @ pixels @ _DCT.T)[:_PHASH_SIZE, :_PHASH_SIZE].flatten()
+    bits = low > np.median(low)
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+def _hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class PredictionCache:
+    """
+    LRU cache of /detect-disease results keyed by the sha256 of the upload.
+
+    In "phash" mode every entry also carries a perceptual hash of the decoded
+    image, and a miss on the exact key is retried against those: the closest
+    entry within max_distance bits (out of 64) is a near-duplicate hit.
+    Entries expire after ttl_s seconds and the least recently used ones are
+    evicted beyond max_entries or max_bytes (estimated from the JSON size of
+    the stored result).
+    """
+
+    ENTRY_OVERHEAD = 256  # key, OrderedDict node, timestamps
+
+    def __init__(self, max_entries=4096, max_bytes=16 * 1024 * 1024, ttl_s=21600, mode="exact", max_distance=4):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}. Choose from: {', '.join(MODES)}")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.mode = mode
+        self.max_distance = max_distance
+        self._entries = OrderedDict()  # digest -> (result, fingerprint, stored_at, size)
+        self._fingerprints = {}        # fingerprint -> digest
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits_exact": 0, "hits_phash": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    @property
+    def perceptual(self):
+        return self.enabled and self.mode == "phash"
+
+    def get(self, digest):
+        """Exact lookup by content hash. Returns the stored result or None (not counted as a miss yet)."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            result = self._live(digest)
+            if result is not None:
+                self._counters["hits_exact"] += 1
+            elif not self.perceptual:
+                self._counters["misses"] += 1
+            return result
+
+    def get_similar(self, fingerprint):
+        """Near-duplicate lookup by perceptual hash (phash mode, after an exact miss)"""
+        if not self.perceptual:
+            return None
+        with self._lock:
+            best, best_distance = None, self.max_distance + 1
+            for other, digest in self._fingerprints.items():
+                distance = _hamming(fingerprint, other)
+                if distance < best_distance:
+                    best, best_distance = digest, distance
+                    if distance == 0:
+                        break
+            result = self._live(best) if best is not None else None
+            self._counters["hits_phash" if result is not None else "misses"] += 1
+            return result
+
+    def put(self, digest, fingerprint, result):
+        """Store a result under its content hash (and perceptual hash, if any)"""
+        if not self.enabled:
+            return
+        size = len(json.dumps(result)) + self.ENTRY_OVERHEAD
+        with self._lock:
+            self._remove(digest)
+            self._entries[digest] = (result, fingerprint, time.monotonic(), size)
+            self._bytes += size
+            if fingerprint is not None:
+                self._fingerprints[fingerprint] = digest
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+
+    def _live(self, digest):
+        """Entry result if present and not expired (refreshes its LRU position). Caller holds the lock."""
+        entry = self._entries.get(digest)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[2] > self.ttl_s:
+            self._remove(digest)
+            self._counters["expired"] += 1
+            return None
+        self._entries.move_to_end(digest)
+        return entry[0]
+
+    def _remove(self, digest):
+        entry = self._entries.pop(digest, None)
+        if entry is None:
+            return
+        _, fingerprint, _, size = entry
+        self._bytes -= size
+        if fingerprint is not None and self._fingerprints.get(fingerprint) == digest:
+            del self._fingerprints[fingerprint]
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            entries, size = len(self._entries), self._bytes
+        hits = counters["hits_exact"] + counters["hits_phash"]
+        lookups = hits + counters["misses"]
+        return {
+            "mode": self.mode if self.enabled else "off",
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "ttl_s": self.ttl_s,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            **counters
+        }
@@ -0,0 +1,84 @@
+"""
+Regression gate of the disease-detection benchmark (bench_detection.py).
+
+    cd flask_disease_detection && python -m pytest -q tests
+
+Runs the suite on a tiny configuration (one small image size, eager
+backend, one thread) to write a baseline, then checks that the same run
+passes against it and that a run slower than the baseline, or missing one
+of its figures, exits 1.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("PIL")
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from bench_detection import failures, regressions  # noqa: E402
+
+TINY = ["--sizes", "64x48", "--formats", "png,jpg", "--backends", "eager",
+        "--threads", "1", "--batch-sizes", "1,2", "--repeats", "3"]
+
+
+def run_suite(*args):
+    return subprocess.run([sys.executable, "bench_detection.py", *TINY, *args], cwd=APP_DIR,
+                          capture_output=True, text=True, timeout=600)
+
+
+def scaled(report, factor):
+    """Copy of a report with every images/s figure multiplied by factor"""
+    if isinstance(report, dict):
+        return {key: value * factor if key == "images_per_s" else scaled(value, factor)
+                for key, value in report.items()}
+    return report
+
+
+@pytest.fixture(scope="module")
+def baseline(tmp_path_factory):
+    path = tmp_path_factory.mktemp("bench") / "baseline.json"
+    result = run_suite("--out", str(path))
+    assert result.returncode == 0, result.stderr
+    return path
+
+
+def test_regressions_flags_slower_and_missing():
+    baseline = {"decode": {"64x48/png": {"images_per_s": 100.0}},
+                "forward": {"eager/threads1": {"batch1": {"images_per_s": 10.0}},
+                            "torchscript/threads1": {"batch1": {"images_per_s": 12.0}}}}
+    report = {"decode": {"64x48/png": {"images_per_s": 95.0}},
+              "forward": {"eager/threads1": {"batch1": {"images_per_s": 5.0}}}}
+
+    found = regressions(report, baseline, 0.15)
+    assert set(found) == {"forward/eager/threads1/batch1", "forward/torchscript/threads1/batch1"}
+    assert found["forward/eager/threads1/batch1"]["change"] == -0.5
+    assert found["forward/torchscript/threads1/batch1"]["current"] is None
+    assert failures(dict(report, regressions=found), 0.15)
+    assert failures(report, 0.15) is None
+
+
+def test_backend_error_fails():
+    assert "eager/threads1" in failures({"forward": {"eager/threads1": {"error": "boom"}}}, 0.15)
+
+
+def test_same_machine_passes(baseline):
+    # Loose threshold: the gate, not timing noise, is under test here.
+    result = run_suite("--baseline", str(baseline), "--max-regression", "0.9")
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout)["regressions"] == {}
+
+
+def test_slower_than_baseline_fails(baseline, tmp_path):
+    faster = tmp_path / "faster.json"
+    faster.write_text(json.dumps(scaled(json.loads(baseline.read_text()), 10)))
+
+    result = run_suite("--baseline", str(faster), "--max-regression", "0.15")
+    assert result.returncode == 1
+    assert "below the baseline" in result.stderr
+    assert json.loads(result.stdout)["regressions"]
@@ -2,7 +2,7 @@
 # Strict numeric-fidelity RAG pipeline module
 # EDIT PATHS at top as needed (left as placeholders)
 
-import os, json, re, time
+import os, json, re, time, hashlib
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
 
@@ -25,6 +25,8 @@ PDF_INPUT_DIR = "/content/drive/MyDrive/agriculture corpora/New folder"
 PROCESSED_TXT_DIR = "/content/drive/MyDrive/processed_texts"
 CHUNKS_JSONL = "/content/drive/MyDrive/processed/chunks_semantic.jsonl"
 FAISS_INDEX_DIR = "/content/drive/MyDrive/faiss_agriculture_index"
+# content hashes of every PDF, text file and chunk, so rebuilds only redo what changed
+MANIFEST_JSON = "/content/drive/MyDrive/processed/rag_manifest.json"
 
 
 EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
@@ -46,6 +48,17 @@ def normalize_text(t: str) -> str:
 def token_len(t: str) -> int:
     return len(tokenizer.encode(t, add_special_tokens=False))
 
+def sha256_file(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def chunk_id(source: str, text: str) -> str:
+    # same text in the same file -> same id, so unchanged chunks keep their vectors
+    return hashlib.sha256(f"{source}\n{text}".encode("utf-8")).hexdigest()[:32]
+
 def safe_source(doc: Document) -> str:
     md = getattr(doc, "metadata", {}) or {}
     for k in ("source","source_file","filename"):
@@ -53,14 +66,48 @@ def safe_source(doc: Document) -> str:
             return str(md[k])
     return "Unknown"
 
+# ---------------- Manifest ----------------
+# {"pdfs":   {pdf name: {"sha256", "txt"}},
+#  "texts":  {txt name: {"sha256", "chunks": [chunk ids]}},
+#  "index":  {"settings": {...}, "ids": [chunk ids in the FAISS index]}}
+def load_manifest(path: str = MANIFEST_JSON) -> Dict:
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {"pdfs": {}, "texts": {}, "index": {}}
+
+def save_manifest(manifest: Dict, path: str = MANIFEST_JSON):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, path)
+
 # ---------------- PDF -> TXT ----------------
-def extract_pdfs_to_txt(pdf_dir: str = PDF_INPUT_DIR, out_dir: str = PROCESSED_TXT_DIR):
+def extract_pdfs_to_txt(pdf_dir: str = PDF_INPUT_DIR, out_dir: str = PROCESSED_TXT_DIR,
+                        manifest: Optional[Dict] = None, force: bool = False) -> int:
+    """Extract new/changed PDFs only (by content hash); drop texts of removed PDFs. Returns PDFs extracted."""
+    manifest = manifest if manifest is not None else {"pdfs": {}}
+    known = manifest.setdefault("pdfs", {})
     os.makedirs(out_dir, exist_ok=True)
     pdfs = list(Path(pdf_dir).glob("*.pdf"))
     if not pdfs:
         raise FileNotFoundError(f"No PDFs found in {pdf_dir}")
-    print(f"Extracting {len(pdfs)} PDFs to {out_dir} ...")
+
+    for name in set(known) - {p.name for p in pdfs}:
+        txt = Path(out_dir) / known.pop(name)["txt"]
+        if txt.exists():
+            txt.unlink()
+        print("Removed", name)
+
+    todo = []
     for pdf in pdfs:
+        digest = sha256_file(pdf)
+        entry = known.get(pdf.name)
+        if force or not entry or entry["sha256"] != digest or not (Path(out_dir) / entry["txt"]).exists():
+            todo.append((pdf, digest))
+    print(f"Extracting {len(todo)} of {len(pdfs)} PDFs to {out_dir} ...")
+    for pdf, digest in todo:
         try:
             doc = fitz.open(pdf)
             pages = []
@@ -74,9 +121,11 @@ def extract_pdfs_to_txt(pdf_dir: str = PDF_INPUT_DIR, out_dir: str = PROCESSED_T
                 out_path = Path(out_dir) / f"{pdf.stem}.txt"
                 with open(out_path, "w", encoding="utf-8") as f:
                     f.write(txt)
+                known[pdf.name] = {"sha256": digest, "txt": out_path.name}
         except Exception as e:
             print("Failed to extract", pdf, e)
     print("PDF extraction done.")
+    return len(todo)
 
 # ---------------- Chunking ----------------
 def chunk_text(text: str) -> List[str]:
@@ -98,39 +147,106 @@ def chunk_text(text: str) -> List[str]:
         chunks.append(" ".join(buf))
     return chunks
 
-def chunk_all_texts(input_dir: str = PROCESSED_TXT_DIR, out_jsonl: str = CHUNKS_JSONL):
+def read_chunks(chunks_jsonl: str) -> Dict[str, Dict]:
+    chunks = {}
+    if os.path.exists(chunks_jsonl):
+        with open(chunks_jsonl, "r", encoding="utf-8") as fin:
+            for line in fin:
+                j = json.loads(line)
+                chunks[j["id"]] = j
+    return chunks
+
+def chunk_all_texts(input_dir: str = PROCESSED_TXT_DIR, out_jsonl: str = CHUNKS_JSONL,
+                    manifest: Optional[Dict] = None, force: bool = False) -> int:
+    """Re-chunk only new/changed text files; unchanged files keep their chunks (and ids). Returns total chunks."""
+    manifest = manifest if manifest is not None else {"texts": {}}
+    known = manifest.setdefault("texts", {})
+    settings = {"chunk_size": CHUNK_SIZE, "min_chunk": MIN_CHUNK}
+    if manifest.get("chunk_settings") != settings:
+        force = True
     os.makedirs(os.path.dirname(out_jsonl), exist_ok=True)
     txts = list(Path(input_dir).glob("*.txt"))
     if not txts:
         raise FileNotFoundError(f"No .txt files in {input_dir} (run PDF extraction).")
-    total = 0
-    with open(out_jsonl, "w", encoding="utf-8") as fout:
+
+    previous = read_chunks(out_jsonl)
+    for name in set(known) - {t.name for t in txts}:
+        del known[name]
+    total, rechunked = 0, 0
+    tmp = out_jsonl + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fout:
         for t in txts:
-            text = normalize_text(open(t, encoding="utf-8").read())
-            for i,ch in enumerate(chunk_text(text)):
-                fout.write(json.dumps({"id": f"{t.name}__{i}", "text": ch, "metadata": {"source": t.name}} , ensure_ascii=False) + "\n")
+            digest = sha256_file(t)
+            entry = known.get(t.name)
+            if not force and entry and entry["sha256"] == digest and all(c in previous for c in entry["chunks"]):
+                records = [previous[c] for c in entry["chunks"]]
+            else:
+                text = normalize_text(open(t, encoding="utf-8").read())
+                # dict: a repeated passage in one file is one chunk (ids must be unique in FAISS)
+                records = list({chunk_id(t.name, ch): {"id": chunk_id(t.name, ch), "text": ch, "metadata": {"source": t.name}}
+                                for ch in chunk_text(text)}.values())
+                known[t.name] = {"sha256": digest, "chunks": [r["id"] for r in records]}
+                rechunked += 1
+            for r in records:
+                fout.write(json.dumps(r, ensure_ascii=False) + "\n")
                 total += 1
-    print(f"Chunking complete: {total} chunks -> {out_jsonl}")
+    os.replace(tmp, out_jsonl)
+    manifest["chunk_settings"] = settings
+    print(f"Chunking complete: {total} chunks ({rechunked} of {len(txts)} files re-chunked) -> {out_jsonl}")
     return total
 
 # ---------------- FAISS ----------------
-def build_faiss_index(chunks_jsonl: str = CHUNKS_JSONL, index_dir: str = FAISS_INDEX_DIR):
-    docs = []
-    with open(chunks_jsonl, "r", encoding="utf-8") as fin:
-        for line in fin:
-            j = json.loads(line)
-            text = j.get("text","").strip()
-            if not text:
-                continue
-            md = j.get("metadata", {})
-            docs.append(Document(page_content=text, metadata=md))
+def build_faiss_index(chunks_jsonl: str = CHUNKS_JSONL, index_dir: str = FAISS_INDEX_DIR,
+                      manifest: Optional[Dict] = None, force: bool = False):
+    """
+    Embed only chunks not yet in the index and delete vectors of chunks that are gone.
+    Full rebuild when there is no index/manifest yet, the embedding model changed, or force=True.
+    """
+    manifest = manifest if manifest is not None else {}
+    state = manifest.setdefault("index", {})
+    settings = {"embed_model": EMBED_MODEL}
+    docs: Dict[str, Document] = {}
+    for cid, j in read_chunks(chunks_jsonl).items():
+        text = j.get("text","").strip()
+        if text:
+            docs[cid] = Document(page_content=text, metadata=j.get("metadata", {}))
     if not docs:
         raise ValueError("No documents to index.")
     emb = HuggingFaceEmbeddings(model_name=EMBED_MODEL, encode_kwargs={"normalize_embeddings": True})
-    vs = FAISS.from_documents(docs, emb)
+
+    incremental = (not force and state.get("settings") == settings
+                   and os.path.exists(os.path.join(index_dir, "index.faiss")))
+    if incremental:
+        vs = FAISS.load_local(index_dir, emb, allow_dangerous_deserialization=True)
+        indexed = set(state.get("ids", []))
+        removed = [cid for cid in indexed if cid not in docs]
+        added = [cid for cid in docs if cid not in indexed]
+        if removed:
+            vs.delete(removed)
+        if added:
+            vs.add_documents([docs[cid] for cid in added], ids=added)
+        print(f"FAISS updated: +{len(added)} / -{len(removed)} chunks ({len(docs)} total).")
+    else:
+        ids = list(docs)
+        vs = FAISS.from_documents([docs[cid] for cid in ids], emb, ids=ids)
+        print(f"FAISS built: {len(ids)} chunks.")
     os.makedirs(index_dir, exist_ok=True)
     vs.save_local(index_dir)
-    print("FAISS built.")
+    state.update({"settings": settings, "ids": list(docs)})
+    return vs
+
+def update_index(pdf_dir: str = PDF_INPUT_DIR, txt_dir: str = PROCESSED_TXT_DIR, chunks_jsonl: str = CHUNKS_JSONL,
+                 index_dir: str = FAISS_INDEX_DIR, manifest_path: str = MANIFEST_JSON, force: bool = False):
+    """PDFs -> texts -> chunks -> FAISS, redoing only what changed since the last run (see MANIFEST_JSON)."""
+    t0 = time.time()
+    manifest = load_manifest(manifest_path)
+    extract_pdfs_to_txt(pdf_dir, txt_dir, manifest, force)
+    save_manifest(manifest, manifest_path)
+    chunk_all_texts(txt_dir, chunks_jsonl, manifest, force)
+    save_manifest(manifest, manifest_path)
+    vs = build_faiss_index(chunks_jsonl, index_dir, manifest, force)
+    save_manifest(manifest, manifest_path)
+    print(f"Index up to date in {time.time() - t0:.1f}s.")
     return vs
 
 def load_faiss_index(index_dir: str = FAISS_INDEX_DIR):
@@ -434,14 +550,13 @@ def generate_answer(query: str, vectorstore: FAISS) -> Dict:
 # ---------------- Convenience main for local testing ----------------
 if __name__ == "__main__":
     # quick local-run helper (optional)
-    vs = None
-    if os.path.exists(os.path.join(FAISS_INDEX_DIR, "index.faiss")):
-        vs = load_faiss_index(FAISS_INDEX_DIR)
+    # incremental: only new/changed PDFs are extracted, chunked and embedded
+    index_ready = os.path.exists(os.path.join(FAISS_INDEX_DIR, "index.faiss")) and os.path.exists(MANIFEST_JSON)
+    if not list(Path(PDF_INPUT_DIR).glob("*.pdf")) and index_ready:
+        # corpus not mounted / moved: serve the index built last time
+        print(f"No PDFs in {PDF_INPUT_DIR}, loading the existing index from {FAISS_INDEX_DIR}.")
+        vs = load_faiss_index()
     else:
-        if not os.path.exists(CHUNKS_JSONL):
-            if not os.path.exists(PROCESSED_TXT_DIR) or len(list(Path(PROCESSED_TXT_DIR).glob("*.txt"))) == 0:
-                extract_pdfs_to_txt(PDF_INPUT_DIR, PROCESSED_TXT_DIR)
-            chunk_all_texts(PROCESSED_TXT_DIR, CHUNKS_JSONL)
-        vs = build_faiss_index(CHUNKS_JSONL, FAISS_INDEX_DIR)
+        vs = update_index()
     init_models()
     print("RAG core ready.")